@@ -1,10 +1,33 @@
-from diffusers import StableDiffusionPipeline
-import torch
+import contextlib
+import hashlib
+import json
 import os
+import random
+import time
+from collections import OrderedDict
+from ai.image_profiles import PROFILES, bf16_supported, configure_pipeline
+from ai.image_writer import BackgroundImageWriter
+from core.instrumentation import instrumentation
+from core.memory_monitor import PeakRSSMonitor
+from core.model_registry import diffusion_pipeline_key, get_diffusion_pipeline
+
+DIFFUSION_MODEL = "runwayml/stable-diffusion-v1-5"
+IMG_FOLDER_PATH = "../generated_images"
 
 
 class ImageGenerator:
-    def __init__(self):
+    def __init__(self, max_batch_size=4, profile="default", writer=None, prompt_cache_size=256,
+                 output_dir=IMG_FOLDER_PATH):
+        """
+        profile picks one of the performance profiles in ai.image_profiles
+        (scheduler, attention slicing, channels-last, bf16 autocast, torch.compile).
+        writer is the BackgroundImageWriter that encodes and saves images
+        (PNG on two threads by default), overlapping with the next batch.
+        prompt_cache_size is how many CLIP prompt embeddings are kept (LRU).
+        output_dir is where images are saved.
+        """
+        import torch  # imported here so that just importing this module stays cheap
+
         # Device config for mac M1
         if torch.backends.mps.is_available(): # check if mac supports cpu acceleration
             self.device = "mps" # gpu -> faster
@@ -13,44 +36,279 @@ class ImageGenerator:
 
         print(f"Using device: {self.device}")
 
-        # Load stable diffusion model
-        self.pipeline = StableDiffusionPipeline.from_pretrained(
-            "runwayml/stable-diffusion-v1-5",
-            torch_dtype=torch.float16 if self.device == "mps" else torch.float32
-        )
-        self.pipeline = self.pipeline.to(self.device)
+        # Stable diffusion model is loaded on first use (see the pipeline property)
+        self.torch_dtype = torch.float16 if self.device == "mps" else torch.float32
+
+        self.profile = profile
+        self.default_steps = PROFILES[profile].get("num_inference_steps", 20)
+        self.use_bf16 = bool(PROFILES[profile].get("bf16_autocast")) and self.device == "cpu" and bf16_supported()
+        if PROFILES[profile].get("bf16_autocast") and not self.use_bf16:
+            print("bfloat16 autocast not supported on this machine, running in float32")
+
+        # Prompts waiting for flush(), rendered max_batch_size per pipeline call
+        self.max_batch_size = max_batch_size
+        self._pending = []
+        self.writer = writer or BackgroundImageWriter()
+
+        # Encoded prompts, keyed by (model, prompt), so seed/guidance sweeps skip the text encoder
+        self.prompt_cache_size = prompt_cache_size
+        self._prompt_cache = OrderedDict()
+        self.prompt_cache_hits = 0
+        self.prompt_cache_misses = 0
 
-        img_folder_path = "../generated_images"
         # Create repo to save images
-        if not os.path.exists(img_folder_path):
-            os.makedirs(img_folder_path)
+        self.output_dir = output_dir
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+
+    @property
+    def pipeline(self):
+        return get_diffusion_pipeline(DIFFUSION_MODEL, self.device, self.torch_dtype, self.profile,
+                                      configure=lambda pipeline: configure_pipeline(pipeline, self.profile))
+
+    @property
+    def pipeline_key(self):
+        return diffusion_pipeline_key(DIFFUSION_MODEL, self.device, self.torch_dtype, self.profile)
+
+    def _inference_context(self):
+        """bfloat16 autocast for profiles that ask for it, nothing otherwise"""
+        if self.use_bf16:
+            import torch
+            return torch.autocast("cpu", dtype=torch.bfloat16)
+        return contextlib.nullcontext()
+
+    def _output_path(self, prompt, seed, guidance_scale, num_inference_steps, negative_prompt=None):
+        """
+        Stable file name: same request -> same file, in every run.
+        The profile and the effective dtype are part of the key: a different
+        scheduler or precision gives a different image.
+        """
+        dtype = "bfloat16-autocast" if self.use_bf16 else str(self.torch_dtype)
+        parts = [DIFFUSION_MODEL, self.profile, dtype, prompt, seed, num_inference_steps, guidance_scale]
+        if negative_prompt:
+            parts.append(negative_prompt)
+        key = json.dumps(parts)
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:20]
+        return f"{self.output_dir}/image_{digest}.{self.writer.extension}"
+
+    def _request(self, prompt, seed, guidance_scale, num_inference_steps, negative_prompt):
+        num_inference_steps = num_inference_steps or self.default_steps
+        return {
+            'prompt': prompt,
+            'negative_prompt': negative_prompt,
+            'seed': seed,
+            'guidance_scale': guidance_scale,
+            'num_inference_steps': num_inference_steps,
+            'path': self._output_path(prompt, seed, guidance_scale, num_inference_steps, negative_prompt)
+        }
+
+    def submit(self, prompt, seed, guidance_scale=7.5, num_inference_steps=None, negative_prompt=None):
+        """Queue a prompt for the next flush() and return the path its image will have"""
+        request = self._request(prompt, seed, guidance_scale, num_inference_steps, negative_prompt)
+        self._pending.append(request)
+        return request['path']
+
+    def encode_prompts(self, prompts):
+        """
+        CLIP embeddings for prompts, one tensor per prompt.
+        Prompts not in the LRU cache are encoded together in a single text-encoder
+        pass; call it ahead of time to warm the cache for a sweep.
+        """
+        import torch
+
+        embeddings = {}
+        missing = []
+        for prompt in dict.fromkeys(prompts):
+            key = (DIFFUSION_MODEL, prompt)
+            if key in self._prompt_cache:
+                self._prompt_cache.move_to_end(key)
+                embeddings[prompt] = self._prompt_cache[key]
+                self.prompt_cache_hits += 1
+            else:
+                missing.append(prompt)
+        self.prompt_cache_misses += len(missing)
+
+        if missing:
+            with instrumentation.stage("image_generator.encode_prompts", items=len(missing)), torch.no_grad():
+                encoded, _ = self.pipeline.encode_prompt(
+                    missing, self.device, num_images_per_prompt=1, do_classifier_free_guidance=False
+                )
+            for prompt, embedding in zip(missing, encoded):
+                embeddings[prompt] = embedding.unsqueeze(0)
+                self._prompt_cache[(DIFFUSION_MODEL, prompt)] = embeddings[prompt]
+            while len(self._prompt_cache) > self.prompt_cache_size:
+                self._prompt_cache.popitem(last=False)
+
+        return [embeddings[prompt] for prompt in prompts]
+
+    def prompt_cache_stats(self):
+        lookups = self.prompt_cache_hits + self.prompt_cache_misses
+        return {
+            'hits': self.prompt_cache_hits,
+            'misses': self.prompt_cache_misses,
+            'hit_rate': round(self.prompt_cache_hits / lookups, 3) if lookups else 0.0,
+            'entries': len(self._prompt_cache),
+            'max_entries': self.prompt_cache_size
+        }
+
+    def flush(self, wait=True):
+        """
+        Render everything queued with submit() and return one result per request.
+        With wait=False it returns as soon as the last batch is rendered; each
+        result's 'future' resolves when its file is written.
+        """
+        pending, self._pending = self._pending, []
+        return self._render(pending, wait)
+
+    def _render(self, requests, wait=True):
+        """
+        Requests with the same settings share a pipeline call (up to max_batch_size
+        prompts); requests whose image is already on disk (or queued for writing)
+        are not rendered again. Saving happens on the writer's threads.
+        """
+        import torch
+        from PIL import Image
+
+        results = {}
+        groups = {}
+        for request in requests:
+            if request['path'] in results:
+                continue
+            queued_image = self.writer.pending_image(request['path'])
+            if queued_image is not None:
+                results[request['path']] = {**request, 'image': queued_image, 'cached': True, 'future': None}
+            elif os.path.exists(request['path']):
+                results[request['path']] = {**request, 'image': Image.open(request['path']), 'cached': True,
+                                            'future': None}
+            else:
+                results[request['path']] = None
+                settings = (request['guidance_scale'], request['num_inference_steps'])
+                groups.setdefault(settings, []).append(request)
+
+        for (guidance_scale, num_inference_steps), group in groups.items():
+            for start in range(0, len(group), self.max_batch_size):
+                batch = group[start:start + self.max_batch_size]
+                print(f"Generating {len(batch)} image/s in one batch ({num_inference_steps} steps)")
+
+                # Cached CLIP embeddings instead of re-encoding the same prompts (no negative prompt = "")
+                prompt_embeds = self.encode_prompts([request['prompt'] for request in batch])
+                negative_embeds = self.encode_prompts([request['negative_prompt'] or "" for request in batch])
+
+                with instrumentation.stage("image_generator.render", items=len(batch)), self._inference_context():
+                    images = self.pipeline(
+                        prompt_embeds=torch.cat(prompt_embeds),
+                        negative_prompt_embeds=torch.cat(negative_embeds),
+                        # CPU generators give the same image for a seed on every device
+                        generator=[torch.Generator("cpu").manual_seed(request['seed']) for request in batch],
+                        guidance_scale=guidance_scale,
+                        num_inference_steps=num_inference_steps
+                    ).images
+
+                # Encoding/writing runs in the background while the next batch renders
+                for request, image in zip(batch, images):
+                    future = self.writer.submit(image, request['path'])
+                    results[request['path']] = {**request, 'image': image, 'cached': False, 'future': future}
+
+        if wait:
+            for result in results.values():
+                if result['future'] is not None:
+                    print(f"Immagine salvata: {result['future'].result()}")
+
+        return [results[request['path']] for request in requests]
 
-    def generate(self, prompt, num_images=1, guidance_scale=7.5, num_inference_steps=20):
-        """generate images from prompt"""
+    def generate(self, prompt, num_images=1, guidance_scale=7.5, num_inference_steps=None, seed=None, wait=True,
+                 negative_prompt=None):
+        """
+        generate images from prompt.
+        With a seed, image i uses seed + i and a re-run returns the saved files
+        without rendering; without one, random seeds are drawn.
+        num_inference_steps defaults to the profile's (20 for the default profile).
+        With wait=False the files may still be being written when this returns.
+        """
         print(f"Generating {num_images} image/s with prompt: '{prompt}'")
 
-        images = self.pipeline(
-            prompt,
-            num_images_per_prompt=num_images,
-            guidance_scale=guidance_scale,
-            num_inference_steps=num_inference_steps
-        ).images
-
-        # Save images
-        saved_paths = []
-        for i, image in enumerate(images):
-            filename = f"../generated_images/image_{hash(prompt)}_{i}.png"
-            image.save(filename)
-            saved_paths.append(filename)
-            print(f"Immagine salvata: {filename}")
+        if seed is None:
+            seeds = [random.randrange(2 ** 32) for _ in range(num_images)]
+        else:
+            seeds = [seed + i for i in range(num_images)]
+
+        requests = [self._request(prompt, image_seed, guidance_scale, num_inference_steps, negative_prompt)
+                    for image_seed in seeds]
+        results = self._render(requests, wait)
 
         return {
             'prompt': prompt,
-            'images': images,
-            'saved_paths': saved_paths,
-            'num_images': len(images)
+            'images': [result['image'] for result in results],
+            'saved_paths': [result['path'] for result in results],
+            'seeds': seeds,
+            'write_futures': [result['future'] for result in results],
+            'num_images': len(results)
         }
 
+    def measure_performance(self, prompt, num_images=1, seed=0, guidance_scale=7.5, num_inference_steps=None):
+        """
+        Run the pipeline once (nothing is saved) and report per-step UNet latency
+        (the first step includes the latents setup), VAE decode time and peak RSS
+        for the current profile.
+        Same path as generate: prompts are encoded through the embedding cache,
+        outside the autocast scope, and image i uses seed + i.
+        """
+        import torch
+
+        num_inference_steps = num_inference_steps or self.default_steps
+        pipeline = self.pipeline
+        seeds = [seed + i for i in range(num_images)]
+
+        # Timed from this call's own step-end callback, and the latents are decoded here:
+        # the registry pipeline is shared, so nothing on it is patched or hooked
+        step_ends = []
+
+        def on_step_end(pipe, step, timestep, callback_kwargs):
+            step_ends.append(time.perf_counter())
+            return callback_kwargs
+
+        with PeakRSSMonitor() as monitor:
+            start = time.perf_counter()
+            prompt_embeds = self.encode_prompts([prompt] * num_images)
+            negative_embeds = self.encode_prompts([""] * num_images)
+            with self._inference_context():
+                denoise_start = time.perf_counter()
+                latents = pipeline(
+                    prompt_embeds=torch.cat(prompt_embeds),
+                    negative_prompt_embeds=torch.cat(negative_embeds),
+                    generator=[torch.Generator("cpu").manual_seed(image_seed) for image_seed in seeds],
+                    guidance_scale=guidance_scale,
+                    num_inference_steps=num_inference_steps,
+                    output_type="latent",
+                    callback_on_step_end=on_step_end
+                ).images
+
+                decode_start = time.perf_counter()
+                with torch.no_grad():
+                    decoded = pipeline.vae.decode(latents / pipeline.vae.config.scaling_factor, return_dict=False)[0]
+                vae_seconds = time.perf_counter() - decode_start
+                pipeline.image_processor.postprocess(decoded, output_type="pil")
+            total_seconds = time.perf_counter() - start
+
+        # Each step: UNet (both guidance halves in one batch) plus the scheduler update
+        unet_times = [end - begin for begin, end in zip([denoise_start] + step_ends, step_ends)]
+        step_ms = sorted(t * 1000 for t in unet_times)
+        return {
+            'profile': self.profile,
+            'num_inference_steps': num_inference_steps,
+            'num_images': num_images,
+            'bf16_autocast': self.use_bf16,
+            'total_seconds': round(total_seconds, 3),
+            'unet_step_ms': {
+                'mean': round(sum(step_ms) / len(step_ms), 1) if step_ms else 0.0,
+                'p50': round(step_ms[len(step_ms) // 2], 1) if step_ms else 0.0,
+                'p95': round(step_ms[min(len(step_ms) - 1, int(len(step_ms) * 0.95))], 1) if step_ms else 0.0,
+                'all': [round(t * 1000, 1) for t in unet_times]
+            },
+            'vae_decode_ms': round(vae_seconds * 1000, 1),
+            'peak_rss_mb': round(monitor.peak_mb, 1),
+            'rss_growth_mb': round(monitor.growth_mb, 1)
+        }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundImageWriter:
+    def __init__(self, image_format="png", compress_level=6, workers=2, max_queue=8):
+        """
+        Encodes and saves PIL images on a thread pool, so the next diffusion batch
+        can start while the previous one is being compressed and written.
+        image_format is "png" (compress_level 0-9) or "webp" (always lossless).
+        At most max_queue images wait at once: submit() blocks when the queue is full.
+        """
+        if image_format not in ("png", "webp"):
+            raise ValueError(f"Unsupported image format: {image_format}")
+
+        self.image_format = image_format
+        self.compress_level = compress_level
+        self.extension = image_format
+        self.max_queue = max_queue
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-writer")
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._lock = threading.Lock()
+        self._pending = {}
+
+        self.images_written = 0
+        self.bytes_written = 0
+        self.write_seconds = 0.0
+        self.peak_queue_depth = 0
+
+    def submit(self, image, path):
+        """Queue an image for writing; returns a future resolving to the path"""
+        self._slots.acquire()
+        with self._lock:
+            self._pending[path] = image
+            self.peak_queue_depth = max(self.peak_queue_depth, len(self._pending))
+
+        future = self._executor.submit(self._write, image, path)
+        future.add_done_callback(lambda _: self._done(path))
+        return future
+
+    def pending_image(self, path):
+        """The image queued for path if it hasn't been written yet, else None"""
+        with self._lock:
+            return self._pending.get(path)
+
+    def _done(self, path):
+        with self._lock:
+            self._pending.pop(path, None)
+        self._slots.release()
+
+    def _write(self, image, path):
+        start = time.perf_counter()
+
+        # Write next to the target and rename, so a half-written file is never visible
+        tmp_path = f"{path}.tmp"
+        if self.image_format == "png":
+            image.save(tmp_path, format="PNG", compress_level=self.compress_level)
+        else:
+            image.save(tmp_path, format="WEBP", lossless=True)
+        os.replace(tmp_path, path)
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self.images_written += 1
+            self.bytes_written += size
+            self.write_seconds += time.perf_counter() - start
+        return path
+
+    def metrics(self):
+        """Write throughput (per busy writer second) and current/peak queue depth"""
+        with self._lock:
+            busy = self.write_seconds
+            return {
+                "images_written": self.images_written,
+                "bytes_written": self.bytes_written,
+                "write_seconds": round(busy, 3),
+                "images_per_second": round(self.images_written / busy, 2) if busy else 0.0,
+                "mb_per_second": round(self.bytes_written / 1024 ** 2 / busy, 2) if busy else 0.0,
+                "queue_depth": len(self._pending),
+                "peak_queue_depth": self.peak_queue_depth,
+                "max_queue": self.max_queue
+            }
+
+    def close(self):
+        """Wait for every queued image and stop the threads"""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,22 +1,99 @@
-from transformers import pipeline
+from core.instrumentation import instrumentation
+from core.lexicon import SentimentLexicon, cascade_report, lexicon_label
+from core.long_text import window_sentiment
+from core.model_registry import get_model_config, get_pipeline
+from core.result_cache import SentimentCache
+
+# Let's use a simpler, more reliable model that works well with Italian text
+SENTIMENT_MODEL = "nlptown/bert-base-multilingual-uncased-sentiment"
 
 
 class SentimentAnalyzer:
-    def __init__(self):
-        # Let's use a simpler, more reliable model that works well with Italian text
-        print("Loading sentiment analysis model... (this might take a moment)")
-        self.classifier = pipeline(
-            "sentiment-analysis",
-            model="nlptown/bert-base-multilingual-uncased-sentiment"
-        )
-        print("Model loaded! Ready to analyze some feelings 😊")
+    def __init__(self, cache_path=None, quantized=False, long_text=False, window_strategy="length_weighted",
+                 cascade_threshold=None, batch_size=32, verbose=True):
+        # The model itself is loaded on first use, through the shared model registry
+        # Texts per forward pass: analyze_batch on a long list runs several bounded batches
+        self.batch_size = batch_size
+        # quantized runs the int8 version of the model (see core.quantization)
+        self.quantized = quantized
+        # long_text classifies texts over the model limit in overlapping windows (see core.long_text)
+        self.long_text = long_text
+        self.window_strategy = window_strategy
+        model_id = f"{SENTIMENT_MODEL}:int8" if quantized else SENTIMENT_MODEL
+        if long_text:
+            model_id += f":window-{window_strategy}"
+        # Optional on-disk cache of results, so repeated texts skip the model
+        self.cache = SentimentCache(cache_path, model_id=model_id) if cache_path else None
+        # With cascade_threshold, short texts the lexicon is that sure about skip the model (see core.lexicon);
+        # their confidence is the lexicon's own and their source "lexicon"
+        self.cascade_threshold = cascade_threshold
+        self.lexicon = SentimentLexicon()
+        # verbose prints progress; the inference server turns it off, it calls analyze_batch per micro-batch
+        self.verbose = verbose
+
+    @property
+    def classifier(self):
+        return get_pipeline("sentiment-analysis", SENTIMENT_MODEL, quantized=self.quantized)
+
+    @property
+    def labels(self):
+        """id2label of the model, read from its config alone (the model may never load)"""
+        return get_model_config(SENTIMENT_MODEL).id2label
+
+    def _classify(self, texts):
+        """Run the classifier on a list of texts, going through the lexicon and the cache if enabled"""
+        if self.cascade_threshold is None:
+            return self._classify_with_model(texts)
+
+        decided, undecided = self.lexicon.split(texts, self.cascade_threshold)
+        instrumentation.count("sentiment_analyzer.lexicon_hit", len(decided))
+        results = dict(zip(undecided, self._classify_with_model(undecided))) if undecided else {}
+        if decided:
+            id2label = self.labels
+            results.update({text: {"label": lexicon_label(polarity, strong, id2label), "score": confidence,
+                                   "source": "lexicon"}
+                            for (text, _), (polarity, strong, confidence) in decided.items()})
+        return [results[text] for text in texts]
+
+    def _classify_with_model(self, texts):
+        with instrumentation.stage("sentiment_analyzer.classify", items=len(texts),
+                                   tokens=self._count_tokens(texts)):
+            if self.cache is None:
+                return self._run_classifier(texts)
+            return self.cache.classify(texts, self._run_classifier)
+
+    def _run_classifier(self, texts):
+        if self.long_text:
+            return window_sentiment(self.classifier, texts, self.window_strategy, batch_size=self.batch_size)
+        # Sorted by token length so each fixed-size batch pads to roughly the same size
+        classifier = self.classifier
+        token_ids = classifier.tokenizer(texts, truncation=True)['input_ids']
+        order = sorted(range(len(texts)), key=lambda i: len(token_ids[i]))
+
+        results = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, result in zip(batch, classifier([texts[i] for i in batch], batch_size=len(batch),
+                                                   truncation=True)):
+                results[i] = result
+        return results
+
+    def cascade_report(self, texts, thresholds=(0.5, 0.6, 0.7, 0.8, 0.9, 1.0)):
+        """Lexicon hit rate and agreement with the model per gate (see core.lexicon.cascade_report)"""
+        return cascade_report(self.lexicon, texts, self._run_classifier, self.labels, thresholds)
+
+    def _count_tokens(self, texts):
+        """Input tokens, computed only while instrumentation is on"""
+        if not instrumentation.enabled:
+            return 0
+        return sum(len(ids) for ids in self.classifier.tokenizer(texts, truncation=True)['input_ids'])
 
     def analyze(self, text):
         """
         Analyzes the sentiment of the given text.
         Returns a nice dictionary with the results.
         """
-        result = self.classifier(text)
+        result = self._classify([text])
 
         # Convert numeric labels to human-readable format
         sentiment_map = {
@@ -34,7 +111,8 @@ class SentimentAnalyzer:
             'text': text,
             'sentiment': human_label,
             'confidence': round(result[0]['score'], 3),
-            'raw_label': raw_label  # Keep the original for debugging
+            'raw_label': raw_label,  # Keep the original for debugging
+            'source': result[0].get('source', 'model')  # "lexicon" when the cascade answered
         }
 
     def analyze_batch(self, texts):
@@ -42,8 +120,9 @@ class SentimentAnalyzer:
         Analyzes a whole bunch of texts at once.
         More efficient than calling analyze() multiple times.
         """
-        print(f"Analyzing {len(texts)} texts in batch...")
-        results = self.classifier(texts)
+        if self.verbose:
+            print(f"Analyzing {len(texts)} texts in batch...")
+        results = self._classify(texts)
 
         sentiment_map = {
             'LABEL_1': 'Very Negative',
@@ -58,7 +137,8 @@ class SentimentAnalyzer:
                 'text': text,
                 'sentiment': sentiment_map.get(result['label'], result['label']),
                 'confidence': round(result['score'], 3),
-                'raw_label': result['label']
+                'raw_label': result['label'],
+                'source': result.get('source', 'model')
             }
             for text, result in zip(texts, results)
         ]
@@ -1,44 +1,131 @@
-from transformers import pipeline
+import re
+from core.instrumentation import instrumentation
+from core.model_registry import get_pipeline
+from core.translation_memory import TranslationMemory
+
+IT_EN_MODEL = "Helsinki-NLP/opus-mt-it-en"
+EN_IT_MODEL = "Helsinki-NLP/opus-mt-en-it"
+
+# Split after ., ! ? and … followed by whitespace, and at line breaks; the separator is captured
+SENTENCE_BOUNDARY = re.compile(r'((?<=[.!?…])\s+|\s*\n\s*)')
+
+
+def split_sentences(text):
+    """
+    [sentence, separator, sentence, ..., sentence] for a text, with the leading and
+    trailing whitespace as the first and last separators (empty sentences around them),
+    so "".join() of the parts gives the text back.
+    """
+    body = text.strip()
+    if not body:
+        return [text]
+    start = text.index(body)
+    return ["", text[:start], *SENTENCE_BOUNDARY.split(body), text[start + len(body):], ""]
 
 
 class Translator:
-    def __init__(self):
-        # Init pipeline for translations IT->EN and EN->IT
-        self.it_to_en = pipeline(
-            "translation",
-            model="Helsinki-NLP/opus-mt-it-en"
-        )
-        self.en_to_it = pipeline(
-            "translation",
-            model="Helsinki-NLP/opus-mt-en-it"
-        )
+    def __init__(self, sentence_mode=False, memory_path=None, batch_size=16, quantized=False):
+        """
+        With sentence_mode, texts are split into sentences and only sentences not
+        found in the translation memory (memory_path) go to the model, in
+        length-sorted batches of batch_size. Translations are reassembled in order,
+        with the original whitespace and line breaks between sentences.
+        Without it, whole texts go to the model batch_size at a time.
+        quantized runs the int8 versions of the models (see core.quantization).
+        """
+        # Pipelines for IT->EN and EN->IT are loaded on first use (see the properties below)
+        self.sentence_mode = sentence_mode
+        self.batch_size = batch_size
+        self.quantized = quantized
+        self.memory = TranslationMemory(memory_path) if memory_path else None
+
+    @property
+    def it_to_en(self):
+        return get_pipeline("translation", IT_EN_MODEL, quantized=self.quantized)
+
+    @property
+    def en_to_it(self):
+        return get_pipeline("translation", EN_IT_MODEL, quantized=self.quantized)
+
+    def _translate(self, texts, translator, model):
+        """Translate a list of texts with the given pipeline, honouring sentence_mode"""
+        if self.quantized:
+            # int8 translations are kept apart from the float32 ones in the memory
+            model = f"{model}:int8"
+        if not self.sentence_mode:
+            with instrumentation.stage(f"translator.{model}", items=len(texts),
+                                       tokens=self._count_tokens(texts, translator)):
+                results = translator(texts, batch_size=self.batch_size)
+                return [result['translation_text'] for result in results]
+
+        # Even parts are sentences, odd ones the separators to put back
+        split_texts = [split_sentences(text) for text in texts]
+        sentences = list(dict.fromkeys(TranslationMemory.normalize(s)
+                                       for parts in split_texts for s in parts[0::2] if s.strip()))
+
+        translated = self.memory.get_many(model, sentences) if self.memory else {}
+        missing = sorted((s for s in sentences if s not in translated), key=len)
+
+        fresh = {}
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            with instrumentation.stage(f"translator.{model}", items=len(batch),
+                                       tokens=self._count_tokens(batch, translator)):
+                results = translator(batch, batch_size=len(batch))
+            fresh.update((sentence, result['translation_text']) for sentence, result in zip(batch, results))
+
+        if self.memory and fresh:
+            self.memory.put_many(model, fresh)
+        translated.update(fresh)
+
+        return ["".join(translated[TranslationMemory.normalize(part)] if i % 2 == 0 and part.strip() else part
+                        for i, part in enumerate(parts))
+                for parts in split_texts]
+
+    def _count_tokens(self, texts, translator):
+        """Source tokens, computed only while instrumentation is on"""
+        if not instrumentation.enabled:
+            return 0
+        return sum(len(ids) for ids in translator.tokenizer(texts, truncation=True)['input_ids'])
 
     def translate_it_to_en(self, text):
-        result = self.it_to_en(text)
+        translated = self._translate([text], self.it_to_en, IT_EN_MODEL)
         return {
             'original': text,
-            'translated': result[0]['translation_text'],
+            'translated': translated[0],
             'direction': 'IT -> EN'
         }
 
     def translate_en_to_it(self, text):
-        result = self.en_to_it(text)
+        translated = self._translate([text], self.en_to_it, EN_IT_MODEL)
         return {
             'original': text,
-            'translated': result[0]['translation_text'],
+            'translated': translated[0],
             'direction': 'EN -> IT'
         }
 
     def translate_batch_it_to_en(self, texts):
         """Translate a list of texts from It to En"""
-        results = self.it_to_en(texts)
+        translated = self._translate(texts, self.it_to_en, IT_EN_MODEL)
         return [
             {
                 'original': text,
-                'translated': result['translation_text'],
+                'translated': translation,
                 'direction': 'IT -> EN'
             }
-            for text, result in zip(texts, results)
+            for text, translation in zip(texts, translated)
+        ]
+
+    def translate_batch_en_to_it(self, texts):
+        """Translate a list of texts from En to It"""
+        translated = self._translate(texts, self.en_to_it, EN_IT_MODEL)
+        return [
+            {
+                'original': text,
+                'translated': translation,
+                'direction': 'EN -> IT'
+            }
+            for text, translation in zip(texts, translated)
         ]
 
 
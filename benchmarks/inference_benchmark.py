@@ -0,0 +1,299 @@
+"""
+Inference benchmark for every model-backed code path.
+
+Runs fully offline on the tiny stand-in models of benchmarks.tiny_models
+(--real-models uses the real checkpoints instead) and reports, per scenario,
+throughput, p50/p95/p99 latency per call and peak RSS as JSON. Models are
+loaded and warmed up before anything is timed. With --baseline, the run is
+compared with a previous report and exits with status 1 when a scenario got
+slower (or bigger) than the tolerance allows.
+
+    python -m benchmarks.inference_benchmark --output baseline.json
+    python -m benchmarks.inference_benchmark --baseline baseline.json --tolerance 0.15
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from core.constants import SAMPLE_REVIEWS
+from core.memory_monitor import PeakRSSMonitor
+
+ENGLISH_TEXTS = [
+    "Hello, how are you? I hope you are doing well.",
+    "The room was clean and the staff very friendly.",
+    "Breakfast was good but the bathroom was dirty.",
+    "Great location, terrible parking.",
+    "The pool had a beautiful view of the city.",
+    "Noisy room, uncomfortable bed, expensive price.",
+]
+
+IMAGE_PROMPTS = [
+    "A cute cat wearing a space helmet, digital art",
+    "A futuristic city in the base of mountains and a sunset in the background",
+]
+
+
+def italian_texts(count):
+    """Positive/negative review texts from the sample data, repeated up to count"""
+    texts = [text for review in SAMPLE_REVIEWS
+             for text in (review.get("contenuto_positivo"), review.get("contenuto_negativo")) if text]
+    return [texts[i % len(texts)] for i in range(count)]
+
+
+def english_texts(count):
+    return [ENGLISH_TEXTS[i % len(ENGLISH_TEXTS)] for i in range(count)]
+
+
+# A scenario builds (warmup, calls): warmup loads the models, each call is one
+# timed request returning how many items it processed.
+
+def sentiment_analyze(size, batch_size, workdir):
+    from ai.sentiment_analyzer import SentimentAnalyzer
+    analyzer = SentimentAnalyzer()
+    texts = italian_texts(size)
+
+    def call(text):
+        analyzer.analyze(text)
+        return 1
+
+    return (lambda: analyzer.analyze(texts[0])), [lambda text=text: call(text) for text in texts]
+
+
+def sentiment_analyze_batch(size, batch_size, workdir):
+    from ai.sentiment_analyzer import SentimentAnalyzer
+    analyzer = SentimentAnalyzer()
+    texts = italian_texts(size)
+    batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+
+    def call(batch):
+        analyzer.analyze_batch(batch)
+        return len(batch)
+
+    return (lambda: analyzer.analyze_batch(texts[:2])), [lambda batch=batch: call(batch) for batch in batches]
+
+
+def translate_it_to_en(size, batch_size, workdir):
+    from ai.translator import Translator
+    translator = Translator()
+    texts = italian_texts(size)
+
+    def call(text):
+        translator.translate_it_to_en(text)
+        return 1
+
+    return (lambda: translator.translate_it_to_en(texts[0])), [lambda text=text: call(text) for text in texts]
+
+
+def translate_en_to_it(size, batch_size, workdir):
+    from ai.translator import Translator
+    translator = Translator()
+    texts = english_texts(size)
+
+    def call(text):
+        translator.translate_en_to_it(text)
+        return 1
+
+    return (lambda: translator.translate_en_to_it(texts[0])), [lambda text=text: call(text) for text in texts]
+
+
+def review_analysis(size, batch_size, workdir):
+    from core.review_analyzer import BookingReviewAnalyzer
+    analyzer = BookingReviewAnalyzer()
+    reviews = [SAMPLE_REVIEWS[i % len(SAMPLE_REVIEWS)] for i in range(size)]
+    chunks = [reviews[start:start + batch_size] for start in range(0, len(reviews), batch_size)]
+
+    def call(chunk):
+        analyzer.analyze_reviews(chunk, batch_size=batch_size)
+        return len(chunk)
+
+    return (lambda: analyzer.analyze_reviews(reviews[:2])), [lambda chunk=chunk: call(chunk) for chunk in chunks]
+
+
+def image_generation(size, batch_size, workdir, num_inference_steps=4):
+    from ai.image_generator import ImageGenerator
+    generator = ImageGenerator(output_dir=os.path.join(workdir, "images"))
+    # A new seed per call, so nothing is served from the saved images
+    seeds = iter(range(10 ** 6))
+    num_calls = max(1, size // 8)
+
+    def call(prompt):
+        generator.generate(prompt, seed=next(seeds), num_inference_steps=num_inference_steps)
+        return 1
+
+    warmup = lambda: generator.generate(IMAGE_PROMPTS[0], seed=next(seeds), num_inference_steps=1)
+    return warmup, [lambda i=i: call(IMAGE_PROMPTS[i % len(IMAGE_PROMPTS)]) for i in range(num_calls)]
+
+
+SCENARIOS = {
+    "sentiment.analyze": sentiment_analyze,
+    "sentiment.analyze_batch": sentiment_analyze_batch,
+    "translation.it_to_en": translate_it_to_en,
+    "translation.en_to_it": translate_en_to_it,
+    "review_analysis": review_analysis,
+    "image_generation": image_generation,
+}
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(name, size=32, batch_size=8, repeat=3):
+    """Warm up, then time every call of the scenario repeat times"""
+    workdir = tempfile.mkdtemp(prefix="inference-benchmark-")
+    try:
+        # The library code prints progress for every call, keep it out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            warmup, calls = SCENARIOS[name](size, batch_size, workdir)
+            start = time.perf_counter()
+            warmup()
+            warmup_seconds = time.perf_counter() - start
+
+            latencies = []
+            items = 0
+            with PeakRSSMonitor() as monitor:
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    for call in calls:
+                        call_start = time.perf_counter()
+                        items += call()
+                        latencies.append(time.perf_counter() - call_start)
+                total_seconds = time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    latency_ms = sorted(t * 1000 for t in latencies)
+    return {
+        "scenario": name,
+        "calls": len(latencies),
+        "items": items,
+        "total_seconds": round(total_seconds, 3),
+        "items_per_second": round(items / total_seconds, 2) if total_seconds else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latency_ms) / len(latency_ms), 2) if latency_ms else 0.0,
+            "p50": round(percentile(latency_ms, 50), 2),
+            "p95": round(percentile(latency_ms, 95), 2),
+            "p99": round(percentile(latency_ms, 99), 2)
+        },
+        "warmup_seconds": round(warmup_seconds, 3),
+        "peak_rss_mb": round(monitor.peak_mb, 1),
+        "rss_growth_mb": round(monitor.growth_mb, 1)
+    }
+
+
+def environment(real_models):
+    import torch
+    return {
+        "models": "real" if real_models else "tiny",
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "cpu_count": os.cpu_count(),
+        "machine": platform.machine()
+    }
+
+
+def run(scenarios=None, size=32, batch_size=8, repeat=3, real_models=False):
+    """Benchmark the scenarios (default: all) and return the JSON report"""
+    if not real_models:
+        from benchmarks import tiny_models
+        tiny_models.install()
+
+    results = []
+    for name in scenarios or SCENARIOS:
+        print(f"Running {name}...")
+        results.append(run_scenario(name, size, batch_size, repeat))
+
+    return {
+        "environment": environment(real_models),
+        "settings": {"size": size, "batch_size": batch_size, "repeat": repeat},
+        "scenarios": results
+    }
+
+
+def compare(report, baseline, tolerance=0.15):
+    """
+    Per scenario in both reports: relative change of throughput, p95 latency and
+    peak RSS, and whether any of them got worse by more than tolerance.
+    """
+    baseline_scenarios = {result["scenario"]: result for result in baseline["scenarios"]}
+    comparison = []
+    for result in report["scenarios"]:
+        before = baseline_scenarios.get(result["scenario"])
+        if before is None:
+            continue
+
+        def change(after_value, before_value):
+            return round(after_value / before_value - 1, 3) if before_value else 0.0
+
+        throughput = change(result["items_per_second"], before["items_per_second"])
+        p95 = change(result["latency_ms"]["p95"], before["latency_ms"]["p95"])
+        peak_rss = change(result["peak_rss_mb"], before["peak_rss_mb"])
+        comparison.append({
+            "scenario": result["scenario"],
+            "throughput_change": throughput,
+            "p95_change": p95,
+            "peak_rss_change": peak_rss,
+            "regression": throughput < -tolerance or p95 > tolerance or peak_rss > tolerance
+        })
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput/latency/memory benchmark of the inference paths")
+    parser.add_argument("--scenarios", nargs="*", choices=list(SCENARIOS), help="scenarios to run (default: all)")
+    parser.add_argument("--size", type=int, default=32, help="texts/reviews per pass (images: size // 8)")
+    parser.add_argument("--batch-size", type=int, default=8, help="texts per analyze_batch call, reviews per chunk")
+    parser.add_argument("--repeat", type=int, default=3, help="timed passes over the workload")
+    parser.add_argument("--real-models", action="store_true", help="use the real checkpoints (downloads them)")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    parser.add_argument("--baseline", help="previous report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown vs the baseline")
+    args = parser.parse_args()
+
+    report = run(args.scenarios, args.size, args.batch_size, args.repeat, args.real_models)
+
+    print("=== Inference Benchmark ===")
+    env = report["environment"]
+    print(f"{env['models']} models | torch {env['torch']} | {env['torch_threads']} threads | {env['cpu_count']} CPUs")
+    for result in report["scenarios"]:
+        latency = result["latency_ms"]
+        print(f"{result['scenario']}: {result['items_per_second']} items/s | p50 {latency['p50']}ms"
+              f" | p95 {latency['p95']}ms | p99 {latency['p99']}ms | peak RSS {result['peak_rss_mb']}MB")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["environment"]["models"] != env["models"]:
+            print(f"⚠️ Baseline was run with {baseline['environment']['models']} models, this run with {env['models']}")
+        report["comparison"] = compare(report, baseline, args.tolerance)
+
+        print(f"=== Compared with {args.baseline} (tolerance {args.tolerance:.0%}) ===")
+        for row in report["comparison"]:
+            status = "❌" if row["regression"] else "✅"
+            print(f"{status} {row['scenario']}: throughput {row['throughput_change']:+.1%}"
+                  f" | p95 {row['p95_change']:+.1%} | peak RSS {row['peak_rss_change']:+.1%}")
+        regressions = [row["scenario"] for row in report["comparison"] if row["regression"]]
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if regressions:
+        print(f"Regression in: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Load test for core.inference_server.
+
+Starts the server in-process (tiny stand-in models unless --real-models),
+then concurrent keep-alive clients send single-text requests to one
+endpoint. Every max_batch_size in --batch-sizes is measured separately:
+max_batch_size 1 is one forward pass per request, the baseline for the
+dynamic batching speedup.
+
+    python -m benchmarks.service_benchmark --endpoint sentiment --clients 64 --requests 20
+"""
+import argparse
+import asyncio
+import json
+import time
+from benchmarks.inference_benchmark import english_texts, italian_texts, percentile
+from core.constants import SAMPLE_REVIEWS
+
+
+def payloads(endpoint, count):
+    if endpoint == "sentiment":
+        return [{"text": text} for text in italian_texts(count)]
+    if endpoint == "translate_it_to_en":
+        return [{"text": text, "direction": "it_to_en"} for text in italian_texts(count)]
+    if endpoint == "translate_en_to_it":
+        return [{"text": text, "direction": "en_to_it"} for text in english_texts(count)]
+    return [{"reviews": [SAMPLE_REVIEWS[i % len(SAMPLE_REVIEWS)]]} for i in range(count)]
+
+
+PATHS = {"sentiment": "/sentiment", "translate_it_to_en": "/translate", "translate_en_to_it": "/translate",
+         "reviews": "/reviews"}
+
+
+async def _client(port, path, bodies, latencies, statuses):
+    """One keep-alive connection sending its requests one after the other"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for body in bodies:
+            data = json.dumps(body).encode("utf-8")
+            start = time.perf_counter()
+            writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data)
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def load_test(endpoint, max_batch_size, clients=64, requests_per_client=20, max_wait_ms=10):
+    """Throughput and latency of the endpoint under clients concurrent connections"""
+    from core.inference_server import InferenceServer
+
+    server = InferenceServer(port=0, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+                             max_queue=clients * 4)
+    await server.start()
+    try:
+        path = PATHS[endpoint]
+        bodies = payloads(endpoint, clients * requests_per_client)
+        # Warm-up request, so lazy initialisation isn't timed
+        await _client(server.port, path, bodies[:1], [], {})
+
+        latencies = []
+        statuses = {}
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            _client(server.port, path, bodies[i::clients], latencies, statuses) for i in range(clients)
+        ])
+        seconds = time.perf_counter() - start
+        stats = await server._stats({})
+    finally:
+        await server.close()
+
+    latency_ms = sorted(t * 1000 for t in latencies)
+    batcher = "reviews" if endpoint == "reviews" else endpoint.replace("translate_", "")
+    return {
+        "endpoint": endpoint,
+        "max_batch_size": max_batch_size,
+        "clients": clients,
+        "requests": len(latencies),
+        "statuses": statuses,
+        "requests_per_second": round(len(latencies) / seconds, 1),
+        "latency_ms": {
+            "p50": round(percentile(latency_ms, 50), 1),
+            "p95": round(percentile(latency_ms, 95), 1),
+            "p99": round(percentile(latency_ms, 99), 1),
+            "max": round(latency_ms[-1], 1) if latency_ms else 0.0
+        },
+        "mean_batch_size": stats["endpoints"][batcher]["mean_batch_size"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dynamic batching load test of the inference server")
+    parser.add_argument("--endpoint", choices=list(PATHS), default="sentiment")
+    parser.add_argument("--clients", type=int, default=64, help="concurrent connections")
+    parser.add_argument("--requests", type=int, default=20, help="requests per connection")
+    parser.add_argument("--batch-sizes", type=int, nargs="*", default=[1, 8, 32], help="max_batch_size values")
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--real-models", action="store_true", help="use the real checkpoints (downloads them)")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    args = parser.parse_args()
+
+    if not args.real_models:
+        from benchmarks import tiny_models
+        tiny_models.install()
+
+    runs = []
+    for max_batch_size in args.batch_sizes:
+        print(f"Running max_batch_size={max_batch_size}...")
+        runs.append(asyncio.run(load_test(args.endpoint, max_batch_size, args.clients, args.requests,
+                                          args.max_wait_ms)))
+
+    print("=== Service Benchmark ===")
+    baseline = runs[0]["requests_per_second"]
+    for run in runs:
+        latency = run["latency_ms"]
+        print(f"max_batch_size {run['max_batch_size']:>3}: {run['requests_per_second']:>8} req/s"
+              f" ({run['requests_per_second'] / baseline:.1f}x) | mean batch {run['mean_batch_size']}"
+              f" | p50 {latency['p50']}ms | p95 {latency['p95']}ms | p99 {latency['p99']}ms"
+              f" | statuses {run['statuses']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"runs": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Startup benchmark for the entry points.
+
+Every feature is measured in a fresh interpreter: how long importing its
+module takes, which heavy frameworks that import dragged in, and (with
+--first-result) the time until the first result comes back, models included.
+Exits with status 1 when an import is slower than the threshold or loads a
+heavy framework it shouldn't, so it can run in CI or before deploying cron jobs.
+
+    python -m benchmarks.startup_benchmark
+    python -m benchmarks.startup_benchmark --first-result --output startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Frameworks no entry point should pull in at import time
+HEAVY_MODULES = ["torch", "transformers", "diffusers", "keybert", "sentence_transformers", "sklearn"]
+
+# feature -> (import statement, code producing the first result)
+FEATURES = {
+    "menu": ("import main", None),
+    "sentiment": (
+        "from ai.sentiment_analyzer import SentimentAnalyzer",
+        "SentimentAnalyzer().analyze('Che bella giornata!')"
+    ),
+    "translation": (
+        "from ai.translator import Translator",
+        "Translator().translate_it_to_en('Ciao, come stai?')"
+    ),
+    "image_generation": (
+        "from ai.image_generator import ImageGenerator",
+        "ImageGenerator().generate('A cute cat', num_images=1, num_inference_steps=1)"
+    ),
+    "review_analysis": (
+        "from core.review_analyzer import BookingReviewAnalyzer",
+        "from core.constants import SAMPLE_REVIEWS; BookingReviewAnalyzer().analyze_reviews(SAMPLE_REVIEWS[:1])"
+    ),
+}
+
+MARKER = "STARTUP_BENCHMARK_RESULT "
+
+SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+{import_statement}
+import_seconds = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+first_result_seconds = None
+if {run_first}:
+    {first_result}
+    first_result_seconds = time.perf_counter() - start
+print({marker!r} + json.dumps({{
+    "import_seconds": round(import_seconds, 4),
+    "heavy_modules_imported": heavy,
+    "first_result_seconds": None if first_result_seconds is None else round(first_result_seconds, 3)
+}}))
+"""
+
+
+def measure(feature, first_result=False):
+    """Run one feature in a fresh interpreter and return its timings"""
+    import_statement, first_result_code = FEATURES[feature]
+    run_first = first_result and first_result_code is not None
+    code = SNIPPET.format(
+        import_statement=import_statement,
+        heavy=HEAVY_MODULES,
+        run_first=run_first,
+        first_result=first_result_code or "pass",
+        marker=MARKER
+    )
+    completed = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"feature": feature, "error": completed.stderr.strip().splitlines()[-1:]}
+
+    line = next(line for line in completed.stdout.splitlines() if line.startswith(MARKER))
+    return {"feature": feature, **json.loads(line[len(MARKER):])}
+
+
+def run(features=None, first_result=False, repeat=3, max_import_seconds=0.5):
+    """
+    Measure every feature (best of repeat runs for the import time) and flag
+    regressions: imports slower than max_import_seconds or pulling in heavy modules.
+    """
+    results = []
+    for feature in features or FEATURES:
+        runs = [measure(feature) for _ in range(repeat)]
+        if first_result:
+            runs.append(measure(feature, first_result=True))
+
+        errors = [r for r in runs if "error" in r]
+        if errors:
+            results.append({**errors[0], "regression": True})
+            continue
+
+        result = min(runs, key=lambda r: r["import_seconds"])
+        result["first_result_seconds"] = runs[-1]["first_result_seconds"] if first_result else None
+        result["regression"] = bool(result["import_seconds"] > max_import_seconds
+                                    or result["heavy_modules_imported"])
+        results.append(result)
+
+    return {"max_import_seconds": max_import_seconds, "features": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark for the entry points")
+    parser.add_argument("--features", nargs="*", choices=list(FEATURES), help="features to measure (default: all)")
+    parser.add_argument("--first-result", action="store_true", help="also time the first result (loads models)")
+    parser.add_argument("--repeat", type=int, default=3, help="import runs per feature, best one is kept")
+    parser.add_argument("--max-import-seconds", type=float, default=0.5, help="regression threshold")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = run(args.features, args.first_result, args.repeat, args.max_import_seconds)
+
+    print("=== Startup Benchmark ===")
+    for result in report["features"]:
+        if "error" in result:
+            print(f"❌ {result['feature']}: failed ({' '.join(result['error'])})")
+            continue
+        status = "❌" if result["regression"] else "✅"
+        line = f"{status} {result['feature']}: import {result['import_seconds']}s"
+        if result["heavy_modules_imported"]:
+            line += f" | heavy modules: {', '.join(result['heavy_modules_imported'])}"
+        if result["first_result_seconds"] is not None:
+            line += f" | first result {result['first_result_seconds']}s"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    regressions = [r["feature"] for r in report["features"] if r["regression"]]
+    if regressions:
+        print(f"Regression in: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Tiny randomly-initialized stand-ins for every model the repo uses.
+
+Same architectures as the real checkpoints (XLM-R and BERT sequence
+classifiers, Marian, DistilBERT behind KeyBERT, a miniature Stable Diffusion
+UNet/VAE/CLIP), just a few layers wide, built in memory with no downloads.
+install() registers them in the model registry under the real model keys,
+so the unchanged code paths pick them up:
+
+    from benchmarks import tiny_models
+    tiny_models.install()
+    SentimentAnalyzer().analyze("Che bella giornata!")   # runs the tiny BERT
+
+Outputs are meaningless; timings are only comparable with other tiny runs.
+"""
+import functools
+import os
+import re
+import tempfile
+from core.constants import SAMPLE_REVIEWS
+
+HIDDEN_SIZE = 64
+NUM_LAYERS = 2
+NUM_HEADS = 4
+INTERMEDIATE_SIZE = 128
+
+SPECIAL_TOKENS = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+PAD_ID, UNK_ID, CLS_ID, SEP_ID = 0, 1, 2, 3
+
+EXTRA_WORDS = """the a an and or but is was were are be been very really not no room rooms hotel staff
+breakfast clean dirty noisy quiet friendly rude location great good bad terrible excellent comfortable
+bed beds bathroom shower pool view price expensive cheap service parking wifi restaurant bar helpful
+hello how you hope doing well cat space helmet city mountains sunset digital art""".split()
+
+
+@functools.lru_cache(maxsize=None)
+def tokenizer(model_max_length=512):
+    """
+    WordPiece tokenizer over the words of the sample reviews (plus single
+    characters), so sequence lengths stay close to a real subword vocabulary.
+    """
+    from tokenizers import Tokenizer, models, normalizers, pre_tokenizers, processors
+    from transformers import PreTrainedTokenizerFast
+
+    text = " ".join(
+        f"{review.get('titolo') or ''} {review.get('contenuto_positivo') or ''} {review.get('contenuto_negativo') or ''}"
+        for review in SAMPLE_REVIEWS
+    ).lower()
+    words = sorted(set(re.findall(r"\w+", text)) | set(EXTRA_WORDS))
+    chars = sorted(set("".join(words)) | set("abcdefghijklmnopqrstuvwxyz0123456789.,;:!?'\"()-…"))
+    vocab = {token: i for i, token in enumerate(
+        SPECIAL_TOKENS + chars + [f"##{char}" for char in chars] + [w for w in words if w not in chars]
+    )}
+
+    backend = Tokenizer(models.WordPiece(vocab, unk_token="[UNK]"))
+    backend.normalizer = normalizers.BertNormalizer(lowercase=True)
+    backend.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    backend.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]",
+        pair="[CLS] $A [SEP] $B [SEP]",
+        special_tokens=[("[CLS]", CLS_ID), ("[SEP]", SEP_ID)]
+    )
+    return PreTrainedTokenizerFast(
+        tokenizer_object=backend,
+        model_max_length=model_max_length,
+        unk_token="[UNK]", pad_token="[PAD]", cls_token="[CLS]", sep_token="[SEP]", mask_token="[MASK]"
+    )
+
+
+def _seed():
+    import torch
+    torch.manual_seed(0)
+
+
+def sentiment_pipeline(architecture, num_labels):
+    """text-classification pipeline on a tiny "xlm-roberta" or "bert" classifier"""
+    from transformers import (BertConfig, BertForSequenceClassification, XLMRobertaConfig,
+                              XLMRobertaForSequenceClassification, pipeline)
+
+    _seed()
+    tok = tokenizer()
+    sizes = dict(vocab_size=len(tok), hidden_size=HIDDEN_SIZE, num_hidden_layers=NUM_LAYERS,
+                 num_attention_heads=NUM_HEADS, intermediate_size=INTERMEDIATE_SIZE,
+                 num_labels=num_labels, pad_token_id=PAD_ID)
+    if architecture == "xlm-roberta":
+        # Positions start after the padding index, like the real XLM-R
+        model = XLMRobertaForSequenceClassification(XLMRobertaConfig(max_position_embeddings=514, **sizes))
+    else:
+        model = BertForSequenceClassification(BertConfig(max_position_embeddings=512, **sizes))
+    return pipeline("sentiment-analysis", model=model.eval(), tokenizer=tok)
+
+
+def sentiment_config(num_labels):
+    """Config of a tiny classifier: the label map the lexicon cascade reads without loading the model"""
+    from transformers import PretrainedConfig
+    return PretrainedConfig(num_labels=num_labels)
+
+
+class TinyTranslationPipeline:
+    """
+    Does what the transformers translation pipeline does (batched tokenize,
+    generate, decode) with the same call signature; newer transformers
+    releases no longer ship the "translation" task.
+    """
+
+    def __init__(self, model, tokenizer):
+        self.model = model
+        self.tokenizer = tokenizer
+
+    def __call__(self, texts, batch_size=None):
+        import torch
+
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        batch_size = batch_size or 1
+
+        results = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                    return_tensors="pt")
+            with torch.no_grad():
+                output_ids = self.model.generate(**inputs)
+            results.extend({"translation_text": text}
+                           for text in self.tokenizer.batch_decode(output_ids, skip_special_tokens=True))
+        return results[0] if single else results
+
+
+def translation_pipeline():
+    """Translation on a tiny Marian encoder-decoder (beam search like opus-mt)"""
+    from transformers import GenerationConfig, MarianConfig, MarianMTModel
+
+    _seed()
+    tok = tokenizer()
+    config = MarianConfig(
+        vocab_size=len(tok), d_model=HIDDEN_SIZE, encoder_layers=NUM_LAYERS, decoder_layers=NUM_LAYERS,
+        encoder_attention_heads=NUM_HEADS, decoder_attention_heads=NUM_HEADS,
+        encoder_ffn_dim=INTERMEDIATE_SIZE, decoder_ffn_dim=INTERMEDIATE_SIZE, max_position_embeddings=512,
+        pad_token_id=PAD_ID, eos_token_id=SEP_ID, decoder_start_token_id=PAD_ID
+    )
+    model = MarianMTModel(config).eval()
+    # A random model rarely emits EOS: cap the output so every call does the same work
+    model.generation_config = GenerationConfig(
+        num_beams=4, max_length=48, pad_token_id=PAD_ID, eos_token_id=SEP_ID, decoder_start_token_id=PAD_ID
+    )
+    return TinyTranslationPipeline(model, tok)
+
+
+def keybert_model():
+    """KeyBERT over a mean-pooled tiny DistilBERT sentence-transformer"""
+    from keybert import KeyBERT
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import DistilBertConfig, DistilBertModel
+
+    _seed()
+    tok = tokenizer()
+    model = DistilBertModel(DistilBertConfig(
+        vocab_size=len(tok), dim=HIDDEN_SIZE, n_layers=NUM_LAYERS, n_heads=NUM_HEADS,
+        hidden_dim=INTERMEDIATE_SIZE, max_position_embeddings=512, pad_token_id=PAD_ID
+    ))
+
+    # sentence-transformers loads its Transformer module from a directory
+    path = tempfile.mkdtemp(prefix="tiny-distilbert-")
+    model.save_pretrained(path)
+    tok.save_pretrained(path)
+    transformer = models.Transformer(path, max_seq_length=128)
+    pooling = models.Pooling(HIDDEN_SIZE, pooling_mode="mean")
+    return KeyBERT(SentenceTransformer(modules=[transformer, pooling], device="cpu"))
+
+
+def diffusion_pipeline(device, torch_dtype):
+    """StableDiffusionPipeline with a miniature CLIP text encoder, UNet and VAE (16x16 images)"""
+    from diffusers import AutoencoderKL, PNDMScheduler, StableDiffusionPipeline, UNet2DConditionModel
+    from transformers import CLIPTextConfig, CLIPTextModel
+
+    _seed()
+    tok = tokenizer(model_max_length=77)
+    text_encoder = CLIPTextModel(CLIPTextConfig(
+        vocab_size=len(tok), hidden_size=32, intermediate_size=64, num_hidden_layers=NUM_LAYERS,
+        num_attention_heads=NUM_HEADS, max_position_embeddings=77,
+        bos_token_id=CLS_ID, eos_token_id=SEP_ID, pad_token_id=PAD_ID
+    ))
+    unet = UNet2DConditionModel(
+        sample_size=8, in_channels=4, out_channels=4, block_out_channels=(32, 64), layers_per_block=1,
+        down_block_types=("CrossAttnDownBlock2D", "DownBlock2D"), up_block_types=("UpBlock2D", "CrossAttnUpBlock2D"),
+        cross_attention_dim=32, attention_head_dim=8, norm_num_groups=32
+    )
+    vae = AutoencoderKL(
+        in_channels=3, out_channels=3, block_out_channels=[32, 64], latent_channels=4, norm_num_groups=32,
+        down_block_types=["DownEncoderBlock2D"] * 2, up_block_types=["UpDecoderBlock2D"] * 2, sample_size=16
+    )
+    pipeline = StableDiffusionPipeline(
+        vae=vae, text_encoder=text_encoder, tokenizer=tok, unet=unet,
+        scheduler=PNDMScheduler(skip_prk_steps=True),
+        safety_checker=None, feature_extractor=None, requires_safety_checker=False
+    )
+    pipeline.set_progress_bar_config(disable=True)
+    return pipeline.to(device=device, dtype=torch_dtype)
+
+
+def install():
+    """
+    Register the tiny models under the keys of the real ones (nothing is built
+    until first use) and make sure nothing tries to reach the Hugging Face Hub.
+    """
+    os.environ["HF_HUB_OFFLINE"] = "1"
+    os.environ["TRANSFORMERS_OFFLINE"] = "1"
+
+    import torch
+    from ai import image_generator, sentiment_analyzer, translator
+    from ai.image_profiles import PROFILES, configure_pipeline
+    from core import review_analyzer
+    from core.model_registry import diffusion_pipeline_key, registry
+    from core.quantization import quantize_pipeline
+
+    pipelines = {
+        f"sentiment-analysis:{review_analyzer.SENTIMENT_MODEL}":
+            lambda: sentiment_pipeline("xlm-roberta", num_labels=3),
+        f"sentiment-analysis:{sentiment_analyzer.SENTIMENT_MODEL}":
+            lambda: sentiment_pipeline("bert", num_labels=5),
+        f"translation:{translator.IT_EN_MODEL}": translation_pipeline,
+        f"translation:{translator.EN_IT_MODEL}": translation_pipeline,
+    }
+    for key, loader in pipelines.items():
+        registry.register(key, loader)
+        # Same weights, int8 (quantized=True in the classes)
+        registry.register(f"{key}:int8", functools.partial(lambda loader: quantize_pipeline(loader()), loader))
+    registry.register(f"keybert:{review_analyzer.KEYBERT_MODEL}", keybert_model)
+    for model, num_labels in ((review_analyzer.SENTIMENT_MODEL, 3), (sentiment_analyzer.SENTIMENT_MODEL, 5)):
+        registry.register(f"config:{model}", functools.partial(sentiment_config, num_labels))
+
+    # Same device/dtype choice as ImageGenerator, one pipeline per profile
+    device = "mps" if torch.backends.mps.is_available() else "cpu"
+    torch_dtype = torch.float16 if device == "mps" else torch.float32
+    for profile in PROFILES:
+        registry.register(
+            diffusion_pipeline_key(image_generator.DIFFUSION_MODEL, device, torch_dtype, profile),
+            functools.partial(lambda profile: configure_pipeline(diffusion_pipeline(device, torch_dtype), profile),
+                              profile)
+        )
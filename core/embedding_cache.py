@@ -0,0 +1,145 @@
+import sqlite3
+import time
+import unicodedata
+import numpy as np
+
+
+class EmbeddingCache:
+    def __init__(self, path="embedding_cache.sqlite", model_name="", max_entries=200_000, touch_interval=3600):
+        """
+        On-disk cache of phrase embeddings keyed by (model name, normalized phrase).
+        Vectors are stored as float16 blobs and the least recently used ones are
+        evicted once max_entries is exceeded (down to 90% of it, so eviction is rare).
+        SQLite in WAL mode lets several analyzer processes read the file at once.
+        Reads don't write: recency is only refreshed for hits older than
+        touch_interval seconds, and those updates are batched into the next write.
+        """
+        self.path = path
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        # Phrases whose last_used is due for a refresh, written with the next put_many
+        self._touched = set()
+
+        # The pipelined analyzer uses the cache from its stage thread (one thread at a time)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " phrase TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, phrase))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self.conn.commit()
+        # Upper bound on the rows in the file (other processes may evict), recounted only past max_entries
+        self._entries = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def normalize(phrase):
+        """Unicode NFC + collapsed whitespace. Case is kept: the model may be cased."""
+        return " ".join(unicodedata.normalize("NFC", phrase).split())
+
+    def get_many(self, phrases):
+        """Return {normalized phrase: float32 vector} for the phrases already cached"""
+        keys = list(dict.fromkeys(self.normalize(p) for p in phrases))
+        found = {}
+
+        # Stay well below SQLite's limit on query parameters
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT phrase, vector, last_used FROM embeddings WHERE model = ? AND phrase IN ({placeholders})",
+                [self.model_name, *chunk]
+            ).fetchall()
+            stale = time.time() - self.touch_interval
+            for phrase, blob, last_used in rows:
+                found[phrase] = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+                if last_used < stale:
+                    self._touched.add(phrase)
+
+        if len(self._touched) >= 1000:
+            self.flush()
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, vectors):
+        """Store {phrase: vector} and evict the least recently used entries over max_entries"""
+        now = time.time()
+        with self.conn:
+            self._write_touched(now)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, phrase, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(self.model_name, self.normalize(phrase), np.asarray(vector, dtype=np.float16).tobytes(), now)
+                 for phrase, vector in vectors.items()]
+            )
+            # Replaced rows are counted too: the bound only errs towards an early recount
+            self._entries += len(vectors)
+            if self._entries > self.max_entries:
+                count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                if count > self.max_entries:
+                    self.conn.execute(
+                        "DELETE FROM embeddings WHERE rowid IN "
+                        "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                        (count - int(self.max_entries * 0.9),)
+                    )
+                    count = int(self.max_entries * 0.9)
+                self._entries = count
+
+    def flush(self):
+        """Write the pending recency refreshes"""
+        if self._touched:
+            with self.conn:
+                self._write_touched(time.time())
+
+    def _write_touched(self, now):
+        # Refresh recency so hot phrases survive eviction
+        self.conn.executemany(
+            "UPDATE embeddings SET last_used = ? WHERE model = ? AND phrase = ?",
+            [(now, self.model_name, phrase) for phrase in self._touched]
+        )
+        self._touched.clear()
+
+    def embed(self, phrases, embed_fn):
+        """
+        Embed phrases, calling embed_fn only for the ones not in the cache.
+        Fresh vectors go through float16 too, so a hit and a miss give the same result.
+        """
+        keys = [self.normalize(p) for p in phrases]
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        vectors = self.get_many(keys)
+
+        missing = [k for k in dict.fromkeys(keys) if k not in vectors]
+        if missing:
+            computed = np.asarray(embed_fn(missing), dtype=np.float16)
+            fresh = dict(zip(missing, computed))
+            self.put_many(fresh)
+            vectors.update({k: v.astype(np.float32) for k, v in fresh.items()})
+
+        return np.vstack([vectors[k] for k in keys])
+
+    def stats(self):
+        """Hit/miss counters for this process plus the current size of the cache"""
+        lookups = self.hits + self.misses
+        entries = self.conn.execute("SELECT COUNT(*) FROM embeddings WHERE model = ?",
+                                    (self.model_name,)).fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries
+        }
+
+    def close(self):
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,335 @@
+"""
+Append-only, memory-mapped index of review segment embeddings.
+
+BookingReviewAnalyzer(embedding_index_path=...) adds the KeyBERT document
+embedding of every segment it analyzes. It computes those for keyword ranking
+anyway, so building the index costs no extra model calls.
+
+Layout of the index directory:
+    vectors.f16   float16 matrix, one L2-normalized row per segment, only ever appended to
+    flags.bin     per row: category bitmask (uint64) and segment (0 positive, 1 negative)
+    rows.sqlite   side table: row (= offset in the matrix) -> review id, segment, text
+
+search() scans the matrix through np.memmap one block of rows at a time, so
+the OS pages in only what it reads and the index never has to fit in RAM.
+The category/segment prefilter runs on flags.bin before any vector is read.
+
+A segment whose text changed (re-analyzed by analyze_delta, say) gets a new
+row and its old row is tombstoned: the side table entry moves to the new row
+and the old row's segment flag becomes DELETED, so search() skips it.
+Writers take an exclusive lock on write.lock (flock) for the whole add() /
+remove(), so several processes (e.g. ParallelReviewAnalyzer workers) can
+share an index; on platforms without fcntl only one process may write.
+Readers only see rows whose side table entry is committed.
+"""
+import os
+import sqlite3
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, one writer at a time is up to the caller
+    fcntl = None
+
+SEGMENTS = ("positive", "negative")
+# Segment code of a tombstoned row
+DELETED = 255
+FLAGS_DTYPE = np.dtype([("categories", "<u8"), ("segment", "u1")])
+
+
+class ReviewEmbeddingIndex:
+    def __init__(self, path="review_index", block_rows=8192):
+        """
+        Open (or create) the index in directory path.
+        block_rows is how many vectors search() compares per matrix product.
+        """
+        self.path = path
+        self.block_rows = block_rows
+        os.makedirs(path, exist_ok=True)
+        self.vectors_path = os.path.join(path, "vectors.f16")
+        self.flags_path = os.path.join(path, "flags.bin")
+
+        self.conn = sqlite3.connect(os.path.join(path, "rows.sqlite"), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS categories (name TEXT PRIMARY KEY, bit INTEGER NOT NULL)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            " row INTEGER PRIMARY KEY,"
+            " review_id TEXT NOT NULL,"
+            " segment INTEGER NOT NULL,"
+            " text TEXT NOT NULL,"
+            " UNIQUE (review_id, segment))"
+        )
+        # Rows replaced or removed, flagged DELETED in flags.bin once committed here
+        self.conn.execute("CREATE TABLE IF NOT EXISTS tombstones (row INTEGER PRIMARY KEY)")
+        self.conn.commit()
+
+        self._maps = None
+        with self._write_lock():
+            self._truncate_uncommitted()
+            self._flag_tombstones()
+
+    @contextmanager
+    def _write_lock(self):
+        """
+        Exclusive cross-process lock for writers, and a reload of the metadata
+        other writers may have changed (dimension, category bits)
+        """
+        with open(os.path.join(self.path, "write.lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                dim = self.conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+                self.dim = int(dim[0]) if dim else None
+                self.category_bits = dict(self.conn.execute("SELECT name, bit FROM categories"))
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def __len__(self):
+        """Rows in the matrix, tombstoned ones included"""
+        # Rows are numbered from 0 without gaps; the last one may be tombstoned, so both tables count
+        last = self.conn.execute(
+            "SELECT MAX(last) FROM (SELECT MAX(row) AS last FROM rows UNION ALL SELECT MAX(row) FROM tombstones)"
+        ).fetchone()[0]
+        return 0 if last is None else last + 1
+
+    def _truncate_uncommitted(self):
+        """
+        Drop bytes past the last committed row: add() appends to the files before it
+        commits the side table, so an interrupted add() leaves them behind.
+        """
+        if self.dim is None:
+            return
+        count = len(self)
+        for file_path, row_bytes in ((self.vectors_path, self.dim * 2), (self.flags_path, FLAGS_DTYPE.itemsize)):
+            if os.path.exists(file_path) and os.path.getsize(file_path) > count * row_bytes:
+                with open(file_path, "r+b") as f:
+                    f.truncate(count * row_bytes)
+
+    def _flag_tombstones(self, rows=None):
+        """
+        Set the DELETED flag of tombstoned rows (all of them by default, which
+        finishes the job of a writer interrupted after its commit)
+        """
+        if rows is None:
+            rows = [row for row, in self.conn.execute("SELECT row FROM tombstones")]
+        if not rows or not os.path.exists(self.flags_path):
+            return
+        offset = FLAGS_DTYPE.fields["segment"][1]
+        with open(self.flags_path, "r+b") as f:
+            for row in rows:
+                f.seek(row * FLAGS_DTYPE.itemsize + offset)
+                f.write(bytes([DELETED]))
+
+    def _category_mask(self, names):
+        """Bitmask of the category names, giving new categories the next free bit"""
+        mask = 0
+        for name in names:
+            if name not in self.category_bits:
+                if len(self.category_bits) == 64:
+                    raise ValueError("The index supports at most 64 categories")
+                self.category_bits[name] = len(self.category_bits)
+                with self.conn:
+                    self.conn.execute("INSERT INTO categories (name, bit) VALUES (?, ?)",
+                                      (name, self.category_bits[name]))
+            mask |= 1 << self.category_bits[name]
+        return mask
+
+    def _existing(self, review_ids):
+        """{(review id, segment code): (row, text)} of the pairs already in the index"""
+        keys = list(dict.fromkeys(review_ids))
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for review_id, segment, row, text in self.conn.execute(
+                    f"SELECT review_id, segment, row, text FROM rows WHERE review_id IN ({placeholders})", chunk):
+                found[(review_id, segment)] = (row, text)
+        return found
+
+    def add(self, review_ids, segments, texts, vectors, categories=None):
+        """
+        Append one row per segment: segments are "positive"/"negative", categories
+        a list of category names per segment. (review id, segment) pairs already
+        in the index with the same text are skipped, so analyzing the same reviews
+        again doesn't grow it; if the text changed, the old row is tombstoned.
+        Returns the number of rows added.
+        """
+        if not len(review_ids):
+            return 0
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if categories is None:
+            categories = [[] for _ in review_ids]
+
+        with self._write_lock():
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                with self.conn:
+                    self.conn.execute("INSERT INTO meta (key, value) VALUES ('dim', ?)", (str(self.dim),))
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Index vectors have {self.dim} dimensions, got {vectors.shape[1]}")
+
+            existing = self._existing(review_ids)
+            keep = []
+            replaced = []
+            seen = set()
+            for i, (review_id, segment) in enumerate(zip(review_ids, segments)):
+                key = (review_id, SEGMENTS.index(segment))
+                if key in seen:
+                    continue
+                seen.add(key)
+                if key in existing:
+                    row, text = existing[key]
+                    if text == texts[i]:
+                        continue
+                    replaced.append(row)
+                keep.append(i)
+            if not keep:
+                return 0
+
+            # Unit rows: the dot product with a unit query is the cosine similarity
+            kept = vectors[keep]
+            unit = (kept / np.maximum(np.linalg.norm(kept, axis=1, keepdims=True), 1e-12)).astype(np.float16)
+            flags = np.zeros(len(keep), dtype=FLAGS_DTYPE)
+            flags["categories"] = [self._category_mask(categories[i]) for i in keep]
+            flags["segment"] = [SEGMENTS.index(segments[i]) for i in keep]
+
+            self._truncate_uncommitted()
+            start = len(self)
+            with open(self.vectors_path, "ab") as f:
+                f.write(unit.tobytes())
+            with open(self.flags_path, "ab") as f:
+                f.write(flags.tobytes())
+            with self.conn:
+                self._tombstone(replaced)
+                self.conn.executemany(
+                    "INSERT INTO rows (row, review_id, segment, text) VALUES (?, ?, ?, ?)",
+                    [(start + j, review_ids[i], int(flags["segment"][j]), texts[i]) for j, i in enumerate(keep)]
+                )
+            self._flag_tombstones(replaced)
+        return len(keep)
+
+    def remove(self, review_ids):
+        """Tombstone every segment of the given reviews; returns the number of rows removed"""
+        with self._write_lock():
+            rows = [row for row, _ in self._existing(review_ids).values()]
+            with self.conn:
+                self._tombstone(rows)
+            self._flag_tombstones(rows)
+        return len(rows)
+
+    def _tombstone(self, rows):
+        """Inside a transaction: drop the side table entries of rows and record them as tombstones"""
+        self.conn.executemany("DELETE FROM rows WHERE row = ?", [(row,) for row in rows])
+        self.conn.executemany("INSERT OR IGNORE INTO tombstones (row) VALUES (?)", [(row,) for row in rows])
+
+    def _mapped(self, count):
+        """Read-only memmaps of the first count rows (remapped when the index has grown)"""
+        if self._maps is None or self._maps[0] != count:
+            vectors = np.memmap(self.vectors_path, dtype=np.float16, mode="r", shape=(count, self.dim))
+            flags = np.memmap(self.flags_path, dtype=FLAGS_DTYPE, mode="r", shape=(count,))
+            self._maps = (count, vectors, flags)
+        return self._maps[1], self._maps[2]
+
+    def search(self, vector, k=10, category=None, segment=None, exclude=()):
+        """
+        The k rows most similar (cosine) to vector, best first, as dicts with
+        review_id, segment, text, categories and score.
+        category (a name or a list of names, any of them matches) and segment
+        ("positive"/"negative") restrict the candidates before any vector is read;
+        rows in exclude are skipped.
+        """
+        count = len(self)
+        if not count or k <= 0:
+            return []
+        vectors, flags = self._mapped(count)
+        query = np.asarray(vector, dtype=np.float32).reshape(-1)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        candidates = None
+        tombstones = self.conn.execute("SELECT EXISTS (SELECT 1 FROM tombstones)").fetchone()[0]
+        if category is not None or segment is not None or exclude or tombstones:
+            mask = flags["segment"] != DELETED
+            if category is not None:
+                names = [category] if isinstance(category, str) else category
+                bits = sum(1 << self.category_bits[name] for name in set(names) if name in self.category_bits)
+                mask &= (flags["categories"] & np.uint64(bits)) != 0
+            if segment is not None:
+                mask &= flags["segment"] == SEGMENTS.index(segment)
+            mask[list(exclude)] = False
+            candidates = np.flatnonzero(mask)
+
+        total = count if candidates is None else len(candidates)
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, total, self.block_rows):
+            if candidates is None:
+                rows = np.arange(start, min(start + self.block_rows, total))
+                block = vectors[start:start + self.block_rows]
+            else:
+                rows = candidates[start:start + self.block_rows]
+                block = vectors[rows]
+            scores = block.astype(np.float32) @ query
+
+            # Keep only the running top k
+            best_rows = np.concatenate([best_rows, rows])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > k:
+                top = np.argpartition(-best_scores, k - 1)[:k]
+                best_rows, best_scores = best_rows[top], best_scores[top]
+
+        order = np.lexsort((best_rows, -best_scores))
+        return self._describe(best_rows[order], best_scores[order], flags)
+
+    def search_similar_to(self, review_id, segment="negative", k=10, category=None, same_segment=True):
+        """Rows most similar to a segment already in the index, reusing its stored vector"""
+        row = self.conn.execute("SELECT row FROM rows WHERE review_id = ? AND segment = ?",
+                                (review_id, SEGMENTS.index(segment))).fetchone()
+        if row is None:
+            raise KeyError(f"{segment} segment of review {review_id} is not in the index")
+        vectors, _ = self._mapped(len(self))
+        return self.search(vectors[row[0]], k, category, segment if same_segment else None, exclude=(row[0],))
+
+    def _describe(self, rows, scores, flags):
+        """Side table entries of the winning rows"""
+        names = sorted(self.category_bits, key=self.category_bits.get)
+        placeholders = ",".join("?" * len(rows))
+        entries = {row: (review_id, text) for row, review_id, text in self.conn.execute(
+            f"SELECT row, review_id, text FROM rows WHERE row IN ({placeholders})", [int(r) for r in rows]
+        )}
+
+        results = []
+        for row, score in zip(rows, scores):
+            if int(row) not in entries:
+                # Replaced by a writer between our flags read and this query
+                continue
+            review_id, text = entries[int(row)]
+            mask = int(flags["categories"][row])
+            results.append({
+                "review_id": review_id,
+                "segment": SEGMENTS[flags["segment"][row]],
+                "text": text,
+                "categories": [name for name in names if mask >> self.category_bits[name] & 1],
+                "score": round(float(score), 4)
+            })
+        return results
+
+    def stats(self):
+        count = len(self)
+        deleted = self.conn.execute("SELECT COUNT(*) FROM tombstones").fetchone()[0]
+        return {
+            "rows": count - deleted,
+            "deleted": deleted,
+            "dim": self.dim,
+            "categories": len(self.category_bits),
+            "vector_mb": round(count * (self.dim or 0) * 2 / 1024 ** 2, 2)
+        }
+
+    def close(self):
+        self._maps = None
+        self.conn.close()
@@ -0,0 +1,417 @@
+"""
+Local HTTP inference service with dynamic batching.
+
+Endpoints (JSON in, JSON out):
+    POST /sentiment   {"text": "..."} or {"texts": [...]}
+    POST /translate   {"text": "..."} or {"texts": [...]}, "direction": "it_to_en" | "en_to_it"
+    POST /reviews     {"reviews": [{"titolo", "contenuto_positivo", "contenuto_negativo"}, ...]}
+    GET  /health
+    GET  /stats       queue depth and batch sizes per endpoint
+
+Texts from concurrent requests are coalesced into one model batch: a batch
+is run as soon as max_batch_size items are waiting, or max_wait_ms after the
+oldest one arrived. If a batch fails, its items are rerun one by one so an
+error only reaches the requests that caused it. Inference runs on a single
+dedicated thread, so the event loop keeps accepting requests meanwhile.
+Each endpoint queue holds at most max_queue items; beyond that requests get
+503 (retry later), and a request not answered within request_timeout
+seconds gets 504.
+
+    python -m core.inference_server --port 8000 --max-batch-size 32 --max-wait-ms 10
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from ai.sentiment_analyzer import SentimentAnalyzer
+from ai.translator import Translator
+from core.review_aggregate import ReviewAggregate
+from core.review_analyzer import BookingReviewAnalyzer
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+                504: "Gateway Timeout"}
+
+
+class QueueFullError(Exception):
+    """The batcher queue has no room for the request"""
+
+
+class DynamicBatcher:
+    def __init__(self, name, process_batch, executor, max_batch_size=32, max_wait_ms=10, max_queue=1024):
+        """
+        Collects items submitted by concurrent requests and runs them through
+        process_batch(items) -> results (same order) on executor, at most
+        max_batch_size at a time, waiting at most max_wait_ms for a batch to fill.
+        Must be created and started inside the running event loop.
+        """
+        self.name = name
+        self.process_batch = process_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+
+        # (item, future, enqueue time)
+        self._pending = deque()
+        self._arrived = asyncio.Event()
+        self._task = None
+
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.rejected = 0
+        self.isolated_failures = 0
+        self.busy_seconds = 0.0
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def submit_many(self, items):
+        """
+        Queue items and return one future per item.
+        All or nothing: raises QueueFullError if they don't all fit.
+        """
+        if len(self._pending) + len(items) > self.max_queue:
+            self.rejected += len(items)
+            raise QueueFullError(f"{self.name} queue is full ({self.max_queue} items)")
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        futures = []
+        for item in items:
+            future = loop.create_future()
+            self._pending.append((item, future, now))
+            futures.append(future)
+        self._arrived.set()
+        return futures
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._pending:
+                self._arrived.clear()
+                await self._arrived.wait()
+
+            # Wait for the batch to fill, but not longer than max_wait after the oldest item
+            deadline = self._pending[0][2] + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._arrived.clear()
+                try:
+                    await asyncio.wait_for(self._arrived.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch = []
+            while self._pending and len(batch) < self.max_batch_size:
+                item, future, _ = self._pending.popleft()
+                # Requests that timed out or went away don't need an answer
+                if not future.done():
+                    batch.append((item, future))
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self.executor, self.process_batch,
+                                                     [item for item, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    _, future = batch[0]
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    # Rerun the items one by one so only the failing requests get the error
+                    await self._run_one_by_one(batch)
+            else:
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+
+            self.busy_seconds += time.perf_counter() - start
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    async def _run_one_by_one(self, batch):
+        """Answer each (item, future) of a failed batch with its own result or error"""
+        loop = asyncio.get_running_loop()
+        self.isolated_failures += 1
+        for item, future in batch:
+            if future.done():
+                continue
+            try:
+                result = (await loop.run_in_executor(self.executor, self.process_batch, [item]))[0]
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            "queue_depth": len(self._pending),
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "rejected": self.rejected,
+            "isolated_failures": self.isolated_failures,
+            "busy_seconds": round(self.busy_seconds, 3)
+        }
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        for _, future, _ in self._pending:
+            future.cancel()
+        self._pending.clear()
+
+
+class BadRequest(Exception):
+    pass
+
+
+class InferenceServer:
+    def __init__(self, host="127.0.0.1", port=8000, max_batch_size=32, max_wait_ms=10, max_queue=1024,
+                 request_timeout=30.0, max_body_bytes=1_000_000, review_batch_size=32):
+        """
+        Sentiment, translation and review analysis behind one HTTP server.
+        max_batch_size / max_wait_ms / max_queue apply to every endpoint;
+        for /reviews an item is a whole request (all its reviews are analyzed
+        together with those of the other requests in the batch).
+        """
+        self.host = host
+        self.port = port
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_queue = max_queue
+        self.request_timeout = request_timeout
+        self.max_body_bytes = max_body_bytes
+        self.review_batch_size = review_batch_size
+
+        self.sentiment_analyzer = SentimentAnalyzer(batch_size=max_batch_size, verbose=False)
+        self.translator = Translator(batch_size=max_batch_size)
+        self.review_analyzer = BookingReviewAnalyzer()
+
+        # One inference thread: batches run one after the other with all of torch's threads
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.batchers = {}
+        self.server = None
+        self.timeouts = 0
+
+        self.routes = {
+            "/sentiment": ("POST", self._sentiment),
+            "/translate": ("POST", self._translate),
+            "/reviews": ("POST", self._reviews),
+            "/health": ("GET", self._health),
+            "/stats": ("GET", self._stats),
+        }
+
+    def _load_models(self):
+        self.sentiment_analyzer.classifier
+        self.translator.it_to_en
+        self.translator.en_to_it
+        self.review_analyzer.load_models()
+
+    async def start(self):
+        """Load the models, start the batchers and listen"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._load_models)
+
+        process = {
+            "sentiment": self.sentiment_analyzer.analyze_batch,
+            "it_to_en": self.translator.translate_batch_it_to_en,
+            "en_to_it": self.translator.translate_batch_en_to_it,
+            "reviews": self._analyze_review_requests,
+        }
+        for name, process_batch in process.items():
+            batcher = DynamicBatcher(name, process_batch, self.executor, self.max_batch_size,
+                                     self.max_wait_ms, self.max_queue)
+            batcher.start()
+            self.batchers[name] = batcher
+
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        print(f"Inference server listening on http://{self.host}:{self.port} 🚀")
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        for batcher in self.batchers.values():
+            await batcher.close()
+        self.executor.shutdown(wait=True)
+
+    def _analyze_review_requests(self, requests):
+        """Analyze the reviews of several requests in one pass, aggregated per request"""
+        reviews = [review for request in requests for review in request]
+        analyzed = self.review_analyzer._analyze_chunk(reviews, self.review_batch_size)
+
+        results = []
+        start = 0
+        for request in requests:
+            aggregate = ReviewAggregate()
+            detailed_reviews = []
+            for detailed_review, pos_analysis, neg_analysis in analyzed[start:start + len(request)]:
+                aggregate.add(detailed_review, pos_analysis, neg_analysis)
+                detailed_reviews.append(detailed_review)
+            start += len(request)
+
+            result = aggregate.to_results()
+            result["detailed_reviews"] = detailed_reviews
+            results.append(result)
+        return results
+
+    async def _submit_texts(self, batcher, payload):
+        """{"text": ...} -> one result, {"texts": [...]} -> list of results"""
+        if isinstance(payload.get("text"), str):
+            return (await asyncio.gather(*batcher.submit_many([payload["text"]])))[0]
+        texts = payload.get("texts")
+        if not isinstance(texts, list) or not texts or not all(isinstance(t, str) for t in texts):
+            raise BadRequest('expected "text" (string) or "texts" (non-empty list of strings)')
+        return list(await asyncio.gather(*batcher.submit_many(texts)))
+
+    async def _sentiment(self, payload):
+        return await self._submit_texts(self.batchers["sentiment"], payload)
+
+    async def _translate(self, payload):
+        direction = payload.get("direction", "it_to_en")
+        if direction not in ("it_to_en", "en_to_it"):
+            raise BadRequest('direction must be "it_to_en" or "en_to_it"')
+        return await self._submit_texts(self.batchers[direction], payload)
+
+    async def _reviews(self, payload):
+        reviews = payload.get("reviews")
+        if not isinstance(reviews, list) or not all(isinstance(review, dict) for review in reviews):
+            raise BadRequest('expected "reviews" (list of review objects)')
+        return (await asyncio.gather(*self.batchers["reviews"].submit_many([reviews])))[0]
+
+    async def _health(self, payload):
+        return {"status": "ok"}
+
+    async def _stats(self, payload):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "timeouts": self.timeouts,
+            "endpoints": {name: batcher.stats() for name, batcher in self.batchers.items()}
+        }
+
+    async def _dispatch(self, method, path, body):
+        """Route a request and return (status, JSON payload)"""
+        if path not in self.routes:
+            return 404, {"error": f"unknown path {path}"}
+        allowed_method, handler = self.routes[path]
+        if method != allowed_method:
+            return 405, {"error": f"use {allowed_method}"}
+
+        try:
+            payload = json.loads(body) if body else {}
+            if not isinstance(payload, dict):
+                raise BadRequest("body must be a JSON object")
+            return 200, await asyncio.wait_for(handler(payload), self.request_timeout)
+        except (BadRequest, ValueError) as e:
+            return 400, {"error": str(e)}
+        except QueueFullError as e:
+            return 503, {"error": str(e)}
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return 504, {"error": f"no result within {self.request_timeout}s"}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    async def _handle_connection(self, reader, writer):
+        """Minimal HTTP/1.1 with keep-alive: request line, headers, Content-Length body"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    writer.write(_http_response(400, {"error": "malformed request line"}, keep_alive=False))
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                try:
+                    length = int(headers.get("content-length") or 0)
+                    if length < 0:
+                        raise ValueError
+                except ValueError:
+                    writer.write(_http_response(400, {"error": "invalid Content-Length"}, keep_alive=False))
+                    break
+                if length > self.max_body_bytes:
+                    writer.write(_http_response(413, {"error": f"body over {self.max_body_bytes} bytes"},
+                                                keep_alive=False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self._dispatch(method, target.split("?", 1)[0], body)
+                writer.write(_http_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _http_response(status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = [
+        f"HTTP/1.1 {status} {HTTP_REASONS[status]}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    if status == 503:
+        headers.append("Retry-After: 1")
+    return ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP inference service with dynamic batching")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=32, help="items per model batch")
+    parser.add_argument("--max-wait-ms", type=float, default=10, help="how long a batch may wait to fill")
+    parser.add_argument("--max-queue", type=int, default=1024, help="waiting items per endpoint before 503")
+    parser.add_argument("--request-timeout", type=float, default=30.0, help="seconds before 504")
+    args = parser.parse_args()
+
+    server = InferenceServer(args.host, args.port, args.max_batch_size, args.max_wait_ms, args.max_queue,
+                             args.request_timeout)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("Server stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Per-stage instrumentation for the review pipeline and the ai/ classes.
+
+Code wraps its stages in `with instrumentation.stage(name, items=...)`;
+while enabled every stage records wall time, calls, items (batch sizes),
+token counts and exceptions, and every finished stage is passed to the
+hooks. Events that aren't stages (e.g. the KeyBERT fallback firing) go
+through count(). Disabled (the default), stage() hands back a shared no-op
+object, so the overhead is one attribute check per stage.
+
+    from core.instrumentation import instrumentation, JSONLogHook, PrometheusTextHook
+    instrumentation.enable(JSONLogHook("stages.jsonl"), PrometheusTextHook("metrics.prom"))
+    ...
+    instrumentation.snapshot()
+
+Setting INSTRUMENTATION_ENABLED=1 turns it on at import time (no hooks).
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+METRIC_PREFIX = "ai_playground"
+
+
+class _NullStage:
+    """What stage() returns while disabled: does nothing"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, items=0, tokens=0):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, instrumentation, name, items, tokens):
+        self._instrumentation = instrumentation
+        self.name = name
+        self.items = items
+        self.tokens = tokens
+
+    def add(self, items=0, tokens=0):
+        """Count items/tokens known only once the stage is running"""
+        self.items += items
+        self.tokens += tokens
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        error = exc_type.__name__ if exc_type else None
+        self._instrumentation._record(self.name, seconds, self.items, self.tokens, error)
+        return False
+
+
+class Instrumentation:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.hooks = []
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def enable(self, *hooks):
+        """Start recording; hooks are called with every finished stage/event"""
+        self.hooks.extend(hooks)
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self.hooks = []
+
+    def stage(self, name, items=0, tokens=0):
+        """Context manager timing one stage; items is the batch size"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, items, tokens)
+
+    def count(self, name, n=1):
+        """Count an event that isn't a timed stage"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+        self._notify({"event": name, "count": n})
+
+    def _record(self, name, seconds, items, tokens, error):
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = {"calls": 0, "errors": 0, "seconds_total": 0.0,
+                                              "seconds_max": 0.0, "items": 0, "tokens": 0}
+            stats["calls"] += 1
+            stats["seconds_total"] += seconds
+            stats["seconds_max"] = max(stats["seconds_max"], seconds)
+            stats["items"] += items
+            stats["tokens"] += tokens
+            if error:
+                stats["errors"] += 1
+                stats["last_error"] = error
+
+        self._notify({"stage": name, "seconds": round(seconds, 6), "items": items, "tokens": tokens,
+                      "error": error})
+
+    def _notify(self, event):
+        event["timestamp"] = round(time.time(), 3)
+        for hook in self.hooks:
+            hook(event)
+
+    def snapshot(self):
+        """Totals per stage (with mean batch size) and per counted event"""
+        with self._lock:
+            stages = {}
+            for name, stats in self._stages.items():
+                stages[name] = dict(
+                    stats,
+                    seconds_total=round(stats["seconds_total"], 6),
+                    seconds_max=round(stats["seconds_max"], 6),
+                    mean_batch_size=round(stats["items"] / stats["calls"], 2)
+                )
+            return {"stages": stages, "counters": dict(self._counters)}
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def to_prometheus(self):
+        """Snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        metrics = [
+            ("stage_calls_total", "counter", "Calls per stage", "calls"),
+            ("stage_errors_total", "counter", "Exceptions raised per stage", "errors"),
+            ("stage_seconds_total", "counter", "Wall time spent per stage", "seconds_total"),
+            ("stage_seconds_max", "gauge", "Slowest single call per stage", "seconds_max"),
+            ("stage_items_total", "counter", "Items (texts, reviews, images) processed per stage", "items"),
+            ("stage_tokens_total", "counter", "Tokens processed per stage", "tokens"),
+        ]
+
+        lines = []
+        for metric, metric_type, help_text, field in metrics:
+            lines.append(f"# HELP {METRIC_PREFIX}_{metric} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{metric} {metric_type}")
+            for name, stats in sorted(snapshot["stages"].items()):
+                lines.append(f'{METRIC_PREFIX}_{metric}{{stage="{_escape(name)}"}} {stats[field]}')
+
+        lines.append(f"# HELP {METRIC_PREFIX}_events_total Counted events (e.g. keyword fallbacks)")
+        lines.append(f"# TYPE {METRIC_PREFIX}_events_total counter")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f'{METRIC_PREFIX}_events_total{{event="{_escape(name)}"}} {value}')
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Atomically write the Prometheus snapshot (node_exporter textfile collector)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+def _escape(label_value):
+    return label_value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class JSONLogHook:
+    def __init__(self, path=None, stream=None):
+        """One JSON line per stage/event, appended to path (or written to stream, stderr by default)"""
+        self._file = open(path, "a", encoding="utf-8") if path else None
+        self._stream = self._file or stream or sys.stderr
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+
+class PrometheusTextHook:
+    def __init__(self, path, interval=15.0, source=None):
+        """Rewrite the Prometheus snapshot at path at most every interval seconds"""
+        self.path = path
+        self.interval = interval
+        self.source = source or instrumentation
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_write < self.interval:
+                return
+            self._last_write = now
+        self.source.write_prometheus(self.path)
+
+    def flush(self):
+        """Write the snapshot now, e.g. at the end of a batch job"""
+        self.source.write_prometheus(self.path)
+
+
+instrumentation = Instrumentation(enabled=os.environ.get("INSTRUMENTATION_ENABLED") == "1")
@@ -0,0 +1,109 @@
+from collections import deque
+
+
+class KeywordMatcher:
+    def __init__(self, categories, word_boundary=False):
+        """
+        Single-pass matcher for a {category: [keywords]} dictionary.
+        Keywords are compiled once into an Aho-Corasick automaton, so a text is
+        scanned once no matter how many keywords and categories there are.
+        With word_boundary=True a keyword only matches as a whole word
+        ('bar' will not match 'barca'); the default keeps plain substring matching.
+        """
+        self.word_boundary = word_boundary
+        self.categories = {category: list(keywords) for category, keywords in categories.items()}
+        self._compile()
+
+    def add_keywords(self, category, keywords):
+        """Add keywords (and the category if it's new) and recompile the automaton"""
+        known = self.categories.setdefault(category, [])
+        known.extend(kw for kw in keywords if kw not in known)
+        self._compile()
+
+    def _compile(self):
+        """Build goto/fail/output tables for every lowercased keyword"""
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._order = {category: i for i, category in enumerate(self.categories)}
+
+        for category, keywords in self.categories.items():
+            for keyword in keywords:
+                pattern = keyword.lower()
+                if not pattern:
+                    continue
+                state = 0
+                for char in pattern:
+                    next_state = self._goto[state].get(char)
+                    if next_state is None:
+                        next_state = len(self._goto)
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._output.append([])
+                        self._goto[state][char] = next_state
+                    state = next_state
+                self._output[state].append((pattern, category))
+
+        # Breadth-first pass to set failure links and merge outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text):
+        """
+        Return every keyword occurrence as (start, end, keyword, category).
+        Offsets refer to text.lower().
+        """
+        if not text:
+            return []
+
+        text_lower = text.lower()
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = []
+        state = 0
+
+        for position, char in enumerate(text_lower):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern, category in output[state]:
+                start = position - len(pattern) + 1
+                if self.word_boundary and not self._on_boundary(text_lower, start, position + 1):
+                    continue
+                matches.append((start, position + 1, pattern, category))
+
+        return matches
+
+    @staticmethod
+    def _on_boundary(text, start, end):
+        before = text[start - 1] if start > 0 else " "
+        after = text[end] if end < len(text) else " "
+        return not (before.isalnum() or before == "_") and not (after.isalnum() or after == "_")
+
+    def categorize(self, text):
+        """Categories mentioned in the text, in the order of the categories dictionary"""
+        return self._categories_of(self.find(text))
+
+    def categorize_many(self, texts):
+        """
+        Bulk version of categorize: one entry per text with the category names
+        and the matched keyword spans.
+        """
+        results = []
+        for text in texts:
+            matches = self.find(text)
+            results.append({
+                "categories": self._categories_of(matches),
+                "matches": matches
+            })
+        return results
+
+    def _categories_of(self, matches):
+        return sorted({category for _, _, _, category in matches}, key=self._order.get)
@@ -0,0 +1,264 @@
+"""
+Lexicon sentiment scorer, the cheap first tier in front of the transformer models.
+
+Lots of review segments are a few words of plain praise or complaint
+("Staff eccellente.", "Hotel nuovo e pulitissimo", "Letto scomodo"). The
+scorer looks their words up in a small Italian/English polarity lexicon and
+answers only when it's sure; everything else goes to the model:
+- texts longer than max_words are never scored
+- all polar words must point the same way ("non" / "niente" / "not" flips the
+  next words of the same clause, so "Niente male" is praise)
+- confidence is the share of content words the lexicon knows (polar words and
+  aspects such as the category keywords), higher with every extra polar word;
+  the caller's gate decides what is confident enough
+- a text in which no lexicon word matched at all (only fillers, e.g. "Tutto")
+  can still be answered from a prior: the polarity of the field it was written
+  in (Booking's positive/negative parts). PRIOR_CONFIDENCE is below the usual
+  gates, so only a gate at or under it lets the prior alone skip the model
+- a word is either polar or an aspect: aspects added later (e.g. an analyzer's
+  category keywords) lose their polarity
+
+Words are compared on a light Italian stem (final vowel dropped), so one
+entry covers pulito/pulita/puliti/pulite.
+
+    python -m core.lexicon   # hit rate and agreement with the model per gate, on the sample reviews
+"""
+import re
+import time
+from core.constants import SAMPLE_REVIEWS
+
+POSITIVE = (
+    # Italian
+    "ottimo", "eccellente", "eccezionale", "perfetto", "bello", "bellissimo", "buono", "buonissimo",
+    "pulito", "pulitissimo", "gentile", "gentilissimo", "cortese", "disponibile", "disponibilissimo",
+    "accogliente", "comodo", "comodissimo", "fantastico", "meraviglioso", "stupendo", "splendido",
+    "favoloso", "consigliato", "consigliatissimo", "nuovo", "moderno", "elegante", "ampio", "spazioso",
+    "silenzioso", "tranquillo", "professionale", "impeccabile", "ottimale", "curato", "delizioso",
+    "abbondante", "gustoso", "piacevole", "rilassante", "panoramico", "affabile", "preparato",
+    "squisito", "cordiale", "efficiente", "attento", "incantevole", "top", "magnifico", "superbo",
+    # English
+    "great", "excellent", "good", "amazing", "perfect", "clean", "friendly", "helpful", "comfortable",
+    "nice", "lovely", "beautiful", "wonderful", "fantastic", "spacious", "quiet", "modern", "new",
+    "delicious", "recommended", "outstanding", "superb", "awesome", "best", "kind", "spotless", "cozy",
+)
+NEGATIVE = (
+    # Italian
+    "sporco", "rumoroso", "scomodo", "pessimo", "terribile", "orribile", "maleducato", "scortese",
+    "lento", "vecchio", "datato", "rotto", "guasto", "mancante", "affollato", "caro",
+    "costoso", "deludente", "scarso", "insufficiente", "disorganizzato", "difficile", "sgradevole",
+    "scadente", "squallido", "trascurato", "peggiore", "male", "maleodorante", "stretto", "sporchissimo",
+    # English
+    "dirty", "noisy", "rude", "bad", "terrible", "awful", "poor", "broken", "old",
+    "uncomfortable", "expensive", "slow", "smelly", "worst", "disappointing", "horrible",
+    "crowded", "unfriendly", "overpriced",
+)
+NEGATORS = ("non", "no", "nessun", "nessuno", "mai", "niente", "nulla", "not", "never", "nor", "nothing",
+            "don't", "didn't", "wasn't", "isn't", "weren't")
+INTENSIFIERS = ("molto", "tanto", "super", "davvero", "veramente", "estremamente", "proprio", "troppo",
+                "very", "really", "extremely", "so", "too")
+# Words that carry no sentiment and don't count against the coverage
+FILLERS = (
+    "e", "ed", "il", "lo", "la", "i", "gli", "le", "l'", "un", "uno", "una", "un'", "di", "del", "della",
+    "dei", "delle", "a", "al", "alla", "in", "nel", "nella", "con", "per", "da", "dal", "dalla", "che",
+    "è", "e'", "era", "erano", "sono", "stato", "stata", "ma", "anche", "sempre", "tutto", "tutti",
+    "the", "an", "and", "was", "were", "is", "are", "with", "of", "to", "for", "it", "all", "everything",
+    "but", "also", "always",
+)
+# Things reviews talk about, neutral on their own (the analyzer adds its category keywords)
+ASPECTS = (
+    "hotel", "albergo", "struttura", "staff", "personale", "camera", "stanza", "letto", "bagno",
+    "doccia", "colazione", "piscina", "posizione", "servizio", "reception", "cena", "ristorante",
+    "room", "bed", "bathroom", "breakfast", "pool", "location", "service", "place", "food",
+)
+
+# Confidence of an answer that comes from the prior alone, below the recommended 0.8 gate
+PRIOR_CONFIDENCE = 0.5
+
+_CLAUSES = re.compile(r"[.,;:!?()\n]+")
+_WORDS = re.compile(r"[\w']+")
+
+
+def stem(word):
+    """Drop the final vowel of longer words, so Italian gender/number forms share an entry"""
+    return word[:-1] if len(word) > 4 and word[-1] in "aeiou" else word
+
+
+class SentimentLexicon:
+    def __init__(self, positive=POSITIVE, negative=NEGATIVE, aspects=ASPECTS, max_words=6, negation_scope=3):
+        """
+        positive/negative/aspects are lists of words or phrases (phrases count
+        every word); texts over max_words words are left to the model.
+        """
+        self.max_words = max_words
+        self.negation_scope = negation_scope
+        self.polarity = {}
+        self.aspects = set()
+        self.add_words(positive=positive, negative=negative, aspects=aspects)
+        self.negators = set(NEGATORS)
+        self.intensifiers = set(INTENSIFIERS)
+        self.fillers = set(FILLERS)
+
+        self.lookups = 0
+        self.hits = 0
+
+    def add_words(self, positive=(), negative=(), aspects=()):
+        """Extend the lexicon, e.g. with an analyzer's category keywords (aspects are never polar)"""
+        for phrase in aspects:
+            self.aspects.update(stem(word) for word in _WORDS.findall(phrase.lower()))
+        for phrases, polarity in ((positive, 1), (negative, -1)):
+            for phrase in phrases:
+                for word in _WORDS.findall(phrase.lower()):
+                    self.polarity[stem(word)] = polarity
+        for key in self.aspects:
+            self.polarity.pop(key, None)
+
+    def score(self, text, prior=0):
+        """
+        (polarity, strong, confidence) of a text: polarity 1 / -1, or 0 if the
+        lexicon can't tell; strong when intensified or backed by several polar words.
+        prior (1 / -1) is the polarity to assume for a text with no lexicon word at all.
+        """
+        if not text or not text.strip():
+            return 0, False, 0.0
+
+        clauses = [_WORDS.findall(clause) for clause in _CLAUSES.split(text.lower())]
+        word_count = sum(len(words) for words in clauses)
+        if not word_count or word_count > self.max_words:
+            return 0, False, 0.0
+
+        polar = []
+        intensified = negated = False
+        content = known = 0
+        for words in clauses:
+            negated_until = -1
+            for i, word in enumerate(words):
+                if word in self.negators:
+                    negated_until = i + self.negation_scope
+                    negated = True
+                    continue
+                if word in self.intensifiers:
+                    intensified = True
+                    continue
+                if word in self.fillers:
+                    continue
+
+                content += 1
+                key = stem(word)
+                polarity = self.polarity.get(key)
+                if polarity is not None:
+                    known += 1
+                    polar.append(-polarity if i <= negated_until else polarity)
+                elif key in self.aspects:
+                    known += 1
+
+        if not polar:
+            # "Tutto": nothing to go on but the field the text was written in
+            if prior and not negated and not content:
+                return prior, False, PRIOR_CONFIDENCE
+            return 0, False, 0.0
+        if len(set(polar)) > 1:
+            return 0, False, 0.0
+        coverage = known / content
+        confidence = coverage * (1 - 0.2 * 0.5 ** (len(polar) - 1))
+        return polar[0], intensified or len(polar) > 1, round(confidence, 3)
+
+    def split(self, texts, threshold, priors=None):
+        """
+        Gate a list of texts: returns ({(text, prior): (polarity, strong, confidence)} for the
+        distinct occurrences the lexicon answers at confidence >= threshold, list of the
+        distinct texts some occurrence of which it doesn't answer, in order).
+        priors is an optional list with the prior of every text (see score), 0 by default;
+        each occurrence is scored on its own text and prior, never on the other texts.
+        """
+        if priors is None:
+            priors = [0] * len(texts)
+        decided = {}
+        undecided = []
+        occurrences = dict.fromkeys(zip(texts, priors))
+        for text, prior in occurrences:
+            polarity, strong, confidence = self.score(text, prior)
+            if polarity and confidence >= threshold:
+                decided[(text, prior)] = (polarity, strong, confidence)
+            else:
+                undecided.append(text)
+        self.lookups += len(occurrences)
+        self.hits += len(decided)
+        return decided, list(dict.fromkeys(undecided))
+
+    def stats(self):
+        """How many distinct texts the cascade answered without the model"""
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0
+        }
+
+
+def lexicon_label(polarity, strong, id2label):
+    """Model label for a lexicon answer: top/bottom class, or the next one in for mild answers on 5 classes"""
+    labels = [id2label[i] for i in sorted(id2label)]
+    if len(labels) <= 3 or strong:
+        return labels[-1] if polarity > 0 else labels[0]
+    return labels[-2] if polarity > 0 else labels[1]
+
+
+def label_polarity(label, id2label):
+    """1 / 0 / -1 for a model label: upper classes positive, the middle one neutral"""
+    labels = [id2label[i] for i in sorted(id2label)]
+    index = labels.index(label)
+    middle = (len(labels) - 1) / 2
+    return (index > middle) - (index < middle)
+
+
+def cascade_report(lexicon, texts, classify, id2label, thresholds=(0.5, 0.6, 0.7, 0.8, 0.9, 1.0), priors=None):
+    """
+    Both tiers on the same texts, per gate threshold: share of texts the lexicon
+    answers (hit rate), how often those answers match the model (exact label and
+    polarity), and the model time the hits would save.
+    classify(texts) -> raw model results; id2label is the model's label map;
+    priors an optional list with the prior of every text, as in SentimentLexicon.split.
+    Rows count distinct (text, prior) occurrences; the model sees each text once.
+    """
+    if priors is None:
+        priors = [0] * len(texts)
+    occurrences = list(dict.fromkeys((t, p) for t, p in zip(texts, priors) if t and t.strip()))
+    texts = list(dict.fromkeys(text for text, _ in occurrences))
+    scores = [lexicon.score(text, prior) for text, prior in occurrences]
+    start = time.perf_counter()
+    results_by_text = dict(zip(texts, classify(texts)))
+    seconds_per_text = (time.perf_counter() - start) / max(1, len(texts))
+    model_results = [results_by_text[text] for text, _ in occurrences]
+
+    rows = []
+    for threshold in thresholds:
+        hits = [(score, result) for score, result in zip(scores, model_results)
+                if score[0] and score[2] >= threshold]
+        label_matches = sum(lexicon_label(polarity, strong, id2label) == result["label"]
+                            for (polarity, strong, _), result in hits)
+        polarity_matches = sum(polarity == label_polarity(result["label"], id2label)
+                               for (polarity, _, _), result in hits)
+        rows.append({
+            "threshold": threshold,
+            "hit_rate": round(len(hits) / len(occurrences), 3) if occurrences else 0.0,
+            "label_agreement": round(label_matches / len(hits), 3) if hits else None,
+            "polarity_agreement": round(polarity_matches / len(hits), 3) if hits else None,
+            "model_seconds_saved": round(len(hits) * seconds_per_text, 4)
+        })
+    return {"texts": len(occurrences), "thresholds": rows}
+
+
+if __name__ == "__main__":
+    from ai.sentiment_analyzer import SentimentAnalyzer
+    from core.review_analyzer import BookingReviewAnalyzer
+
+    segments = [text for review in SAMPLE_REVIEWS
+                for text in (review.get("contenuto_positivo"), review.get("contenuto_negativo")) if text]
+
+    for name, analyzer in (("BookingReviewAnalyzer", BookingReviewAnalyzer()),
+                           ("SentimentAnalyzer", SentimentAnalyzer())):
+        report = analyzer.cascade_report(segments)
+        print(f"=== Lexicon cascade: {name} ({report['texts']} texts) ===")
+        for row in report["thresholds"]:
+            print(f"gate {row['threshold']:.2f}: hit rate {row['hit_rate']:.1%}"
+                  f" | label agreement {row['label_agreement']} | polarity agreement {row['polarity_agreement']}"
+                  f" | model time saved {row['model_seconds_saved']}s")
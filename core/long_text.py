@@ -0,0 +1,111 @@
+"""
+Sliding-window sentiment for texts longer than the model limit.
+
+Every text is tokenized once: texts that fit are one window, longer ones
+come back from the (fast) tokenizer as overlapping windows of the model's
+maximum length, so no content is dropped.
+All windows of all texts run through the classifier together, sorted by
+length so batches pad as little as possible, and the window probabilities of
+each text are combined into one label and confidence:
+- "mean": average of the window probabilities
+- "length_weighted": average weighted by the tokens each window adds (default)
+- "max_confidence": the most confident window decides
+- "majority": most frequent window label, confidence averaged over those windows
+"""
+import numpy as np
+
+STRATEGIES = ("mean", "length_weighted", "max_confidence", "majority")
+
+# Models whose position ids start at pad_token_id + 1, so max_position_embeddings overstates the limit
+OFFSET_POSITION_MODELS = ("roberta", "xlm-roberta", "camembert", "longformer")
+
+
+def max_window_tokens(pipeline):
+    """Longest sequence the model takes, special tokens included"""
+    config = pipeline.model.config
+    limit = pipeline.tokenizer.model_max_length
+    positions = getattr(config, "max_position_embeddings", None)
+    if positions:
+        if config.model_type in OFFSET_POSITION_MODELS:
+            # 514 positions on XLM-R/RoBERTa, but the first pad_token_id + 1 are never used
+            positions -= (config.pad_token_id or 0) + 1
+        limit = min(limit, positions)
+    return limit
+
+
+def aggregate_windows(probabilities, weights, strategy):
+    """Class index and confidence for one text from its (windows x classes) probabilities"""
+    if strategy == "mean":
+        combined = probabilities.mean(axis=0)
+    elif strategy == "length_weighted":
+        combined = np.average(probabilities, axis=0, weights=weights)
+    elif strategy == "max_confidence":
+        combined = probabilities[probabilities.max(axis=1).argmax()]
+    elif strategy == "majority":
+        labels = probabilities.argmax(axis=1)
+        # Ties go to the label with the higher total probability
+        votes = (np.bincount(labels, minlength=probabilities.shape[1])
+                 + probabilities.sum(axis=0) / (len(labels) + 1))
+        label = int(votes.argmax())
+        return label, float(probabilities[labels == label, label].mean())
+    else:
+        raise ValueError(f"Unknown window strategy: {strategy} (use one of {', '.join(STRATEGIES)})")
+
+    label = int(combined.argmax())
+    return label, float(combined[label])
+
+
+def window_sentiment(pipeline, texts, strategy="length_weighted", stride=64, batch_size=32, max_tokens=None):
+    """
+    Classify texts of any length with a text-classification pipeline.
+    Returns one {"label", "score"} per text, like the pipeline itself.
+    max_tokens overrides the window size, special tokens included (model limit by default);
+    consecutive windows share stride tokens.
+    """
+    import torch
+
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown window strategy: {strategy} (use one of {', '.join(STRATEGIES)})")
+
+    tokenizer = pipeline.tokenizer
+    model = pipeline.model
+    window = min(max_tokens or max_window_tokens(pipeline), max_window_tokens(pipeline))
+    special_tokens = tokenizer.num_special_tokens_to_add()
+    stride = min(stride, (window - special_tokens) // 2)
+
+    # One tokenizer pass: texts over the limit come back as several overlapping windows
+    encoded = tokenizer(list(texts), truncation=True, max_length=window, stride=stride,
+                        return_overflowing_tokens=True, verbose=False)
+    windows = encoded["input_ids"]
+    owners = encoded["overflow_to_sample_mapping"]
+
+    # Tokens each window adds to its text (the overlap was already counted by the previous window)
+    weights = np.array([len(ids) - special_tokens - (stride if i and owners[i - 1] == owner else 0)
+                        for i, (ids, owner) in enumerate(zip(windows, owners))], dtype=np.float32)
+    weights = np.maximum(weights, 1)
+    spans = np.searchsorted(owners, np.arange(len(texts) + 1))
+
+    order = sorted(range(len(windows)), key=lambda i: len(windows[i]))
+    probabilities = np.zeros((len(windows), model.config.num_labels), dtype=np.float32)
+    pad_id = tokenizer.pad_token_id or 0
+
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        length = max(len(windows[i]) for i in batch)
+        input_ids = torch.full((len(batch), length), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(batch), length), dtype=torch.long)
+        for row, i in enumerate(batch):
+            ids = windows[i]
+            input_ids[row, :len(ids)] = torch.tensor(ids)
+            attention_mask[row, :len(ids)] = 1
+
+        with torch.no_grad():
+            logits = model(input_ids=input_ids.to(model.device),
+                           attention_mask=attention_mask.to(model.device)).logits
+        probabilities[batch] = torch.softmax(logits.float(), dim=-1).cpu().numpy()
+
+    results = []
+    for first, last in zip(spans[:-1], spans[1:]):
+        label, score = aggregate_windows(probabilities[first:last], weights[first:last], strategy)
+        results.append({"label": model.config.id2label[label], "score": score})
+    return results
@@ -0,0 +1,42 @@
+import threading
+import psutil
+
+
+class PeakRSSMonitor:
+    def __init__(self, interval=0.01):
+        """
+        Samples the process RSS in a background thread while the block runs.
+            with PeakRSSMonitor() as monitor:
+                ...
+            monitor.peak_mb
+        """
+        self.interval = interval
+        self.start_mb = 0.0
+        self.peak_mb = 0.0
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _rss_mb(self):
+        return self._process.memory_info().rss / 1024 ** 2
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, self._rss_mb())
+
+    def __enter__(self):
+        self.start_mb = self.peak_mb = self._rss_mb()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, self._rss_mb())
+
+    @property
+    def growth_mb(self):
+        """How much the peak went above the RSS at the start of the block"""
+        return self.peak_mb - self.start_mb
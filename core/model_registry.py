@@ -0,0 +1,186 @@
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+import psutil
+
+
+def _rss_mb():
+    return psutil.Process().memory_info().rss / 1024 ** 2
+
+
+class ModelRegistry:
+    def __init__(self, memory_budget_mb=None):
+        """
+        Process-wide store of heavyweight models.
+        Models are loaded on first use and shared by every caller asking for the
+        same key. When memory_budget_mb is set and the process RSS goes over it,
+        the least recently used models are dropped (they reload on next use).
+        """
+        self.memory_budget_mb = memory_budget_mb
+        self._loaders = {}
+        self._models = OrderedDict()
+        self._stats = {}
+        self._lock = threading.RLock()
+        self._key_locks = {}
+
+    def register(self, key, loader):
+        """Declare how to build a model, without loading it"""
+        with self._lock:
+            self._loaders[key] = loader
+
+    def get(self, key, loader=None):
+        """
+        Return the model for key, loading it if needed.
+        A loader set with register() takes precedence over the one passed here.
+        Loads run under a per-key lock only: a slow load doesn't block other models,
+        and concurrent callers of the same key wait for a single load.
+        """
+        with self._lock:
+            model = self._hit(key)
+            if model is not None:
+                return model
+            if loader is not None:
+                self._loaders.setdefault(key, loader)
+            loader = self._loaders[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                # Another caller may have loaded it while we waited
+                model = self._hit(key)
+                if model is not None:
+                    return model
+                # If we've seen this model before we know roughly how much room it needs
+                known_size = self._stats.get(key, {}).get("resident_mb", 0)
+                self._enforce_budget(extra_mb=known_size)
+
+            print(f"Loading {key}... (first use, this might take a moment)")
+            rss_before = _rss_mb()
+            start = time.perf_counter()
+            model = loader()
+            load_seconds = time.perf_counter() - start
+            resident_mb = max(0.0, _rss_mb() - rss_before)
+            print(f"{key} loaded in {load_seconds:.1f}s")
+
+            with self._lock:
+                self._models[key] = model
+                stats = self._stats.setdefault(key, {"loads": 0, "hits": 0})
+                stats.update({
+                    "loads": stats["loads"] + 1,
+                    "load_seconds": round(load_seconds, 3),
+                    "resident_mb": round(resident_mb, 1),
+                    "last_used": time.time()
+                })
+
+                self._enforce_budget(keep=key)
+            return model
+
+    def _hit(self, key):
+        """The loaded model for key (marked as just used), or None"""
+        if key not in self._models:
+            return None
+        self._models.move_to_end(key)
+        self._stats[key]["hits"] += 1
+        self._stats[key]["last_used"] = time.time()
+        return self._models[key]
+
+    def _enforce_budget(self, keep=None, extra_mb=0):
+        """
+        Evict least recently used models until RSS (plus extra_mb) fits the budget.
+        Only as many models as their tracked resident_mb covers the overshoot are
+        dropped: RSS often stays up after an eviction (the allocator keeps the
+        memory, or a caller still holds the model), and evicting everything then
+        would only cause duplicate reloads.
+        """
+        if not self.memory_budget_mb:
+            return
+        overshoot = _rss_mb() + extra_mb - self.memory_budget_mb
+        for key in [key for key in self._models if key != keep]:
+            if overshoot <= 0:
+                break
+            resident_mb = self._stats.get(key, {}).get("resident_mb", 0)
+            if resident_mb > 0:
+                # A model with no measured footprint wouldn't free anything we can count on
+                overshoot -= resident_mb
+                self.evict(key)
+
+    def evict(self, key):
+        """Drop a loaded model; it will be reloaded on next use"""
+        with self._lock:
+            if self._models.pop(key, None) is not None:
+                print(f"Evicting {key}")
+                gc.collect()
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            gc.collect()
+
+    def stats(self):
+        """Load time, resident size and usage per model, plus the process RSS"""
+        with self._lock:
+            return {
+                "rss_mb": round(_rss_mb(), 1),
+                "memory_budget_mb": self.memory_budget_mb,
+                "models": {key: dict(stats, loaded=key in self._models) for key, stats in self._stats.items()}
+            }
+
+
+_budget = os.environ.get("MODEL_MEMORY_BUDGET_MB")
+registry = ModelRegistry(memory_budget_mb=float(_budget) if _budget else None)
+
+
+def get_pipeline(task, model, quantized=False, **kwargs):
+    """
+    Shared transformers pipeline for (task, model, kwargs).
+    With quantized, the int8 version of the model (see core.quantization).
+    """
+    if quantized:
+        from core.quantization import load_quantized_pipeline
+        return registry.get(f"{task}:{model}:int8", lambda: load_quantized_pipeline(task, model))
+
+    def load():
+        from transformers import pipeline
+        return pipeline(task, model=model, **kwargs)
+
+    key = f"{task}:{model}"
+    if kwargs:
+        key += ":" + ",".join(f"{name}={value!r}" for name, value in sorted(kwargs.items()))
+    return registry.get(key, load)
+
+
+def get_keybert(model):
+    """Shared KeyBERT instance for an embedding model"""
+    def load():
+        from keybert import KeyBERT
+        return KeyBERT(model)
+
+    return registry.get(f"keybert:{model}", load)
+
+
+def diffusion_pipeline_key(model, device, torch_dtype, profile="default"):
+    return f"text-to-image:{model}:{device}:{torch_dtype}:{profile}"
+
+
+def get_diffusion_pipeline(model, device, torch_dtype, profile="default", configure=None):
+    """
+    Shared StableDiffusionPipeline, already moved to device.
+    Each profile gets its own copy, set up once by configure(pipeline).
+    """
+    def load():
+        from diffusers import StableDiffusionPipeline
+        pipeline = StableDiffusionPipeline.from_pretrained(model, torch_dtype=torch_dtype).to(device)
+        return configure(pipeline) if configure else pipeline
+
+    return registry.get(diffusion_pipeline_key(model, device, torch_dtype, profile), load)
+
+
+def get_model_config(model):
+    """Shared transformers config of a model (label map etc.), without loading its weights"""
+    def load():
+        from transformers import AutoConfig
+        return AutoConfig.from_pretrained(model)
+
+    return registry.get(f"config:{model}", load)
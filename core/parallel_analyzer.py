@@ -0,0 +1,213 @@
+"""
+Multi-process version of BookingReviewAnalyzer.
+
+The input is split into contiguous shards that are analyzed by a pool of
+worker processes. Every worker loads the sentiment and KeyBERT models once
+(in the pool initializer) and returns, per shard, its detailed reviews plus a
+ReviewAggregate; merging the aggregates in shard order gives the same
+summary/categories/strengths/areas_for_improvement as the sequential run.
+
+"The same" holds up to float noise: each shard pads and batches a different
+set of texts, so model scores can differ in the last bits. Sentiments and
+categories come out equal; a confidence can move by a rounding step and a
+near-tie between KeyBERT candidates can swap keywords. scaling_report checks
+exactly that (see compare_results).
+"""
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from core.constants import SAMPLE_REVIEWS
+from core.review_aggregate import ReviewAggregate
+
+# Per-process state of the pool workers
+_worker_analyzer = None
+_worker_barrier = None
+
+
+def _init_worker(torch_threads, analyzer_kwargs, barrier):
+    """Pool initializer: pin torch threads and load the models once per process"""
+    global _worker_analyzer, _worker_barrier
+
+    # Tokenizers would start their own thread pool on top of torch's
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    import torch
+    torch.set_num_threads(torch_threads)
+    torch.set_num_interop_threads(1)
+
+    from core.review_analyzer import BookingReviewAnalyzer
+    _worker_analyzer = BookingReviewAnalyzer(**analyzer_kwargs)
+    _worker_analyzer.load_models()
+    _worker_barrier = barrier
+
+
+def _wait_ready(_):
+    """Blocks until every worker has run its initializer"""
+    _worker_barrier.wait()
+
+
+def _analyze_shard(reviews, batch_size):
+    """Analyze one shard and return its detailed reviews and partial aggregate"""
+    aggregate = ReviewAggregate()
+    detailed_reviews = []
+    for detailed_review, pos_analysis, neg_analysis in _worker_analyzer._analyze_chunk(reviews, batch_size):
+        aggregate.add(detailed_review, pos_analysis, neg_analysis)
+        detailed_reviews.append(detailed_review)
+    return detailed_reviews, aggregate
+
+
+class ParallelReviewAnalyzer:
+    def __init__(self, workers=4, torch_threads=None, **analyzer_kwargs):
+        """
+        Start a pool of worker processes, each with its own BookingReviewAnalyzer.
+        torch_threads is the intra-op thread count per worker; by default the
+        cores are split evenly so workers don't oversubscribe the machine.
+        analyzer_kwargs are passed to BookingReviewAnalyzer in every worker.
+        """
+        self.workers = workers
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+
+        print(f"Starting {workers} workers with {self.torch_threads} torch threads each...")
+        ctx = mp.get_context("spawn")
+        barrier = ctx.Barrier(workers)
+        self.pool = ctx.Pool(
+            workers,
+            initializer=_init_worker,
+            initargs=(self.torch_threads, analyzer_kwargs, barrier)
+        )
+        # One blocking task per worker: returns only once all models are loaded
+        self.pool.map(_wait_ready, range(workers), chunksize=1)
+        print("Workers ready! 🚀")
+
+    def analyze_reviews(self, reviews_data, batch_size=32, shards_per_worker=4):
+        """Same output as BookingReviewAnalyzer.analyze_reviews, computed by the pool"""
+        print(f"Analyzing {len(reviews_data)} reviews on {self.workers} workers...")
+
+        num_shards = max(1, min(len(reviews_data), self.workers * shards_per_worker))
+        shard_size = -(-len(reviews_data) // num_shards)
+        shards = [reviews_data[start:start + shard_size]
+                  for start in range(0, len(reviews_data), shard_size)]
+
+        partials = self.pool.starmap(_analyze_shard, [(shard, batch_size) for shard in shards], chunksize=1)
+
+        # Reduce in shard order, so keyword/category ordering matches the sequential run
+        aggregate = ReviewAggregate()
+        detailed_reviews = []
+        for shard_reviews, shard_aggregate in partials:
+            aggregate.merge(shard_aggregate)
+            detailed_reviews.extend(shard_reviews)
+
+        results = aggregate.to_results()
+        results["detailed_reviews"] = detailed_reviews
+
+        print("Analysis completed! ✅")
+        return results
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def compare_results(expected, results, tolerance=0.002):
+    """
+    Compare two analyze_reviews outputs of the same reviews: sentiments, categories
+    and counts must be equal, confidences within tolerance; keyword_agreement is the
+    share of per-review keywords both runs extracted (near-ties can swap some).
+    equivalent when everything but the keywords matches.
+    """
+    def labels(run):
+        return [(r["positive_sentiment"], r["negative_sentiment"], list(r["categories_mentioned"]))
+                for r in run["detailed_reviews"]]
+
+    def counts(run):
+        summary = {k: v for k, v in run["summary"].items() if k != "average_confidence"}
+        categories = {cat: (c["mentions"], c["avg_sentiment"]) for cat, c in run["categories"].items()}
+        return summary, categories
+
+    def confidences(run):
+        return [run["summary"]["average_confidence"]] + [run["categories"][cat]["confidence"]
+                                                         for cat in sorted(run["categories"])]
+
+    sentiments_match = labels(results) == labels(expected) and counts(results) == counts(expected)
+    drift = max((abs(a - b) for a, b in zip(confidences(results), confidences(expected))), default=0.0)
+
+    shared = total = 0
+    for a, b in zip(expected["detailed_reviews"], results["detailed_reviews"]):
+        for field in ("key_strengths", "key_issues"):
+            shared += len(set(a[field]) & set(b[field]))
+            total += len(set(a[field]) | set(b[field]))
+
+    return {
+        "equivalent": sentiments_match and drift <= tolerance,
+        "sentiments_match": sentiments_match,
+        "confidence_drift": round(drift, 4),
+        "keyword_agreement": round(shared / total, 3) if total else 1.0
+    }
+
+
+def scaling_report(reviews_data, worker_counts=(1, 2, 4, 8, 16), batch_size=32, **analyzer_kwargs):
+    """
+    Time the pool for each worker count (model loading excluded) and compare the
+    results with a single-process run (see compare_results).
+    """
+    from core.model_registry import registry
+    from core.review_analyzer import BookingReviewAnalyzer
+
+    sequential = BookingReviewAnalyzer(**analyzer_kwargs)
+    sequential.load_models()
+    start = time.perf_counter()
+    expected = sequential.analyze_reviews(reviews_data, batch_size=batch_size)
+    sequential_seconds = time.perf_counter() - start
+    # Free the parent's copy of the models before starting the pools
+    registry.clear()
+
+    report = []
+    for workers in worker_counts:
+        with ParallelReviewAnalyzer(workers, **analyzer_kwargs) as parallel:
+            start = time.perf_counter()
+            results = parallel.analyze_reviews(reviews_data, batch_size=batch_size)
+            seconds = time.perf_counter() - start
+
+        report.append({
+            "workers": workers,
+            "seconds": round(seconds, 3),
+            "reviews_per_second": round(len(reviews_data) / seconds, 1),
+            "speedup": round(sequential_seconds / seconds, 2),
+            "efficiency": round(sequential_seconds / seconds / workers, 2),
+            **compare_results(expected, results)
+        })
+
+    return {"reviews": len(reviews_data), "sequential_seconds": round(sequential_seconds, 3), "runs": report}
+
+
+def main():
+    """Scaling report on a JSONL file (first argument) or on the sample reviews"""
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8") as f:
+            reviews = [json.loads(line) for line in f if line.strip()]
+    else:
+        reviews = SAMPLE_REVIEWS * 50
+
+    report = scaling_report(reviews)
+
+    print("\n" + "=" * 60)
+    print(f"⚡ SCALING REPORT ({report['reviews']} reviews, sequential {report['sequential_seconds']}s)")
+    print("=" * 60)
+    for run in report["runs"]:
+        print(f"   {run['workers']:>2} workers: {run['seconds']:>8}s | {run['reviews_per_second']:>7} reviews/s"
+              f" | speedup {run['speedup']}x | efficiency {run['efficiency']}"
+              f" | equivalent: {run['equivalent']} (confidence drift {run['confidence_drift']},"
+              f" keyword agreement {run['keyword_agreement']:.1%})")
+
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Pipelined version of BookingReviewAnalyzer.analyze_reviews.
+
+The sequential path runs sentiment, then KeyBERT, then categorization and
+aggregation, so while one model runs the cores the other could use sit
+idle. Here the input is cut into chunks that flow through stages running on
+their own threads, joined by bounded queues:
+
+    feeder ─┬─> sentiment thread ──┐
+            └─> keyword thread ────┴─> categorize + aggregate (calling thread)
+
+The two model stages work at the same time, and the pure-Python assembly of
+one chunk overlaps the models on the next ones. Every queue holds at most
+queue_size chunks, so memory stays bounded however far ahead the feeder
+gets. Each model stage gets its own torch intra-op thread count
+(torch.set_num_threads is called inside the stage thread; with torch's
+OpenMP backend the setting is per thread).
+
+Chunks are assembled in input order, so detailed_reviews and the aggregate
+are the same as the sequential run (chunking doesn't change per-text
+results, as with the sharded analyzer). core.parallel_analyzer spreads work
+over processes; this keeps the cores of one process busy.
+"""
+import os
+import queue
+import threading
+import time
+from core.constants import SAMPLE_REVIEWS
+from core.instrumentation import instrumentation
+from core.review_aggregate import ReviewAggregate
+from core.review_analyzer import BookingReviewAnalyzer
+
+_DONE = object()
+_STOPPED = object()
+
+
+class _StageFailed:
+    """Travels down the pipeline in place of a result when a stage raised"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _put(q, item, stop):
+    """Blocking put that gives up once stop is set; returns whether the item went in"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q, stop):
+    """Blocking get that returns _STOPPED once stop is set"""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return _STOPPED
+
+
+class _StageThread(threading.Thread):
+    def __init__(self, name, process, inbox, outbox, torch_threads, stop):
+        """Applies process to every item of inbox, in order, and puts the results in outbox"""
+        super().__init__(name=f"pipeline-{name}", daemon=True)
+        self.stage_name = name
+        self.process = process
+        self.inbox = inbox
+        self.outbox = outbox
+        self.torch_threads = torch_threads
+        self.stop = stop
+
+        self.chunks = 0
+        self.busy_seconds = 0.0
+        self.waiting_seconds = 0.0
+
+    def run(self):
+        if self.torch_threads:
+            import torch
+            torch.set_num_threads(self.torch_threads)
+
+        while True:
+            start = time.perf_counter()
+            item = _get(self.inbox, self.stop)
+            self.waiting_seconds += time.perf_counter() - start
+            if item is _STOPPED:
+                return
+            if item is _DONE or isinstance(item, _StageFailed):
+                _put(self.outbox, item, self.stop)
+                return
+
+            start = time.perf_counter()
+            try:
+                result = self.process(item)
+            except Exception as e:
+                _put(self.outbox, _StageFailed(e), self.stop)
+                return
+            self.busy_seconds += time.perf_counter() - start
+            self.chunks += 1
+
+            start = time.perf_counter()
+            if not _put(self.outbox, result, self.stop):
+                return
+            self.waiting_seconds += time.perf_counter() - start
+
+    def stats(self):
+        return {
+            "torch_threads": self.torch_threads,
+            "chunks": self.chunks,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "waiting_seconds": round(self.waiting_seconds, 3)
+        }
+
+
+class PipelinedReviewAnalyzer:
+    def __init__(self, chunk_size=64, queue_size=2, sentiment_threads=None, keyword_threads=None,
+                 analyzer=None, **analyzer_kwargs):
+        """
+        Pipelined analysis with one BookingReviewAnalyzer (analyzer, or one built
+        from analyzer_kwargs). sentiment_threads / keyword_threads are the torch
+        threads of the two model stages; by default the cores are split between them.
+        """
+        self.chunk_size = chunk_size
+        self.queue_size = queue_size
+        self.analyzer = analyzer or BookingReviewAnalyzer(**analyzer_kwargs)
+
+        cores = os.cpu_count() or 1
+        self.sentiment_threads = sentiment_threads or max(1, cores // 2)
+        self.keyword_threads = keyword_threads or max(1, cores - self.sentiment_threads)
+        self.last_run = {}
+
+    def _feed(self, chunks, inboxes, stop):
+        """Split every chunk into segments and hand them to both model stages"""
+        try:
+            for chunk in chunks:
+                segments = self.analyzer._segments(chunk)
+                for inbox in inboxes:
+                    if not _put(inbox, segments, stop):
+                        return
+            last = _DONE
+        except Exception as e:
+            last = _StageFailed(e)
+        for inbox in inboxes:
+            _put(inbox, last, stop)
+
+    def analyze_reviews(self, reviews_data, batch_size=32):
+        """Same output as BookingReviewAnalyzer.analyze_reviews, computed by the pipeline"""
+        print(f"Analyzing {len(reviews_data)} reviews in a pipeline of {self.chunk_size}-review chunks...")
+        analyzer = self.analyzer
+        # Load both models up front rather than inside the first chunk of each stage
+        analyzer.load_models()
+
+        chunks = [reviews_data[start:start + self.chunk_size]
+                  for start in range(0, len(reviews_data), self.chunk_size)]
+        stop = threading.Event()
+        sentiment_in, keyword_in, sentiment_out, keyword_out = (queue.Queue(self.queue_size) for _ in range(4))
+        stages = [
+            _StageThread("sentiment",
+                         lambda segments: analyzer._analyze_texts_sentiment(
+                             segments, batch_size, analyzer._segment_priors(segments)),
+                         sentiment_in, sentiment_out, self.sentiment_threads, stop),
+            _StageThread("keywords", analyzer._segment_keywords,
+                         keyword_in, keyword_out, self.keyword_threads, stop),
+        ]
+        feeder = threading.Thread(target=self._feed, args=(chunks, [sentiment_in, keyword_in], stop),
+                                  name="pipeline-feeder", daemon=True)
+
+        aggregate = ReviewAggregate()
+        detailed_reviews = []
+        waiting_seconds = assemble_seconds = 0.0
+        start_time = time.perf_counter()
+        try:
+            for stage in stages:
+                stage.start()
+            feeder.start()
+
+            for chunk in chunks:
+                start = time.perf_counter()
+                sentiments = _get(sentiment_out, stop)
+                keywords = _get(keyword_out, stop)
+                waiting_seconds += time.perf_counter() - start
+                for result in (sentiments, keywords):
+                    if isinstance(result, _StageFailed):
+                        raise result.error
+
+                start = time.perf_counter()
+                segment_keywords, doc_embeddings = keywords
+                analyzed = analyzer._assemble_chunk(chunk, analyzer._segments(chunk), sentiments,
+                                                    segment_keywords, doc_embeddings)
+                with instrumentation.stage("review_analyzer.aggregate", items=len(analyzed)):
+                    for detailed_review, pos_analysis, neg_analysis in analyzed:
+                        aggregate.add(detailed_review, pos_analysis, neg_analysis)
+                        detailed_reviews.append(detailed_review)
+                assemble_seconds += time.perf_counter() - start
+        finally:
+            stop.set()
+            feeder.join()
+            for stage in stages:
+                stage.join()
+
+        self.last_run = {
+            "reviews": len(reviews_data),
+            "chunks": len(chunks),
+            "seconds": round(time.perf_counter() - start_time, 3),
+            "stages": {stage.stage_name: stage.stats() for stage in stages},
+            "assemble": {"busy_seconds": round(assemble_seconds, 3), "waiting_seconds": round(waiting_seconds, 3)}
+        }
+
+        results = aggregate.to_results()
+        results["detailed_reviews"] = detailed_reviews
+        print("Analysis completed! ✅")
+        return results
+
+
+if __name__ == "__main__":
+    pipeline = PipelinedReviewAnalyzer(chunk_size=8)
+    results = pipeline.analyze_reviews(SAMPLE_REVIEWS * 4)
+
+    print(f"Total reviews: {results['summary']['total_reviews']} in {pipeline.last_run['seconds']}s")
+    for name, stats in pipeline.last_run["stages"].items():
+        print(f"   {name}: {stats['torch_threads']} torch threads | busy {stats['busy_seconds']}s"
+              f" | waiting {stats['waiting_seconds']}s")
+    print(f"   categorize + aggregate: busy {pipeline.last_run['assemble']['busy_seconds']}s"
+          f" | waiting {pipeline.last_run['assemble']['waiting_seconds']}s")
@@ -0,0 +1,315 @@
+"""
+Per-hotel, per-period aggregation of analyzed reviews.
+
+ReviewAggregate treats its input as one hotel. PortfolioAggregate keeps the
+same totals for every (hotel, period) group, in NumPy arrays:
+- reviews, positive reviews, sentiment count and confidence sum per group
+- category mentions per group x category x sentiment, confidence sums and
+  model-scored mentions per group x category (lexicon answers have no confidence)
+- keyword counts as sparse (side, group, keyword, count) rows
+Hotel and period come from two optional fields of each review (hotel_id and
+data by default; the date can be a date/datetime or an ISO string). A date
+that can't be parsed counts as no period, like a missing one, so a single bad
+field never aborts a run; invalid_dates counts them.
+
+Any slice or group-by is then a few array reductions over the groups, with
+no model calls:
+
+    portfolio = analyzer.analyze_portfolio(reviews)
+    portfolio.results(hotels=["roma-01"], since="2024-06")   # analyze_reviews-style output
+    portfolio.rollup("hotel")                                # {hotel: output}
+    portfolio.table(("hotel", "period"))                     # raw arrays for dashboards
+
+A slice gives exactly what ReviewAggregate would give for the same reviews
+in the same order (ties in the rankings included): every first mention is
+recorded with a sequence number, so slices know which came first.
+
+since/until are compared as strings with the period keys, so they must use
+the portfolio's period format: "2024-06" (month), "2024-Q2" (quarter),
+"2024" (year) or "2024-06-15" (day).
+"""
+from array import array
+from collections import Counter
+from datetime import date, datetime
+import numpy as np
+from core.review_aggregate import ReviewAggregate
+from core.review_columns import Vocabulary
+
+SENTIMENTS = ("Negative", "Neutral", "Positive")
+PERIODS = ("day", "month", "quarter", "year")
+# Per-group totals, in this order
+TOTALS = ("total_reviews", "positive_reviews", "sentiment_count", "confidence_sum")
+NEVER = np.iinfo(np.int64).max
+
+
+def period_key(value, period="month"):
+    """'2024-07' (month), '2024-Q3', '2024' or '2024-07-15' for a date, datetime or ISO string"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    elif not isinstance(value, date):
+        value = date.fromisoformat(str(value)[:10])
+
+    if period == "day":
+        return value.isoformat()
+    if period == "month":
+        return f"{value.year}-{value.month:02d}"
+    if period == "quarter":
+        return f"{value.year}-Q{(value.month - 1) // 3 + 1}"
+    if period == "year":
+        return str(value.year)
+    raise ValueError(f"Unknown period: {period} (use one of {', '.join(PERIODS)})")
+
+
+def _sort_key(key):
+    # Missing hotels/periods (None) sort last
+    return (key is None, key or "")
+
+
+class PortfolioAggregate:
+    def __init__(self, period="month", hotel_field="hotel_id", date_field="data"):
+        """Empty portfolio; reviews are grouped by their hotel_field and the period of their date_field"""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: {period} (use one of {', '.join(PERIODS)})")
+        self.period = period
+        self.hotel_field = hotel_field
+        self.date_field = date_field
+
+        self.groups = {}                 # (hotel, period) -> group index
+        self.group_keys = []
+        self.categories = Vocabulary()
+        self.keywords = Vocabulary()
+        self._seq = 0
+        self.invalid_dates = 0
+
+        # Events not folded into the arrays yet (see _flush)
+        self._totals_events = array("q")         # group, total, positive, sentiments, confidence
+        self._category_events = array("q")       # group, category, sentiment, confidence, scored, seq
+        self._keyword_events = array("q")        # side, group, keyword, seq
+
+        self._totals = np.zeros((0, len(TOTALS)), dtype=np.int64)
+        self._category_counts = np.zeros((0, 0, len(SENTIMENTS)), dtype=np.int64)
+        self._category_confidence = np.zeros((0, 0), dtype=np.int64)
+        self._category_scored = np.zeros((0, 0), dtype=np.int64)
+        self._category_first = np.full((0, 0), NEVER, dtype=np.int64)
+        self._sentiment_first = np.full((0, 0, len(SENTIMENTS)), NEVER, dtype=np.int64)
+        # Sparse keyword counts: one row per (side, group, keyword); side 0 = strengths, 1 = issues
+        self._keyword_rows = np.zeros((0, 5), dtype=np.int64)   # side, group, keyword, count, first seq
+
+    def _group(self, review):
+        hotel = review.get(self.hotel_field)
+        try:
+            period = period_key(review.get(self.date_field), self.period)
+        except ValueError:
+            self.invalid_dates += 1
+            period = None
+        key = (None if hotel is None else str(hotel), period)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = len(self.group_keys)
+            self.group_keys.append(key)
+        return group
+
+    def add(self, review, detailed_review, pos_analysis=None, neg_analysis=None):
+        """Add one analyzed review; same counting rules as ReviewAggregate.add"""
+        group = self._group(review)
+
+        sentiments = 0
+        confidence = 0
+        for analysis in (pos_analysis, neg_analysis):
+            if analysis is not None and analysis["confidence"] is not None:
+                sentiments += 1
+                confidence += round(analysis["confidence"] * 1000)
+        positive = detailed_review["negative_sentiment"] in ["None", "Neutral"]
+        self._totals_events.extend((group, 1, int(positive), sentiments, confidence))
+
+        if pos_analysis is not None:
+            sentiment = SENTIMENTS.index(pos_analysis["sentiment"])
+            scored = pos_analysis["confidence"] is not None
+            pos_confidence = round(pos_analysis["confidence"] * 1000) if scored else 0
+            for category in detailed_review["categories_mentioned"]:
+                self._category_events.extend((group, self.categories.intern(category), sentiment,
+                                              pos_confidence, int(scored), self._seq))
+                self._seq += 1
+
+        for side, field in enumerate(("key_strengths", "key_issues")):
+            for keyword in detailed_review[field]:
+                self._keyword_events.extend((side, group, self.keywords.intern(keyword), self._seq))
+                self._seq += 1
+
+    def extend(self, reviews, analyzed):
+        """Add reviews with their (detailed_review, pos_analysis, neg_analysis) from _analyze_chunk"""
+        for review, (detailed_review, pos_analysis, neg_analysis) in zip(reviews, analyzed):
+            self.add(review, detailed_review, pos_analysis, neg_analysis)
+
+    def _flush(self):
+        """Fold the pending events into the arrays"""
+        groups, categories = len(self.group_keys), len(self.categories.words)
+        if self._totals.shape[0] < groups or self._category_confidence.shape[1] < categories:
+            self._resize(groups, categories)
+
+        if self._totals_events:
+            events = np.frombuffer(self._totals_events, dtype=np.int64).reshape(-1, 1 + len(TOTALS))
+            np.add.at(self._totals, events[:, 0], events[:, 1:])
+            self._totals_events = array("q")
+
+        if self._category_events:
+            group, category, sentiment, confidence, scored, seq = np.frombuffer(
+                self._category_events, dtype=np.int64).reshape(-1, 6).T
+            np.add.at(self._category_counts, (group, category, sentiment), 1)
+            np.add.at(self._category_confidence, (group, category), confidence)
+            np.add.at(self._category_scored, (group, category), scored)
+            np.minimum.at(self._category_first, (group, category), seq)
+            np.minimum.at(self._sentiment_first, (group, category, sentiment), seq)
+            self._category_events = array("q")
+
+        if self._keyword_events:
+            side, group, keyword, seq = np.frombuffer(self._keyword_events, dtype=np.int64).reshape(-1, 4).T
+            fresh = np.stack([side, group, keyword, np.ones_like(seq), seq], axis=1)
+            self._keyword_rows = _reduce_keywords(np.concatenate([self._keyword_rows, fresh]))
+            self._keyword_events = array("q")
+
+    def _resize(self, groups, categories):
+        def grown(old, shape, fill):
+            new = np.full(shape, fill, dtype=np.int64)
+            new[tuple(slice(0, n) for n in old.shape)] = old
+            return new
+
+        sentiments = len(SENTIMENTS)
+        self._totals = grown(self._totals, (groups, len(TOTALS)), 0)
+        self._category_counts = grown(self._category_counts, (groups, categories, sentiments), 0)
+        self._category_confidence = grown(self._category_confidence, (groups, categories), 0)
+        self._category_scored = grown(self._category_scored, (groups, categories), 0)
+        self._category_first = grown(self._category_first, (groups, categories), NEVER)
+        self._sentiment_first = grown(self._sentiment_first, (groups, categories, sentiments), NEVER)
+
+    def _select(self, hotels=None, since=None, until=None):
+        """
+        Mask of the groups in the slice; since/until are inclusive period keys,
+        in the same format as the portfolio's period (see period_key)
+        """
+        keys = self.group_keys
+        mask = np.ones(len(keys), dtype=bool)
+        if hotels is not None:
+            wanted = {None if h is None else str(h) for h in hotels}
+            mask &= np.array([hotel in wanted for hotel, _ in keys], dtype=bool)
+        if since is not None or until is not None:
+            mask &= np.array([period is not None and (since is None or period >= since)
+                              and (until is None or period <= until) for _, period in keys], dtype=bool)
+        return mask
+
+    def table(self, by=("hotel", "period"), hotels=None, since=None, until=None):
+        """
+        Totals of the slice grouped by "hotel", "period", both, or () for one row.
+        Returns keys (one per row) and arrays indexed [row], [row, category] or
+        [row, category, sentiment], with the category names and SENTIMENTS as columns.
+        """
+        self._flush()
+        by = (by,) if isinstance(by, str) else tuple(by)
+        positions = [("hotel", "period").index(field) for field in by]
+
+        mask = self._select(hotels, since, until)
+        selected = np.flatnonzero(mask)
+        row_keys = [tuple(self.group_keys[g][p] for p in positions) for g in selected]
+        keys = sorted(set(row_keys), key=lambda key: tuple(_sort_key(part) for part in key))
+        row_of_key = {key: row for row, key in enumerate(keys)}
+        rows = np.array([row_of_key[key] for key in row_keys], dtype=np.int64)
+
+        def reduce(values, ufunc, fill):
+            out = np.full((len(keys),) + values.shape[1:], fill, dtype=np.int64)
+            ufunc.at(out, rows, values[selected])
+            return out
+
+        totals = reduce(self._totals, np.add, 0)
+        mentions = reduce(self._category_counts, np.add, 0)
+        table = {
+            "by": by,
+            "keys": [key[0] if len(by) == 1 else key for key in keys],
+            "categories": list(self.categories.words),
+            "sentiments": SENTIMENTS,
+            **{name: totals[:, i] for i, name in enumerate(TOTALS)},
+            "category_sentiments": mentions,
+            "category_mentions": mentions.sum(axis=2),
+            "category_confidence": reduce(self._category_confidence, np.add, 0),
+            "category_scored": reduce(self._category_scored, np.add, 0),
+            "category_first": reduce(self._category_first, np.minimum, NEVER),
+            "sentiment_first": reduce(self._sentiment_first, np.minimum, NEVER),
+        }
+        with np.errstate(divide="ignore", invalid="ignore"):
+            table["positive_percentage"] = np.round(
+                np.where(table["total_reviews"] > 0, table["positive_reviews"] * 100 / table["total_reviews"], 0), 1)
+            table["average_confidence"] = np.round(np.where(
+                table["sentiment_count"] > 0, table["confidence_sum"] / 1000 / table["sentiment_count"], 0), 3)
+
+        # Keyword rows of the slice, re-keyed to table rows
+        keyword_rows = self._keyword_rows[mask[self._keyword_rows[:, 1]]]
+        group_row = np.zeros(len(self.group_keys), dtype=np.int64)
+        group_row[selected] = rows
+        keyword_rows[:, 1] = group_row[keyword_rows[:, 1]]
+        table["keyword_rows"] = _reduce_keywords(keyword_rows)
+        return table
+
+    def _aggregate(self, table, row):
+        """ReviewAggregate holding the totals of one table row"""
+        aggregate = ReviewAggregate()
+        for name in TOTALS:
+            setattr(aggregate, name, int(table[name][row]))
+
+        # Insert categories, sentiments and keywords in first-mention order, like the sequential run
+        first = table["category_first"][row]
+        for category in sorted(np.flatnonzero(first != NEVER), key=lambda c: first[c]):
+            name = self.categories.words[category]
+            aggregate.category_mentions[name] = int(table["category_mentions"][row, category])
+            aggregate.category_confidence[name] = int(table["category_confidence"][row, category])
+            aggregate.category_scored[name] = int(table["category_scored"][row, category])
+            sentiment_first = table["sentiment_first"][row, category]
+            aggregate.category_sentiments[name] = Counter({
+                SENTIMENTS[s]: int(table["category_sentiments"][row, category, s])
+                for s in sorted(np.flatnonzero(sentiment_first != NEVER), key=lambda s: sentiment_first[s])
+            })
+
+        keyword_rows = table["keyword_rows"]
+        start, end = np.searchsorted(keyword_rows[:, 1], [row, row + 1])
+        keyword_rows = keyword_rows[start:end]
+        keyword_rows = keyword_rows[np.argsort(keyword_rows[:, 4], kind="stable")]
+        words = self.keywords.words
+        aggregate.positive_keywords = Counter({words[k]: int(n) for side, _, k, n, _ in keyword_rows if side == 0})
+        aggregate.negative_keywords = Counter({words[k]: int(n) for side, _, k, n, _ in keyword_rows if side == 1})
+        return aggregate
+
+    def aggregate(self, hotels=None, since=None, until=None):
+        """ReviewAggregate of a slice of the portfolio"""
+        table = self.table((), hotels, since, until)
+        return self._aggregate(table, 0) if table["keys"] else ReviewAggregate()
+
+    def results(self, hotels=None, since=None, until=None):
+        """summary/categories/strengths/areas_for_improvement of a slice, as in analyze_reviews"""
+        return self.aggregate(hotels, since, until).to_results()
+
+    def rollup(self, by="hotel", hotels=None, since=None, until=None):
+        """{key: results} for every hotel, period or (hotel, period) in the slice"""
+        table = self.table(by, hotels, since, until)
+        return {key: self._aggregate(table, row).to_results() for row, key in enumerate(table["keys"])}
+
+    def hotels(self):
+        return sorted({hotel for hotel, _ in self.group_keys}, key=_sort_key)
+
+    def periods(self):
+        return sorted({period for _, period in self.group_keys}, key=_sort_key)
+
+
+def _reduce_keywords(rows):
+    """
+    Merge keyword rows with the same (side, group, keyword): counts add up, first seq is the minimum.
+    The result is sorted by group.
+    """
+    if len(rows) == 0:
+        return rows
+    order = np.lexsort((rows[:, 2], rows[:, 0], rows[:, 1]))
+    rows = rows[order]
+    starts = np.flatnonzero(np.concatenate([[True], np.any(rows[1:, :3] != rows[:-1, :3], axis=1)]))
+    reduced = rows[starts].copy()
+    reduced[:, 3] = np.add.reduceat(rows[:, 3], starts)
+    reduced[:, 4] = np.minimum.reduceat(rows[:, 4], starts)
+    return reduced
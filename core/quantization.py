@@ -0,0 +1,257 @@
+"""
+Int8 dynamic quantization backend for the CPU models.
+
+The Linear layers of the sentiment classifiers and the Marian translators are
+quantized with torch dynamic quantization (int8 weights, activations
+quantized on the fly). The first run quantizes the float32 checkpoint and
+saves the quantized weights; later runs build the model from its config with
+empty (meta) parameters, swap its Linear layers for int8 ones and load those
+weights directly, so the float32 Linear weights are never allocated.
+
+The cache is read with torch.load(weights_only=True): only tensors, packed
+int8 params and plain containers are accepted, never arbitrary pickled
+objects. A file that doesn't load that way is ignored and rebuilt.
+
+Opt in per class:
+    SentimentAnalyzer(quantized=True)
+    BookingReviewAnalyzer(quantized=True)   # the sentiment model; KeyBERT stays float32
+    Translator(quantized=True)
+
+    python -m core.quantization   # accuracy drift, latency and size vs float32
+"""
+import io
+import math
+import os
+import re
+import time
+from collections import Counter
+from core.constants import SAMPLE_REVIEWS
+
+QUANTIZED_CACHE_DIR = os.environ.get(
+    "QUANTIZED_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "ai-playground", "int8")
+)
+
+# transformers pipeline task -> model class
+MODEL_CLASSES = {
+    "sentiment-analysis": "AutoModelForSequenceClassification",
+    "translation": "AutoModelForSeq2SeqLM",
+}
+
+
+def quantize_model(model):
+    """Copy of model with every nn.Linear dynamically quantized to int8"""
+    import torch
+    return torch.ao.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_pipeline(pipeline):
+    """Swap the model of an already loaded pipeline for its quantized version"""
+    pipeline.model = quantize_model(pipeline.model)
+    return pipeline
+
+
+def quantized_weights_path(model_name, cache_dir=None):
+    """Cache file of a model; torch version in the name, packed weights aren't portable across versions"""
+    import torch
+    safe_name = re.sub(r"[^\w.-]+", "--", model_name.strip("/"))
+    return os.path.join(cache_dir or QUANTIZED_CACHE_DIR, f"{safe_name}-torch{torch.__version__}.pt")
+
+
+def _empty_quantized_model(model_class, config):
+    """
+    Quantized model_class skeleton with uninitialized weights: parameters start
+    on the meta device and every nn.Linear is replaced by an empty int8 one,
+    so no float32 Linear weight is ever allocated. Buffers are real.
+    """
+    import torch
+    from accelerate import init_empty_weights
+    from torch.ao.nn.quantized.dynamic import Linear as QuantizedLinear
+
+    with init_empty_weights(include_buffers=False):
+        model = model_class.from_config(config)
+
+    for name, module in list(model.named_modules()):
+        if type(module) is torch.nn.Linear:
+            parent_name, _, child = name.rpartition(".")
+            parent = model.get_submodule(parent_name) if parent_name else model
+            setattr(parent, child, QuantizedLinear(module.in_features, module.out_features,
+                                                   bias_=module.bias is not None, dtype=torch.qint8))
+    return model.eval()
+
+
+def load_quantized_model(model_name, model_class, cache_dir=None):
+    """
+    Quantized model_class for model_name, from the on-disk cache if it's there.
+    Otherwise the float32 checkpoint is loaded, quantized and cached.
+    """
+    import pickle
+    import torch
+    from transformers import AutoConfig, GenerationConfig
+
+    path = quantized_weights_path(model_name, cache_dir)
+    if os.path.exists(path):
+        try:
+            state_dict = torch.load(path, weights_only=True)
+        except (pickle.UnpicklingError, RuntimeError) as e:
+            print(f"Ignoring quantized cache {path}: {e}")
+        else:
+            model = _empty_quantized_model(model_class, AutoConfig.from_pretrained(model_name))
+            # assign: meta parameters take the loaded tensors instead of being copied into
+            # (tied embeddings share storage in the saved file, so they stay shared)
+            model.load_state_dict(state_dict, assign=True)
+            if model.can_generate():
+                model.generation_config = GenerationConfig.from_pretrained(model_name)
+            return model
+
+    print(f"Quantizing {model_name} to int8 (first run only)...")
+    model = quantize_model(model_class.from_pretrained(model_name))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    torch.save(model.state_dict(), tmp_path)
+    os.replace(tmp_path, path)
+    return model
+
+
+def load_quantized_pipeline(task, model_name, cache_dir=None):
+    """transformers pipeline running the int8 version of model_name"""
+    import transformers
+    from transformers import AutoTokenizer, pipeline
+
+    model_class = getattr(transformers, MODEL_CLASSES[task])
+    model = load_quantized_model(model_name, model_class, cache_dir)
+    return pipeline(task, model=model, tokenizer=AutoTokenizer.from_pretrained(model_name))
+
+
+def model_size_mb(model):
+    """Serialized size of the weights (packed int8 params included)"""
+    import torch
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 1024 ** 2
+
+
+def bleu(candidates, references, max_n=4):
+    """
+    Corpus BLEU (0-100) of candidates against one reference each, whitespace
+    tokenized, with add-one smoothing so short corpora don't collapse to 0.
+    """
+    matches = [0] * max_n
+    totals = [0] * max_n
+    candidate_length = reference_length = 0
+
+    for candidate, reference in zip(candidates, references):
+        candidate_tokens = candidate.lower().split()
+        reference_tokens = reference.lower().split()
+        candidate_length += len(candidate_tokens)
+        reference_length += len(reference_tokens)
+        for n in range(1, max_n + 1):
+            candidate_ngrams = Counter(tuple(candidate_tokens[i:i + n]) for i in range(len(candidate_tokens) - n + 1))
+            reference_ngrams = Counter(tuple(reference_tokens[i:i + n]) for i in range(len(reference_tokens) - n + 1))
+            matches[n - 1] += sum((candidate_ngrams & reference_ngrams).values())
+            totals[n - 1] += sum(candidate_ngrams.values())
+
+    if candidate_length == 0:
+        return 0.0
+    log_precision = sum(math.log((m + 1) / (t + 1)) for m, t in zip(matches, totals)) / max_n
+    brevity = 1.0 if candidate_length > reference_length else math.exp(1 - reference_length / candidate_length)
+    return round(100 * brevity * math.exp(log_precision), 2)
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def drift_report(italian_texts=None, english_texts=None):
+    """
+    Float32 vs int8 on the same inputs (the sample reviews by default):
+    label agreement and score drift for both sentiment models, BLEU of the int8
+    translations against the float32 ones, plus per-batch latency and weight size.
+    Each path is run once to warm up before it's timed.
+    """
+    from ai.sentiment_analyzer import SentimentAnalyzer
+    from ai.translator import Translator
+    from core.review_analyzer import BookingReviewAnalyzer
+
+    if italian_texts is None:
+        italian_texts = [text for review in SAMPLE_REVIEWS
+                         for text in (review.get("contenuto_positivo"), review.get("contenuto_negativo")) if text]
+    if english_texts is None:
+        english_texts = ["Hello, how are you? I hope you are doing well.",
+                         "The room was clean and the staff very friendly.",
+                         "Breakfast was good but the pool was too crowded."]
+
+    def sentiment_drift(name, make, classify, model_of):
+        rows = {}
+        for quantized in (False, True):
+            instance = make(quantized)
+            classify(instance, italian_texts[:2])
+            rows[quantized] = (*_timed(classify, instance, italian_texts), model_size_mb(model_of(instance)))
+        (float_results, float_seconds, float_mb), (int8_results, int8_seconds, int8_mb) = rows[False], rows[True]
+        agree = sum(a["label"] == b["label"] for a, b in zip(float_results, int8_results))
+        return {
+            "model": name,
+            "texts": len(italian_texts),
+            "label_agreement": round(agree / len(italian_texts), 3) if italian_texts else 1.0,
+            "mean_score_drift": round(sum(abs(a["score"] - b["score"]) for a, b in zip(float_results, int8_results))
+                                      / max(1, len(italian_texts)), 4),
+            "float32_batch_ms": round(float_seconds * 1000, 1),
+            "int8_batch_ms": round(int8_seconds * 1000, 1),
+            "float32_mb": round(float_mb, 1),
+            "int8_mb": round(int8_mb, 1)
+        }
+
+    def translation_drift(direction, texts):
+        rows = {}
+        for quantized in (False, True):
+            translator = Translator(quantized=quantized)
+            translate = getattr(translator, f"translate_batch_{direction}")
+            translate(texts[:1])
+            pipeline = translator.it_to_en if direction == "it_to_en" else translator.en_to_it
+            results, seconds = _timed(translate, texts)
+            rows[quantized] = ([r["translated"] for r in results], seconds, model_size_mb(pipeline.model))
+        (float_texts, float_seconds, float_mb), (int8_texts, int8_seconds, int8_mb) = rows[False], rows[True]
+        return {
+            "direction": direction,
+            "texts": len(texts),
+            "bleu_vs_float32": bleu(int8_texts, float_texts),
+            "exact_match": round(sum(a == b for a, b in zip(float_texts, int8_texts)) / max(1, len(texts)), 3),
+            "float32_batch_ms": round(float_seconds * 1000, 1),
+            "int8_batch_ms": round(int8_seconds * 1000, 1),
+            "float32_mb": round(float_mb, 1),
+            "int8_mb": round(int8_mb, 1)
+        }
+
+    return {
+        "sentiment": [
+            sentiment_drift("SentimentAnalyzer",
+                            lambda quantized: SentimentAnalyzer(quantized=quantized),
+                            lambda analyzer, texts: analyzer._classify(texts),
+                            lambda analyzer: analyzer.classifier.model),
+            sentiment_drift("BookingReviewAnalyzer",
+                            lambda quantized: BookingReviewAnalyzer(quantized=quantized),
+                            lambda analyzer, texts: [{"label": r["sentiment"], "score": r["confidence"]}
+                                                     for r in analyzer._analyze_texts_sentiment(texts)],
+                            lambda analyzer: analyzer.sentiment_analyzer.model),
+        ],
+        "translation": [
+            translation_drift("it_to_en", italian_texts),
+            translation_drift("en_to_it", english_texts),
+        ]
+    }
+
+
+if __name__ == "__main__":
+    report = drift_report()
+
+    print("=== Int8 Quantization Drift Report ===")
+    for row in report["sentiment"]:
+        print(f"{row['model']}: label agreement {row['label_agreement']:.1%} | score drift {row['mean_score_drift']}"
+              f" | batch {row['float32_batch_ms']}ms -> {row['int8_batch_ms']}ms"
+              f" | weights {row['float32_mb']}MB -> {row['int8_mb']}MB")
+    for row in report["translation"]:
+        print(f"Translator {row['direction']}: BLEU vs float32 {row['bleu_vs_float32']}"
+              f" | exact match {row['exact_match']:.1%} | batch {row['float32_batch_ms']}ms -> {row['int8_batch_ms']}ms"
+              f" | weights {row['float32_mb']}MB -> {row['int8_mb']}MB")
@@ -0,0 +1,156 @@
+import hashlib
+import sqlite3
+import time
+import unicodedata
+
+
+class SentimentCache:
+    def __init__(self, path="sentiment_cache.sqlite", model_id="", max_entries=1_000_000, touch_interval=3600):
+        """
+        Local cache of raw sentiment pipeline results ({'label', 'score'}),
+        keyed by a hash of (model id, normalized text).
+        Duplicates inside a batch are looked up once, the least recently used
+        entries are evicted past max_entries (down to 90% of it), and the counters
+        report hits, misses and the inference time the hits saved.
+        As in EmbeddingCache, recency is only refreshed for hits older than
+        touch_interval seconds, batched into the next write.
+        """
+        self.path = path
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self._touched = set()
+        self.hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+
+        # The pipelined analyzer uses the cache from its stage thread (one thread at a time)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sentiments ("
+            " key BLOB PRIMARY KEY,"
+            " label TEXT NOT NULL,"
+            " score REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_sentiments_last_used ON sentiments (last_used)")
+        # Running model cost, so the time-saved estimate survives across runs
+        self.conn.execute("CREATE TABLE IF NOT EXISTS inference_cost (model TEXT PRIMARY KEY,"
+                          " seconds REAL NOT NULL, texts INTEGER NOT NULL)")
+        self.conn.commit()
+        # Upper bound on the rows in the file, recounted only past max_entries
+        self._entries = self.conn.execute("SELECT COUNT(*) FROM sentiments").fetchone()[0]
+
+    def _key(self, text):
+        normalized = " ".join(unicodedata.normalize("NFC", text).split())
+        return hashlib.sha256(f"{self.model_id}\0{normalized}".encode("utf-8")).digest()
+
+    def get_many(self, texts):
+        """Return {text: raw result} for the texts already cached"""
+        keys = {}
+        for text in texts:
+            keys.setdefault(self._key(text), []).append(text)
+        self.deduplicated += len(texts) - len(keys)
+
+        found = {}
+        key_list = list(keys)
+        for start in range(0, len(key_list), 500):
+            chunk = key_list[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT key, label, score, last_used FROM sentiments WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            stale = time.time() - self.touch_interval
+            for key, label, score, last_used in rows:
+                found[key] = {"label": label, "score": score}
+                if last_used < stale:
+                    self._touched.add(key)
+
+        if len(self._touched) >= 1000:
+            self.flush()
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return {text: result for key, result in found.items() for text in keys[key]}
+
+    def put_many(self, results, seconds=None):
+        """
+        Store {text: raw result}. seconds is how long the model took to produce
+        them, used to estimate the time saved by later hits.
+        """
+        now = time.time()
+        with self.conn:
+            self._write_touched(now)
+            if seconds is not None:
+                self.conn.execute(
+                    "INSERT INTO inference_cost (model, seconds, texts) VALUES (?, ?, ?) "
+                    "ON CONFLICT(model) DO UPDATE SET seconds = seconds + excluded.seconds,"
+                    " texts = texts + excluded.texts",
+                    (self.model_id, seconds, len(results))
+                )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO sentiments (key, label, score, last_used) VALUES (?, ?, ?, ?)",
+                [(self._key(text), result["label"], float(result["score"]), now)
+                 for text, result in results.items()]
+            )
+            self._entries += len(results)
+            if self._entries > self.max_entries:
+                count = self.conn.execute("SELECT COUNT(*) FROM sentiments").fetchone()[0]
+                if count > self.max_entries:
+                    self.conn.execute(
+                        "DELETE FROM sentiments WHERE key IN "
+                        "(SELECT key FROM sentiments ORDER BY last_used LIMIT ?)",
+                        (count - int(self.max_entries * 0.9),)
+                    )
+                    count = int(self.max_entries * 0.9)
+                self._entries = count
+
+    def flush(self):
+        """Write the pending recency refreshes"""
+        if self._touched:
+            with self.conn:
+                self._write_touched(time.time())
+
+    def _write_touched(self, now):
+        # Refresh recency so frequent texts survive eviction
+        self.conn.executemany("UPDATE sentiments SET last_used = ? WHERE key = ?",
+                              [(now, key) for key in self._touched])
+        self._touched.clear()
+
+    def classify(self, texts, classify_fn):
+        """
+        Raw results for texts, in order, calling classify_fn(list of texts)
+        only for distinct texts that are not cached yet.
+        """
+        results = self.get_many(texts)
+        missing = [text for text in dict.fromkeys(texts) if text not in results]
+
+        if missing:
+            start = time.perf_counter()
+            computed = classify_fn(missing)
+            fresh = {text: {"label": r["label"], "score": r["score"]} for text, r in zip(missing, computed)}
+            self.put_many(fresh, seconds=time.perf_counter() - start)
+            results.update(fresh)
+
+        return [results[text] for text in texts]
+
+    def stats(self):
+        """Hit/miss counters of this process and the inference time they saved"""
+        lookups = self.hits + self.misses
+        cost = self.conn.execute("SELECT seconds, texts FROM inference_cost WHERE model = ?",
+                                 (self.model_id,)).fetchone()
+        seconds_per_text = cost[0] / cost[1] if cost and cost[1] else 0.0
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "deduplicated": self.deduplicated,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "seconds_saved": round((self.hits + self.deduplicated) * seconds_per_text, 3),
+            "max_entries": self.max_entries
+        }
+
+    def close(self):
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,144 @@
+from collections import Counter
+
+
+class ReviewAggregate:
+    def __init__(self):
+        """
+        Running totals behind the summary/categories/strengths/areas_for_improvement
+        output of BookingReviewAnalyzer.
+        Confidences are kept as integer thousandths (they are rounded to 3 decimals
+        anyway), so sums are exact whatever order reviews are added in.
+        Only model confidences are averaged: analyses the lexicon answered
+        (confidence None) count for the sentiments but not for the confidence
+        averages, hence sentiment_count and category_scored.
+        """
+        self.total_reviews = 0
+        self.positive_reviews = 0
+        self.sentiment_count = 0
+        self.confidence_sum = 0
+        self.category_mentions = {}
+        self.category_confidence = {}
+        self.category_scored = {}
+        self.category_sentiments = {}
+        self.positive_keywords = Counter()
+        self.negative_keywords = Counter()
+
+    def add(self, detailed_review, pos_analysis=None, neg_analysis=None):
+        """Add one analyzed review (and the sentiment of its positive/negative parts)"""
+        self.total_reviews += 1
+        if detailed_review["negative_sentiment"] in ["None", "Neutral"]:
+            self.positive_reviews += 1
+
+        for analysis in (pos_analysis, neg_analysis):
+            if analysis is not None and analysis["confidence"] is not None:
+                self.sentiment_count += 1
+                self.confidence_sum += round(analysis["confidence"] * 1000)
+
+        if pos_analysis is not None:
+            scored = pos_analysis["confidence"] is not None
+            confidence = round(pos_analysis["confidence"] * 1000) if scored else 0
+            for cat in detailed_review["categories_mentioned"]:
+                self.category_mentions[cat] = self.category_mentions.get(cat, 0) + 1
+                self.category_confidence[cat] = self.category_confidence.get(cat, 0) + confidence
+                self.category_scored[cat] = self.category_scored.get(cat, 0) + scored
+                self.category_sentiments.setdefault(cat, Counter())[pos_analysis["sentiment"]] += 1
+
+        self.positive_keywords.update(detailed_review["key_strengths"])
+        self.negative_keywords.update(detailed_review["key_issues"])
+
+    def merge(self, other):
+        """
+        Add the totals of another aggregate (e.g. a shard) to this one.
+        Merging shards in input order gives exactly the totals of a sequential run.
+        """
+        self.total_reviews += other.total_reviews
+        self.positive_reviews += other.positive_reviews
+        self.sentiment_count += other.sentiment_count
+        self.confidence_sum += other.confidence_sum
+
+        for cat, mentions in other.category_mentions.items():
+            self.category_mentions[cat] = self.category_mentions.get(cat, 0) + mentions
+            self.category_confidence[cat] = self.category_confidence.get(cat, 0) + other.category_confidence[cat]
+            self.category_scored[cat] = self.category_scored.get(cat, 0) + other.category_scored[cat]
+            self.category_sentiments.setdefault(cat, Counter()).update(other.category_sentiments[cat])
+
+        self.positive_keywords.update(other.positive_keywords)
+        self.negative_keywords.update(other.negative_keywords)
+        return self
+
+    def to_results(self):
+        """Build the summary, categories, strengths and areas_for_improvement sections"""
+        total_reviews = self.total_reviews
+        positive_ratio = self.positive_reviews / total_reviews if total_reviews else 0
+        avg_confidence = self.confidence_sum / 1000 / self.sentiment_count if self.sentiment_count else 0
+
+        results = {
+            "summary": {
+                "total_reviews": total_reviews,
+                "overall_sentiment": "Very Positive" if positive_ratio > 0.8 else "Positive",
+                "average_confidence": round(avg_confidence, 3),
+                "positive_percentage": round(positive_ratio * 100, 1)
+            },
+            "categories": {},
+            "strengths": [],
+            "areas_for_improvement": []
+        }
+
+        # Calculate category insights
+        for category, mentions in self.category_mentions.items():
+            scored = self.category_scored[category]
+            avg_conf = self.category_confidence[category] / 1000 / scored if scored else 0
+            most_common_sentiment = self.category_sentiments[category].most_common(1)[0][0]
+
+            results["categories"][category] = {
+                "mentions": mentions,
+                "avg_sentiment": most_common_sentiment,
+                "confidence": round(avg_conf, 3)
+            }
+
+        # Top positive aspects (filter out generic words)
+        meaningful_strengths = [(k, v) for k, v in self.positive_keywords.most_common(10)
+                                if len(k) > 3 and k not in ['tutto', 'molto', 'bene']]
+
+        # Real improvement areas from negative feedback
+        real_issues = [(k, v) for k, v in self.negative_keywords.most_common(5)
+                       if v > 0 and k not in ['meno', 'poco']]
+
+        results["strengths"] = meaningful_strengths[:5]
+        results["areas_for_improvement"] = real_issues[:3]
+        return results
+
+    def to_dict(self):
+        """JSON-friendly state, e.g. for checkpoints"""
+        return {
+            "total_reviews": self.total_reviews,
+            "positive_reviews": self.positive_reviews,
+            "sentiment_count": self.sentiment_count,
+            "confidence_sum": self.confidence_sum,
+            "category_mentions": self.category_mentions,
+            "category_confidence": self.category_confidence,
+            "category_scored": self.category_scored,
+            "category_sentiments": {cat: dict(c) for cat, c in self.category_sentiments.items()},
+            "positive_keywords": dict(self.positive_keywords),
+            "negative_keywords": dict(self.negative_keywords)
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        aggregate = cls()
+        aggregate.load_dict(state)
+        return aggregate
+
+    def load_dict(self, state):
+        """Replace the current totals with a state produced by to_dict"""
+        self.total_reviews = state["total_reviews"]
+        self.positive_reviews = state["positive_reviews"]
+        self.sentiment_count = state["sentiment_count"]
+        self.confidence_sum = state["confidence_sum"]
+        self.category_mentions = dict(state["category_mentions"])
+        self.category_confidence = dict(state["category_confidence"])
+        # States saved before the lexicon cascade: every mention had a model confidence
+        self.category_scored = dict(state.get("category_scored", state["category_mentions"]))
+        self.category_sentiments = {cat: Counter(c) for cat, c in state["category_sentiments"].items()}
+        self.positive_keywords = Counter(state["positive_keywords"])
+        self.negative_keywords = Counter(state["negative_keywords"])
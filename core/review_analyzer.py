@@ -55,29 +55,75 @@ Combina sentiment + keywords + categories
 Conta menzioni per categoria
 Genera insights: "staff eccellente (9 menzioni positive)"
 """
+import hashlib
+import json
+import os
 import re
-from collections import defaultdict, Counter
-from transformers import pipeline
-from keybert import KeyBERT
-from constants import SAMPLE_REVIEWS
+import time
+from itertools import islice
+import numpy as np
+from core.constants import SAMPLE_REVIEWS
+from core.embedding_cache import EmbeddingCache
+from core.embedding_index import ReviewEmbeddingIndex
+from core.instrumentation import instrumentation
+from core.keyword_matcher import KeywordMatcher
+from core.lexicon import SentimentLexicon, cascade_report, lexicon_label
+from core.long_text import window_sentiment
+from core.model_registry import get_keybert, get_model_config, get_pipeline
+from core.portfolio_aggregate import PortfolioAggregate
+from core.result_cache import SentimentCache
+from core.review_aggregate import ReviewAggregate
+from core.review_columns import ReviewColumns
+
+SENTIMENT_MODEL = "cardiffnlp/twitter-xlm-roberta-base-sentiment"
+KEYBERT_MODEL = 'distilbert-base-multilingual-cased'
+
+
+def review_id(review):
+    """Stable id of a review: its "id" field, or a hash of its title and content"""
+    if review.get("id") is not None:
+        return str(review["id"])
+    content = json.dumps([review.get("titolo"), review.get("contenuto_positivo"),
+                          review.get("contenuto_negativo")], ensure_ascii=False)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:20]
 
 
 class BookingReviewAnalyzer:
-    def __init__(self):
+    def __init__(self, embedding_cache_path=None, word_boundary=False, sentiment_cache_path=None,
+                 quantized=False, long_text=False, window_strategy="length_weighted",
+                 embedding_index_path=None, cascade_threshold=None):
         """
         Professional analyzer for Booking.com reviews.
         Designed for hospitality business intelligence.
+        With embedding_cache_path, KeyBERT embeddings are reused across runs.
+        With word_boundary, category keywords only match whole words.
+        With sentiment_cache_path, segments already seen skip the sentiment model.
+        With quantized, the sentiment model runs in int8 (see core.quantization).
+        With long_text, segments over the model limit are classified in overlapping
+        windows instead of being truncated (see core.long_text for window_strategy).
+        With embedding_index_path, the KeyBERT embedding of every analyzed segment is
+        kept in a memory-mapped index for find_similar_reviews (see core.embedding_index).
+        With cascade_threshold, short segments the lexicon scores at least that confident
+        skip the sentiment model (see core.lexicon).
         """
-        print("Loading sentiment analysis model for hospitality reviews...")
-        self.sentiment_analyzer = pipeline(
-            "sentiment-analysis",
-            model="cardiffnlp/twitter-xlm-roberta-base-sentiment"
-        )
-
-        print("Loading KeyBERT model for intelligent keyword extraction...")
-        self.kw_model = KeyBERT('distilbert-base-multilingual-cased')
-
-        print("Models loaded! Ready to analyze guest feedback 🏨")
+        # Models are loaded on first use through the shared registry (see the properties below)
+        self.quantized = quantized
+        self.long_text = long_text
+        self.window_strategy = window_strategy
+        self.sentiment_cache = None
+        if sentiment_cache_path:
+            model_id = f"{SENTIMENT_MODEL}:int8" if quantized else SENTIMENT_MODEL
+            if long_text:
+                model_id += f":window-{window_strategy}"
+            self.sentiment_cache = SentimentCache(sentiment_cache_path, model_id=model_id)
+
+        self.embedding_cache = None
+        if embedding_cache_path:
+            self.embedding_cache = EmbeddingCache(embedding_cache_path, model_name=KEYBERT_MODEL)
+
+        self.embedding_index = None
+        if embedding_index_path:
+            self.embedding_index = ReviewEmbeddingIndex(embedding_index_path)
 
         # Categories mapping for hospitality industry
         self.categories = {
@@ -107,89 +153,254 @@ class BookingReviewAnalyzer:
                 'prezzo', 'rapporto', 'qualità/prezzo', 'valore', 'costo'
             ]
         }
+        self.keyword_matcher = KeywordMatcher(self.categories, word_boundary=word_boundary)
+
+        # Actionable issues in negative reviews
+        self.hospitality_issues = [
+            'rumoroso', 'piccolo', 'affollata', 'disorganizzato', 'lento',
+            'sporco', 'freddo', 'caldo', 'rotto', 'mancante', 'difficile'
+        ]
+
+        # First tier of the sentiment cascade: category keywords are known aspects, never polar.
+        # The issues aren't polar either: 'caldo' or 'piccolo' only describe, the model decides
+        self.cascade_threshold = cascade_threshold
+        self.lexicon = SentimentLexicon()
+        self.lexicon.add_words(aspects=[kw for keywords in self.categories.values() for kw in keywords])
+
+    @property
+    def sentiment_analyzer(self):
+        return get_pipeline("sentiment-analysis", SENTIMENT_MODEL, quantized=self.quantized)
+
+    @property
+    def sentiment_labels(self):
+        """id2label of the sentiment model, read from its config alone (the model may never load)"""
+        return get_model_config(SENTIMENT_MODEL).id2label
+
+    @property
+    def kw_model(self):
+        return get_keybert(KEYBERT_MODEL)
+
+    def load_models(self):
+        """Load both models now instead of on first use"""
+        self.sentiment_analyzer
+        self.kw_model
+        print("Models loaded! Ready to analyze guest feedback 🏨")
 
     def _analyze_text_sentiment(self, text):
         """Analyze sentiment of a single text"""
-        if not text or text.strip() == "":
-            return {"sentiment": "Neutral", "confidence": 0.0}
-
-        result = self.sentiment_analyzer(text)
+        return self._analyze_texts_sentiment([text])[0]
 
+    def _format_sentiment(self, result):
+        """Convert a raw pipeline result into our sentiment dict"""
         # Better sentiment mapping for hospitality context
         sentiment_map = {
             'LABEL_0': 'Negative',
             'LABEL_1': 'Neutral',
             'LABEL_2': 'Positive'
         }
-        raw_label = result[0]['label']
+        raw_label = result['label']
         sentiment = sentiment_map.get(raw_label, 'Positive')  # Default to positive for unknown
-        confidence = round(result[0]['score'], 3)
+        # Lexicon answers have no model score, their own confidence is kept apart
+        confidence = None if result['score'] is None else round(result['score'], 3)
 
-        return {"sentiment": sentiment, "confidence": confidence}
+        analysis = {"sentiment": sentiment, "confidence": confidence}
+        if "lexicon_confidence" in result:
+            analysis["lexicon_confidence"] = result["lexicon_confidence"]
+        return analysis
+
+    def _analyze_texts_sentiment(self, texts, batch_size=32, priors=None):
+        """
+        Batched version of _analyze_text_sentiment.
+        Every distinct non-empty text goes through the model once (or not at all
+        if the lexicon answers it or it's in the sentiment cache), sorted by token
+        length so each batch pads to roughly the same size.
+        priors (one per text, see _segment_priors) lets the lexicon answer bare texts;
+        lexicon answers are per (text, prior), so they never depend on the other texts.
+        Lexicon answers have confidence None and their own lexicon_confidence.
+        Returns one result per input text, in the same order.
+        """
+        if priors is None:
+            priors = [0] * len(texts)
+        occurrences = [(text, prior) for text, prior in zip(texts, priors) if text and text.strip()]
+        non_empty = [text for text, _ in occurrences]
+        lexicon_results = {}
+        if self.cascade_threshold is not None:
+            with instrumentation.stage("review_analyzer.lexicon", items=len(occurrences)):
+                decided, non_empty = self.lexicon.split(non_empty, self.cascade_threshold,
+                                                        [prior for _, prior in occurrences])
+            instrumentation.count("review_analyzer.lexicon_hit", len(decided))
+            if decided:
+                id2label = self.sentiment_labels
+                lexicon_results = {occurrence: {"label": lexicon_label(polarity, strong, id2label), "score": None,
+                                                "lexicon_confidence": confidence}
+                                   for occurrence, (polarity, strong, confidence) in decided.items()}
+        raw_results = {}
+        if self.sentiment_cache:
+            raw_results.update(self.sentiment_cache.get_many(non_empty))
+        unique_texts = [t for t in dict.fromkeys(non_empty) if t not in raw_results]
+
+        if unique_texts:
+            start_time = time.perf_counter()
+            if self.long_text:
+                # Windows of all texts are sorted and batched together inside window_sentiment
+                with instrumentation.stage("review_analyzer.sentiment", items=len(unique_texts)):
+                    results = window_sentiment(self.sentiment_analyzer, unique_texts, self.window_strategy,
+                                               batch_size=batch_size)
+                fresh = dict(zip(unique_texts, results))
+            else:
+                token_ids = self.sentiment_analyzer.tokenizer(unique_texts, truncation=True)['input_ids']
+                lengths = {text: len(ids) for text, ids in zip(unique_texts, token_ids)}
+                ordered = sorted(unique_texts, key=lengths.get)
+
+                fresh = {}
+                for start in range(0, len(ordered), batch_size):
+                    batch = ordered[start:start + batch_size]
+                    with instrumentation.stage("review_analyzer.sentiment", items=len(batch),
+                                               tokens=sum(lengths[text] for text in batch)):
+                        results = self.sentiment_analyzer(batch, batch_size=len(batch), truncation=True)
+                    fresh.update(zip(batch, results))
+
+            if self.sentiment_cache:
+                # Only model results: the cache stays valid whatever the cascade gate
+                self.sentiment_cache.put_many(fresh, seconds=time.perf_counter() - start_time)
+            raw_results.update(fresh)
+
+        # Model results are keyed by text, lexicon answers by (text, prior)
+        analyses = {text: self._format_sentiment(result) for text, result in raw_results.items()}
+        analyses.update((occurrence, self._format_sentiment(result)) for occurrence, result in lexicon_results.items())
+
+        neutral = {"sentiment": "Neutral", "confidence": 0.0}
+        return [analyses.get((text, prior)) or analyses.get(text, neutral) if text else neutral
+                for text, prior in zip(texts, priors)]
+
+    def cascade_report(self, texts, thresholds=(0.5, 0.6, 0.7, 0.8, 0.9, 1.0), batch_size=32, priors=None):
+        """Lexicon hit rate and agreement with the sentiment model per gate (see core.lexicon.cascade_report)"""
+        pipeline = self.sentiment_analyzer
+        return cascade_report(self.lexicon, texts,
+                              lambda batch: pipeline(batch, batch_size=batch_size, truncation=True),
+                              self.sentiment_labels, thresholds, priors)
 
     def _categorize_text(self, text):
         """Identify which categories are mentioned in the text"""
         if not text:
             return []
 
-        text_lower = text.lower()
-        mentioned_categories = []
+        return self.keyword_matcher.categorize(text)
 
-        for category, keywords in self.categories.items():
-            for keyword in keywords:
-                if keyword.lower() in text_lower:
-                    mentioned_categories.append(category)
-                    break
+    def _categorize_texts(self, texts):
+        """
+        Categorize a whole list of segments in one call.
+        Each entry has the category names and the matched keyword spans.
+        """
+        with instrumentation.stage("review_analyzer.categorize", items=len(texts)):
+            return self.keyword_matcher.categorize_many(texts)
 
-        return list(set(mentioned_categories))  # Remove duplicates
+    def add_category_keywords(self, category, keywords):
+        """Extend the categories mapping at runtime (the matcher is recompiled)"""
+        self.keyword_matcher.add_keywords(category, keywords)
+        self.categories = self.keyword_matcher.categories
+        self.lexicon.add_words(aspects=keywords)
 
     def _extract_keywords(self, text, is_negative=False):
         """
         Extract relevant keywords using KeyBERT NLP model from Hugging Face.
         Much more intelligent than regex-based extraction.
         """
-        if not text or len(text.strip()) < 10:
-            return []
+        return self._extract_keywords_batch([text], [is_negative])[0]
 
-        try:
-            # Use KeyBERT to extract semantically meaningful keywords
-            # Simplified version without problematic parameters
-            keywords = self.kw_model.extract_keywords(
-                text,
-                keyphrase_ngram_range=(1, 2),  # Single words and 2-word phrases
-                use_maxsum=False,  # Disable MaxSum to simplify
-                nr_candidates=10  # Fewer candidates
-            )
-
-            # Extract just the keyword strings (not the scores)
-            keyword_list = [kw[0] for kw in keywords]
-
-            # Additional filtering for hospitality context
-            if is_negative:
-                # For negative reviews, focus on actionable issues
-                hospitality_issues = [
-                    'rumoroso', 'piccolo', 'affollata', 'disorganizzato', 'lento',
-                    'sporco', 'freddo', 'caldo', 'rotto', 'mancante', 'difficile'
-                ]
-                filtered_keywords = []
-                for kw in keyword_list:
-                    # Keep hospitality-specific issues or any 2-word phrases (more specific)
-                    if any(issue in kw.lower() for issue in hospitality_issues) or ' ' in kw:
-                        filtered_keywords.append(kw)
-                    # Also keep if it's a facility with problem context
-                    elif any(facility in kw.lower() for facility in
-                             ['piscina', 'colazione', 'camera', 'servizio', 'trasporto']):
-                        filtered_keywords.append(kw)
-
-                return filtered_keywords[:3]
+    def _extract_keywords_batch(self, texts, negative_flags, top_n=5, chunk_size=2048, embeddings=None):
+        """
+        KeyBERT extraction for a whole corpus at once.
+        Documents are processed chunk_size at a time: the candidate vocabulary of
+        the chunk is built once, documents and unique candidates are embedded in
+        batched passes and each document is ranked against its own candidates only
+        (the n-grams of its sparse row), so memory is bounded by the chunk.
+        Returns one keyword list per text, filtered like the single-text version.
+        If a chunk fails, only its documents go to the simple fallback.
+        If embeddings (a dict) is given, it's filled with {document: embedding}.
+        """
+        keywords = [[] for _ in texts]
+        indices = [i for i, text in enumerate(texts) if text and len(text.strip()) >= 10]
+        if not indices:
+            return keywords
+
+        docs = list(dict.fromkeys(texts[i] for i in indices))
+
+        ranked = {}
+        for start in range(0, len(docs), chunk_size):
+            chunk = docs[start:start + chunk_size]
+            try:
+                with instrumentation.stage("review_analyzer.keywords", items=len(chunk)):
+                    ranked.update(self._rank_candidates(chunk, top_n, embeddings))
+            except Exception as e:
+                print(f"KeyBERT extraction failed: {e}")
+                instrumentation.count("review_analyzer.keyword_fallback", len(chunk))
+                # Fallback to simple extraction for this chunk only (None marks it)
+                ranked.update(dict.fromkeys(chunk))
+
+        for i in indices:
+            if ranked[texts[i]] is None:
+                keywords[i] = self._simple_keyword_fallback(texts[i], negative_flags[i])
             else:
-                # For positive reviews, keep quality and facility keywords
-                return keyword_list[:5]
+                keywords[i] = self._filter_keywords(ranked[texts[i]], negative_flags[i])
+        return keywords
 
-        except Exception as e:
-            print(f"KeyBERT extraction failed: {e}")
-            # Fallback to simple extraction if KeyBERT fails
-            return self._simple_keyword_fallback(text, is_negative)
+    def _rank_candidates(self, docs, top_n, embeddings=None):
+        """KeyBERT ranking of a chunk of documents: {document: top_n candidates, best first}"""
+        # scikit-learn is only needed here, keep it out of the module import
+        from sklearn.feature_extraction.text import CountVectorizer
+        from sklearn.preprocessing import normalize
+
+        # Same candidates KeyBERT would extract: single words and 2-word phrases
+        try:
+            count = CountVectorizer(ngram_range=(1, 2), stop_words="english").fit(docs)
+        except ValueError:
+            # Nothing but stopwords in the whole chunk
+            return {doc: [] for doc in docs}
+        words = count.get_feature_names_out()
+        presence = count.transform(docs).tocsr()
+
+        doc_embeddings = self._embed(docs)
+        if embeddings is not None:
+            embeddings.update(zip(docs, doc_embeddings))
+        # Cosine similarity is a dot product of unit vectors
+        doc_vectors = normalize(np.asarray(doc_embeddings))
+        word_vectors = normalize(np.asarray(self._embed(list(words))))
+
+        ranked = {}
+        for row, doc in enumerate(docs):
+            # Only n-grams that actually occur in the document are candidates
+            candidates = presence.indices[presence.indptr[row]:presence.indptr[row + 1]]
+            scores = word_vectors[candidates] @ doc_vectors[row]
+            order = np.argsort(-scores, kind="stable")[:top_n]
+            ranked[doc] = [words[candidates[j]] for j in order]
+        return ranked
+
+    def _embed(self, phrases):
+        """KeyBERT embeddings, going through the on-disk cache when one is configured"""
+        with instrumentation.stage("review_analyzer.embed", items=len(phrases)):
+            if self.embedding_cache is None:
+                return self.kw_model.model.embed(phrases)
+            return self.embedding_cache.embed(phrases, self.kw_model.model.embed)
+
+    def _filter_keywords(self, keyword_list, is_negative):
+        """Additional filtering of the extracted keywords for hospitality context"""
+        if is_negative:
+            # For negative reviews, focus on actionable issues
+            filtered_keywords = []
+            for kw in keyword_list:
+                # Keep hospitality-specific issues or any 2-word phrases (more specific)
+                if any(issue in kw.lower() for issue in self.hospitality_issues) or ' ' in kw:
+                    filtered_keywords.append(kw)
+                # Also keep if it's a facility with problem context
+                elif any(facility in kw.lower() for facility in
+                         ['piscina', 'colazione', 'camera', 'servizio', 'trasporto']):
+                    filtered_keywords.append(kw)
+
+            return filtered_keywords[:3]
+        else:
+            # For positive reviews, keep quality and facility keywords
+            return keyword_list[:5]
 
     def _simple_keyword_fallback(self, text, is_negative):
         """Fallback keyword extraction if KeyBERT fails"""
@@ -207,30 +418,58 @@ class BookingReviewAnalyzer:
         keywords = [word for word in words if word not in stopwords and len(word) > 3]
         return keywords[:5] if not is_negative else keywords[:3]
 
-    def analyze_reviews(self, reviews_data):
+    def _negative_content(self, review):
+        """Return the negative part of a review, or None if there is nothing to analyze"""
+        neg_content = review.get("contenuto_negativo")
+        if neg_content and neg_content.strip() and neg_content.lower() not in ['null', 'nulla',
+                                                                               'nulla, tutto perfetto!']:
+            return neg_content
+        return None
+
+    def _segments(self, reviews_data):
+        """Positive and negative part of every review (even = positive, odd = negative)"""
+        segments = []
+        for review in reviews_data:
+            segments.append(review.get("contenuto_positivo", ""))
+            segments.append(self._negative_content(review))
+        return segments
+
+    def _segment_priors(self, segments):
         """
-        Main analysis function - processes all reviews and returns structured insights
+        Lexicon prior of every segment: the field it comes from (positive 1, negative -1).
+        It depends on the segment alone, so results don't change with chunk or shard boundaries.
         """
-        print(f"Analyzing {len(reviews_data)} reviews...")
+        return [-1 if i % 2 else 1 for i in range(len(segments))]
 
-        results = {
-            "summary": {},
-            "categories": {},
-            "strengths": [],
-            "areas_for_improvement": [],
-            "detailed_reviews": []
-        }
-
-        # Initialize category tracking
-        category_sentiments = defaultdict(list)
-        category_mentions = defaultdict(int)
-        all_positive_keywords = []
-        all_negative_keywords = []
-
-        all_sentiments = []
+    def _segment_keywords(self, segments):
+        """Batched KeyBERT over the segments; also returns the document embeddings if they're indexed"""
+        negative_flags = [i % 2 == 1 for i in range(len(segments))]
+        doc_embeddings = {} if self.embedding_index is not None else None
+        return self._extract_keywords_batch(segments, negative_flags, embeddings=doc_embeddings), doc_embeddings
 
-        # Process each review
-        for review in reviews_data:
+    def _analyze_chunk(self, reviews_data, batch_size=32):
+        """
+        Run the models over a list of reviews.
+        Returns (detailed_review, positive analysis, negative analysis) per review;
+        the analyses are None when that part of the review was not analyzed.
+        """
+        # Batched sentiment and KeyBERT over every positive and negative segment
+        segments = self._segments(reviews_data)
+        segment_sentiments = self._analyze_texts_sentiment(segments, batch_size=batch_size,
+                                                           priors=self._segment_priors(segments))
+        segment_keywords, doc_embeddings = self._segment_keywords(segments)
+        return self._assemble_chunk(reviews_data, segments, segment_sentiments, segment_keywords, doc_embeddings)
+
+    def _assemble_chunk(self, reviews_data, segments, segment_sentiments, segment_keywords, doc_embeddings=None):
+        """Categorize the segments and build the per-review results of _analyze_chunk from the model outputs"""
+        # Categories come from the positive segments only
+        segment_categories = self._categorize_texts(segments[0::2])
+
+        if self.embedding_index is not None:
+            self._index_segments(reviews_data, segments, segment_categories, doc_embeddings)
+
+        analyzed = []
+        for index, review in enumerate(reviews_data):
             detailed_review = {
                 "title": review.get("titolo", ""),
                 "positive_sentiment": None,
@@ -239,86 +478,224 @@ class BookingReviewAnalyzer:
                 "key_issues": [],
                 "key_strengths": []
             }
+            pos_analysis = None
+            neg_analysis = None
 
             # Analyze positive content
             pos_content = review.get("contenuto_positivo", "")
             if pos_content:
-                pos_analysis = self._analyze_text_sentiment(pos_content)
+                pos_analysis = segment_sentiments[2 * index]
                 detailed_review["positive_sentiment"] = pos_analysis["sentiment"]
-                all_sentiments.append(pos_analysis)
 
-                # Extract categories and keywords
-                categories = self._categorize_text(pos_content)
-                detailed_review["categories_mentioned"].extend(categories)
-
-                keywords = self._extract_keywords(pos_content, is_negative=False)
-                detailed_review["key_strengths"] = keywords
-                all_positive_keywords.extend(keywords)
-
-                # Track category sentiment
-                for cat in categories:
-                    category_sentiments[cat].append(pos_analysis)
-                    category_mentions[cat] += 1
+                # Categories and keywords
+                detailed_review["categories_mentioned"] = segment_categories[index]["categories"]
+                detailed_review["key_strengths"] = segment_keywords[2 * index]
 
             # Analyze negative content
-            neg_content = review.get("contenuto_negativo")
-            if neg_content and neg_content.strip() and neg_content.lower() not in ['null', 'nulla',
-                                                                                   'nulla, tutto perfetto!']:
-                neg_analysis = self._analyze_text_sentiment(neg_content)
+            neg_content = self._negative_content(review)
+            if neg_content:
+                neg_analysis = segment_sentiments[2 * index + 1]
                 detailed_review["negative_sentiment"] = neg_analysis["sentiment"]
-                all_sentiments.append(neg_analysis)
-
-                keywords = self._extract_keywords(neg_content, is_negative=True)
-                detailed_review["key_issues"] = keywords
-                all_negative_keywords.extend(keywords)
+                detailed_review["key_issues"] = segment_keywords[2 * index + 1]
             else:
                 detailed_review["negative_sentiment"] = "None"
 
-            # Remove duplicates from categories
-            detailed_review["categories_mentioned"] = list(set(detailed_review["categories_mentioned"]))
-            results["detailed_reviews"].append(detailed_review)
+            analyzed.append((detailed_review, pos_analysis, neg_analysis))
 
-        # Calculate summary statistics with original logic
-        total_reviews = len(reviews_data)
-        positive_reviews = sum(1 for r in results["detailed_reviews"] if r["negative_sentiment"] in ["None", "Neutral"])
+        return analyzed
 
-        avg_confidence = sum(s["confidence"] for s in all_sentiments) / len(all_sentiments) if all_sentiments else 0
+    def _index_segments(self, reviews_data, segments, positive_categories, embeddings):
+        """
+        Add the segments KeyBERT embedded to the similarity index.
+        Segments it skipped (too short, or the fallback ran) are not indexed.
+        """
+        # The analysis only categorizes positive segments, the index wants both
+        categories = [positive_categories, self._categorize_texts(segments[1::2])]
+
+        ids, kinds, texts, vectors, text_categories = [], [], [], [], []
+        for i, text in enumerate(segments):
+            if text not in embeddings:
+                continue
+            ids.append(review_id(reviews_data[i // 2]))
+            kinds.append("negative" if i % 2 else "positive")
+            texts.append(text)
+            vectors.append(embeddings[text])
+            text_categories.append(categories[i % 2][i // 2]["categories"])
+
+        with instrumentation.stage("review_analyzer.index", items=len(ids)):
+            self.embedding_index.add(ids, kinds, texts, vectors, text_categories)
+
+    def find_similar_reviews(self, text, k=10, category=None, segment=None):
+        """
+        Indexed review segments most similar to text (e.g. a complaint), best first.
+        Only text itself is embedded; category and segment ("positive"/"negative")
+        narrow the search as in ReviewEmbeddingIndex.search.
+        """
+        if self.embedding_index is None:
+            raise ValueError("find_similar_reviews needs an analyzer created with embedding_index_path")
+        return self.embedding_index.search(self._embed([text])[0], k, category, segment)
 
-        results["summary"] = {
-            "total_reviews": total_reviews,
-            "overall_sentiment": "Very Positive" if positive_reviews / total_reviews > 0.8 else "Positive",
-            "average_confidence": round(avg_confidence, 3),
-            "positive_percentage": round((positive_reviews / total_reviews) * 100, 1)
-        }
+    def analyze_reviews(self, reviews_data, batch_size=32, compact=False, chunk_size=4096):
+        """
+        Main analysis function - processes all reviews and returns structured insights.
+        Sentiment runs once over all the segments of the corpus, in batches of batch_size.
+        With compact, detailed_reviews is a ReviewColumns (see core.review_columns)
+        instead of a list of dicts, and reviews are analyzed chunk_size at a time
+        so the per-review dicts never all exist at once.
+        """
+        print(f"Analyzing {len(reviews_data)} reviews...")
+
+        aggregate = ReviewAggregate()
+
+        if compact:
+            detailed_reviews = ReviewColumns()
+            for start in range(0, len(reviews_data), chunk_size):
+                analyzed = self._analyze_chunk(reviews_data[start:start + chunk_size], batch_size)
+                with instrumentation.stage("review_analyzer.aggregate", items=len(analyzed)):
+                    for detailed_review, pos_analysis, neg_analysis in analyzed:
+                        aggregate.add(detailed_review, pos_analysis, neg_analysis)
+                        detailed_reviews.append(detailed_review, pos_analysis, neg_analysis)
+            results = aggregate.to_results()
+        else:
+            detailed_reviews = []
+            analyzed = self._analyze_chunk(reviews_data, batch_size)
+            with instrumentation.stage("review_analyzer.aggregate", items=len(analyzed)):
+                for detailed_review, pos_analysis, neg_analysis in analyzed:
+                    aggregate.add(detailed_review, pos_analysis, neg_analysis)
+                    detailed_reviews.append(detailed_review)
+
+                results = aggregate.to_results()
+        results["detailed_reviews"] = detailed_reviews
 
-        # Calculate category insights
-        for category, sentiments in category_sentiments.items():
-            if sentiments:
-                avg_conf = sum(s["confidence"] for s in sentiments) / len(sentiments)
-                most_common_sentiment = Counter(s["sentiment"] for s in sentiments).most_common(1)[0][0]
+        print("Analysis completed! ✅")
+        return results
 
-                results["categories"][category] = {
-                    "mentions": category_mentions[category],
-                    "avg_sentiment": most_common_sentiment,
-                    "confidence": round(avg_conf, 3)
-                }
+    def analyze_delta(self, snapshot, reviews=(), deleted=(), batch_size=32, chunk_size=4096):
+        """
+        Bring a ReviewSnapshot (see core.review_snapshot) up to date and return its
+        summary/categories/strengths/areas_for_improvement.
+        reviews are new or possibly changed reviews (unchanged ones are skipped),
+        deleted the ids of removed ones; ids come from review_id().
+        Only new and changed reviews go through the models.
+        With an embedding index, deleted reviews are removed from it and changed
+        segments replace their old vectors.
+        """
+        deleted = list(deleted)
+        removed = snapshot.delete(deleted)
+        if self.embedding_index is not None and deleted:
+            self.embedding_index.remove(deleted)
+        pending = snapshot.pending(reviews, review_id)
+        print(f"Analyzing {len(pending)} new or changed reviews, removing {removed}...")
+
+        for start in range(0, len(pending), chunk_size):
+            entries = pending[start:start + chunk_size]
+            analyzed = self._analyze_chunk([review for _, _, review in entries], batch_size)
+            with instrumentation.stage("review_analyzer.aggregate", items=len(analyzed)):
+                snapshot.apply(entries, analyzed)
+
+        results = snapshot.results()
+        print(f"Snapshot updated! ✅ {len(snapshot)} reviews")
+        return results
 
-        # Generate better insights
-        # Top positive aspects (filter out generic words)
-        positive_counter = Counter(all_positive_keywords)
-        meaningful_strengths = [(k, v) for k, v in positive_counter.most_common(10)
-                                if len(k) > 3 and k not in ['tutto', 'molto', 'bene']]
+    def analyze_portfolio(self, reviews_data, batch_size=32, chunk_size=4096, period="month",
+                          hotel_field="hotel_id", date_field="data"):
+        """
+        Analyze the reviews of several hotels at once and return a PortfolioAggregate
+        (see core.portfolio_aggregate) to query per hotel, per period and per category.
+        """
+        print(f"Analyzing {len(reviews_data)} reviews...")
 
-        # Real improvement areas from negative feedback
-        improvement_counter = Counter(all_negative_keywords)
-        real_issues = [(k, v) for k, v in improvement_counter.most_common(5)
-                       if v > 0 and k not in ['meno', 'poco']]
+        portfolio = PortfolioAggregate(period, hotel_field, date_field)
+        for start in range(0, len(reviews_data), chunk_size):
+            chunk = reviews_data[start:start + chunk_size]
+            analyzed = self._analyze_chunk(chunk, batch_size)
+            with instrumentation.stage("review_analyzer.aggregate", items=len(analyzed)):
+                portfolio.extend(chunk, analyzed)
 
-        results["strengths"] = meaningful_strengths[:5]
-        results["areas_for_improvement"] = real_issues[:3]
+        print(f"Analysis completed! ✅ {len(portfolio.hotels())} hotels, {len(portfolio.periods())} periods")
+        if portfolio.invalid_dates:
+            print(f"{portfolio.invalid_dates} reviews had an unparsable {date_field} and have no period")
+        return portfolio
 
-        print("Analysis completed! ✅")
-        return results
+    def analyze_reviews_stream(self, source, aggregate=None, chunk_size=256, batch_size=32,
+                               checkpoint_path=None, checkpoint_every=10):
+        """
+        Streaming version of analyze_reviews for inputs that don't fit in memory.
+        source is a JSONL file path or any iterable of review dicts. Reviews are
+        analyzed chunk_size at a time and each detailed review is yielded as soon
+        as it's ready; only the running totals in aggregate are kept
+        (pass your own ReviewAggregate and call to_results() at the end).
+        With checkpoint_path, the offset and totals are saved every checkpoint_every
+        chunks and a restarted run resumes after the last saved chunk.
+        """
+        if aggregate is None:
+            aggregate = ReviewAggregate()
+
+        offset = 0
+        byte_offset = None
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path, encoding="utf-8") as f:
+                checkpoint = json.load(f)
+            offset = checkpoint["offset"]
+            byte_offset = checkpoint["byte_offset"]
+            aggregate.load_dict(checkpoint["aggregate"])
+            print(f"Resuming from review {offset}...")
+
+        reviews = self._iter_reviews(source, offset, byte_offset)
+        chunks_done = 0
+
+        while True:
+            chunk = list(islice(reviews, chunk_size))
+            if not chunk:
+                break
+
+            for detailed_review, pos_analysis, neg_analysis in self._analyze_chunk(
+                    [review for review, _ in chunk], batch_size):
+                aggregate.add(detailed_review, pos_analysis, neg_analysis)
+                yield detailed_review
+
+            offset += len(chunk)
+            byte_offset = chunk[-1][1]
+            chunks_done += 1
+            if checkpoint_path and chunks_done % checkpoint_every == 0:
+                self._write_checkpoint(checkpoint_path, offset, byte_offset, aggregate)
+
+        if checkpoint_path:
+            self._write_checkpoint(checkpoint_path, offset, byte_offset, aggregate)
+
+    def _iter_reviews(self, source, offset=0, byte_offset=None):
+        """
+        Yield (review, byte offset after it) from a JSONL file, or (review, None)
+        from an iterable, starting after the first offset reviews.
+        """
+        if not isinstance(source, (str, os.PathLike)):
+            for review in islice(source, offset, None):
+                yield review, None
+            return
+
+        with open(source, "rb") as f:
+            if byte_offset is not None:
+                f.seek(byte_offset)
+                offset = 0
+
+            for line in iter(f.readline, b""):
+                if not line.strip():
+                    continue
+                if offset:
+                    offset -= 1
+                    continue
+                yield json.loads(line), f.tell()
+
+    def _write_checkpoint(self, path, offset, byte_offset, aggregate):
+        """Atomically replace the checkpoint file"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "offset": offset,
+                "byte_offset": byte_offset,
+                "aggregate": aggregate.to_dict()
+            }, f)
+        os.replace(tmp_path, path)
 
 
 def main():
@@ -0,0 +1,214 @@
+"""
+Columnar storage for the detailed reviews of a large analysis.
+
+A list of detailed_review dicts costs about a kilobyte of Python objects per
+review (the dict, three lists, the title and one string object per keyword).
+ReviewColumns keeps the same information in NumPy arrays:
+- sentiments as int8 codes, confidences as float32 (NaN when not analyzed)
+- categories and keywords as int32 ids into shared vocabularies, one flat
+  array per field plus the offset where every review's entries start
+- titles as one UTF-8 buffer plus offsets
+
+Existing callers keep working: indexing or iterating gives a ReviewView, a
+read-only mapping that builds the dict values only when they're accessed and
+compares equal to the dict analyze_reviews used to return.
+
+    columns.save("analysis")                       # one .npy per column
+    columns = ReviewColumns.load("analysis")       # memory-mapped, nothing read up front
+"""
+import json
+import os
+from collections.abc import Mapping
+import numpy as np
+
+# Sentiment codes; -1 is "not analyzed" (None)
+SENTIMENT_LABELS = ("Negative", "Neutral", "Positive", "None")
+SENTIMENT_CODES = {label: code for code, label in enumerate(SENTIMENT_LABELS)}
+
+REVIEW_FIELDS = ("title", "positive_sentiment", "negative_sentiment", "categories_mentioned", "key_issues",
+                 "key_strengths")
+# List fields and the vocabulary their ids point into
+LIST_FIELDS = {"categories_mentioned": "categories", "key_strengths": "keywords", "key_issues": "keywords"}
+
+
+class Vocabulary:
+    __slots__ = ("words", "ids")
+
+    def __init__(self, words=()):
+        """Interned strings: every distinct string is stored once and referred to by id"""
+        self.words = list(words)
+        self.ids = {word: i for i, word in enumerate(self.words)}
+
+    def intern(self, word):
+        word = str(word)
+        word_id = self.ids.get(word)
+        if word_id is None:
+            word_id = self.ids[word] = len(self.words)
+            self.words.append(word)
+        return word_id
+
+
+class ReviewView(Mapping):
+    __slots__ = ("_columns", "_index")
+
+    def __init__(self, columns, index):
+        """Read-only dict-like view of one review in a ReviewColumns"""
+        self._columns = columns
+        self._index = index
+
+    def __getitem__(self, key):
+        return self._columns.value(self._index, key)
+
+    def __iter__(self):
+        return iter(REVIEW_FIELDS)
+
+    def __len__(self):
+        return len(REVIEW_FIELDS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class ReviewColumns:
+    def __init__(self, capacity=1024):
+        """Empty store; arrays grow by doubling past capacity"""
+        self.size = 0
+        self.vocabularies = {"categories": Vocabulary(), "keywords": Vocabulary()}
+
+        self._columns = {
+            "positive_sentiment": np.empty(capacity, dtype=np.int8),
+            "negative_sentiment": np.empty(capacity, dtype=np.int8),
+            "positive_confidence": np.empty(capacity, dtype=np.float32),
+            "negative_confidence": np.empty(capacity, dtype=np.float32),
+            "title_offsets": np.zeros(capacity + 1, dtype=np.int64),
+            "title_bytes": np.empty(capacity * 32, dtype=np.uint8),
+        }
+        for field in LIST_FIELDS:
+            self._columns[f"{field}_offsets"] = np.zeros(capacity + 1, dtype=np.int64)
+            self._columns[f"{field}_ids"] = np.empty(capacity * 4, dtype=np.int32)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ReviewView(self, i) for i in range(*index.indices(self.size))]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("review index out of range")
+        return ReviewView(self, index)
+
+    def __iter__(self):
+        for index in range(self.size):
+            yield ReviewView(self, index)
+
+    def column(self, name):
+        """
+        Array of one column, without copying: positive/negative_sentiment (codes into
+        SENTIMENT_LABELS, -1 = not analyzed), positive/negative_confidence, or
+        <list field>_ids / <list field>_offsets (see module docstring)
+        """
+        array = self._columns[name]
+        if name.endswith("_offsets"):
+            return array[:self.size + 1]
+        if name.endswith("_ids") or name == "title_bytes":
+            field = name[:-len("_ids")] if name.endswith("_ids") else "title"
+            return array[:self._columns[f"{field}_offsets"][self.size]]
+        return array[:self.size]
+
+    def _reserve(self, name, length):
+        """Make sure column name holds at least length entries"""
+        array = self._columns[name]
+        if len(array) < length:
+            grown = np.empty(max(length, 2 * len(array)), dtype=array.dtype)
+            grown[:len(array)] = array
+            self._columns[name] = grown
+
+    def _append_entries(self, offsets_name, values_name, values):
+        """Append the variable-length entries of the review being added"""
+        start = self._columns[offsets_name][self.size]
+        self._reserve(offsets_name, self.size + 2)
+        if len(values):
+            self._reserve(values_name, start + len(values))
+            self._columns[values_name][start:start + len(values)] = values
+        self._columns[offsets_name][self.size + 1] = start + len(values)
+
+    def append(self, detailed_review, pos_analysis=None, neg_analysis=None):
+        """Add one analyzed review, as produced by BookingReviewAnalyzer._analyze_chunk"""
+        index = self.size
+        for name in ("positive_sentiment", "negative_sentiment", "positive_confidence", "negative_confidence"):
+            self._reserve(name, index + 1)
+
+        for side, analysis in (("positive", pos_analysis), ("negative", neg_analysis)):
+            label = detailed_review[f"{side}_sentiment"]
+            self._columns[f"{side}_sentiment"][index] = -1 if label is None else SENTIMENT_CODES[label]
+            # NaN too for lexicon answers, which have no model confidence
+            confidence = None if analysis is None else analysis["confidence"]
+            self._columns[f"{side}_confidence"][index] = np.nan if confidence is None else confidence
+
+        title = (detailed_review["title"] or "").encode("utf-8")
+        self._append_entries("title_offsets", "title_bytes", np.frombuffer(title, dtype=np.uint8))
+        for field, vocabulary in LIST_FIELDS.items():
+            intern = self.vocabularies[vocabulary].intern
+            self._append_entries(f"{field}_offsets", f"{field}_ids",
+                                 [intern(word) for word in detailed_review[field]])
+
+        self.size += 1
+
+    def extend(self, analyzed):
+        """Add (detailed_review, pos_analysis, neg_analysis) tuples"""
+        for detailed_review, pos_analysis, neg_analysis in analyzed:
+            self.append(detailed_review, pos_analysis, neg_analysis)
+
+    def value(self, index, key):
+        """One field of one review, as it appears in the detailed_review dict"""
+        columns = self._columns
+        if key == "title":
+            start, end = columns["title_offsets"][index:index + 2]
+            return columns["title_bytes"][start:end].tobytes().decode("utf-8")
+        if key in ("positive_sentiment", "negative_sentiment"):
+            code = columns[key][index]
+            return None if code < 0 else SENTIMENT_LABELS[code]
+        if key in LIST_FIELDS:
+            start, end = columns[f"{key}_offsets"][index:index + 2]
+            words = self.vocabularies[LIST_FIELDS[key]].words
+            return [words[i] for i in columns[f"{key}_ids"][start:end]]
+        raise KeyError(key)
+
+    def to_dicts(self):
+        """Plain detailed_review dicts, e.g. for JSON output"""
+        return [dict(view) for view in self]
+
+    def nbytes(self):
+        """Bytes used by the columns in use (vocabularies not included)"""
+        return sum(self.column(name).nbytes for name in self._columns)
+
+    def save(self, directory):
+        """One .npy file per column plus the vocabularies, loadable memory-mapped"""
+        os.makedirs(directory, exist_ok=True)
+        for name in self._columns:
+            np.save(os.path.join(directory, f"{name}.npy"), self.column(name))
+
+        tmp_path = os.path.join(directory, "vocabularies.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"size": self.size,
+                       "vocabularies": {name: v.words for name, v in self.vocabularies.items()}},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(directory, "vocabularies.json"))
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """
+        Columns saved with save(). With mmap_mode="r" the arrays are memory-mapped
+        and only the pages a lookup touches are read; appending copies them into memory first.
+        """
+        with open(os.path.join(directory, "vocabularies.json"), encoding="utf-8") as f:
+            state = json.load(f)
+
+        columns = cls(capacity=0)
+        columns.size = state["size"]
+        columns.vocabularies = {name: Vocabulary(words) for name, words in state["vocabularies"].items()}
+        for name in columns._columns:
+            columns._columns[name] = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+        return columns
@@ -0,0 +1,277 @@
+"""
+Persisted analysis of a review corpus, for incremental re-analysis.
+
+A ReviewSnapshot (one SQLite file) keeps, per review id, the content hash and
+the analyzed result, plus the running totals behind summary, categories,
+strengths and areas_for_improvement. BookingReviewAnalyzer.analyze_delta()
+runs the models only on reviews that are new or whose content changed,
+subtracts what changed or deleted reviews used to contribute, and adds the
+new results, so a refresh costs time proportional to the delta:
+
+    snapshot = ReviewSnapshot("hotel.sqlite")
+    analyzer.analyze_delta(snapshot, todays_reviews, deleted=["review-123"])
+
+The output equals analyze_reviews over the whole corpus in snapshot order:
+reviews keep the position they were first added at, new ones go at the end.
+Ties in the rankings depend on which category/keyword was mentioned first,
+so every mention is indexed by (position, index inside the review) and the
+first one is looked up when it matters.
+"""
+import hashlib
+import json
+import sqlite3
+from collections import Counter
+from core.review_aggregate import ReviewAggregate
+
+# Mention kinds; a category mention is stored twice, once for the category
+# and once for the (category, sentiment) pair
+CATEGORY, SENTIMENT, STRENGTH, ISSUE = range(4)
+
+
+def content_hash(review):
+    """Hash of every field of a review: changes whenever anything in it changes"""
+    return hashlib.sha256(json.dumps(review, sort_keys=True, ensure_ascii=False, default=str)
+                          .encode("utf-8")).hexdigest()
+
+
+class ReviewSnapshot:
+    def __init__(self, path="review_snapshot.sqlite"):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate_mentions()
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS reviews ("
+            " review_id TEXT PRIMARY KEY,"
+            " position INTEGER NOT NULL UNIQUE,"
+            " content_hash TEXT NOT NULL,"
+            " record TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, value INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS categories ("
+            " category TEXT PRIMARY KEY, mentions INTEGER NOT NULL, confidence INTEGER NOT NULL,"
+            " scored INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS category_sentiments ("
+            " category TEXT NOT NULL, sentiment TEXT NOT NULL, count INTEGER NOT NULL,"
+            " PRIMARY KEY (category, sentiment));"
+            "CREATE TABLE IF NOT EXISTS keywords ("
+            " side INTEGER NOT NULL, keyword TEXT NOT NULL, count INTEGER NOT NULL,"
+            " PRIMARY KEY (side, keyword));"
+            "CREATE INDEX IF NOT EXISTS idx_keywords_count ON keywords (side, count);"
+            "CREATE TABLE IF NOT EXISTS mentions ("
+            " kind INTEGER NOT NULL, key TEXT NOT NULL, position INTEGER NOT NULL, idx INTEGER NOT NULL,"
+            " PRIMARY KEY (kind, key, position, idx)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS idx_mentions_position ON mentions (position);"
+        )
+        # Snapshots from before the lexicon cascade: every mention had a model confidence
+        if "scored" not in [row[1] for row in self.conn.execute("PRAGMA table_info(categories)")]:
+            self.conn.execute("ALTER TABLE categories ADD COLUMN scored INTEGER NOT NULL DEFAULT 0")
+            self.conn.execute("UPDATE categories SET scored = mentions")
+        self.conn.commit()
+
+    def _migrate_mentions(self):
+        """Snapshots from before (position, idx): mentions had seq = position * 256 + index"""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(mentions)")]
+        if "seq" not in columns:
+            return
+        with self.conn:
+            self.conn.execute("ALTER TABLE mentions RENAME TO mentions_seq")
+            self.conn.execute("DROP INDEX IF EXISTS idx_mentions_seq")
+            self.conn.execute("CREATE TABLE mentions ("
+                              " kind INTEGER NOT NULL, key TEXT NOT NULL, position INTEGER NOT NULL,"
+                              " idx INTEGER NOT NULL, PRIMARY KEY (kind, key, position, idx)) WITHOUT ROWID")
+            self.conn.execute("INSERT INTO mentions (kind, key, position, idx)"
+                              " SELECT kind, key, seq / 256, seq % 256 FROM mentions_seq")
+            self.conn.execute("DROP TABLE mentions_seq")
+
+    def __len__(self):
+        row = self.conn.execute("SELECT value FROM totals WHERE name = 'total_reviews'").fetchone()
+        return row[0] if row else 0
+
+    def pending(self, reviews, review_id):
+        """
+        Reviews that need the models: ids not in the snapshot, or whose content changed.
+        review_id(review) gives the id; a review listed twice counts once, with its last content.
+        Returns (review id, content hash, review) tuples.
+        """
+        latest = {}
+        for review in reviews:
+            latest[review_id(review)] = review
+        hashes = {rid: content_hash(review) for rid, review in latest.items()}
+
+        stored = {}
+        ids = list(hashes)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            stored.update(self.conn.execute(
+                f"SELECT review_id, content_hash FROM reviews WHERE review_id IN ({placeholders})", chunk))
+
+        return [(rid, hashes[rid], review) for rid, review in latest.items() if stored.get(rid) != hashes[rid]]
+
+    def apply(self, entries, analyzed):
+        """
+        Store analyzed reviews: entries are (review id, content hash, review) from pending(),
+        analyzed their (detailed_review, pos_analysis, neg_analysis). Reviews already in the
+        snapshot keep their position, the others are appended. One transaction.
+        """
+        with self.conn:
+            previous = self._records([rid for rid, _, _ in entries])
+            self._remove(previous)
+
+            next_position = self.conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM reviews").fetchone()[0]
+            rows = []
+            added = []
+            for (rid, digest, _), result in zip(entries, analyzed):
+                if rid in previous:
+                    position = previous[rid][0]
+                else:
+                    position = next_position
+                    next_position += 1
+                rows.append((rid, position, digest, json.dumps(result, ensure_ascii=False)))
+                added.append((position, result))
+
+            self.conn.executemany("INSERT OR REPLACE INTO reviews (review_id, position, content_hash, record)"
+                                  " VALUES (?, ?, ?, ?)", rows)
+            self._update_totals([result for _, result in added], 1)
+            self.conn.executemany("INSERT INTO mentions (kind, key, position, idx) VALUES (?, ?, ?, ?)",
+                                  [m for position, result in added for m in _mentions(position, result)])
+
+    def delete(self, review_ids):
+        """Remove reviews and everything they contributed to the totals"""
+        with self.conn:
+            previous = self._records(review_ids)
+            self._remove(previous)
+            self.conn.executemany("DELETE FROM reviews WHERE review_id = ?", [(rid,) for rid in previous])
+        return len(previous)
+
+    def _records(self, review_ids):
+        """{review id: (position, analyzed result)} of the ids in the snapshot"""
+        found = {}
+        ids = list(dict.fromkeys(review_ids))
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for rid, position, record in self.conn.execute(
+                    f"SELECT review_id, position, record FROM reviews WHERE review_id IN ({placeholders})", chunk):
+                found[rid] = (position, json.loads(record))
+        return found
+
+    def _remove(self, records):
+        """Take stored results out of the totals and the mention index"""
+        if not records:
+            return
+        self._update_totals([result for _, result in records.values()], -1)
+        self.conn.executemany("DELETE FROM mentions WHERE position = ?",
+                              [(position,) for position, _ in records.values()])
+
+    def _update_totals(self, results, sign):
+        """Add (sign 1) or subtract (sign -1) the contribution of analyzed reviews"""
+        # ReviewAggregate has the counting rules; its totals of these reviews are the delta
+        delta = ReviewAggregate()
+        for detailed_review, pos_analysis, neg_analysis in results:
+            delta.add(detailed_review, pos_analysis, neg_analysis)
+
+        self.conn.executemany(
+            "INSERT INTO totals (name, value) VALUES (?, ?)"
+            " ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            [(name, sign * getattr(delta, name))
+             for name in ("total_reviews", "positive_reviews", "sentiment_count", "confidence_sum")]
+        )
+        self.conn.executemany(
+            "INSERT INTO categories (category, mentions, confidence, scored) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(category) DO UPDATE SET mentions = mentions + excluded.mentions,"
+            " confidence = confidence + excluded.confidence, scored = scored + excluded.scored",
+            [(cat, sign * mentions, sign * delta.category_confidence[cat], sign * delta.category_scored[cat])
+             for cat, mentions in delta.category_mentions.items()]
+        )
+        self.conn.executemany(
+            "INSERT INTO category_sentiments (category, sentiment, count) VALUES (?, ?, ?)"
+            " ON CONFLICT(category, sentiment) DO UPDATE SET count = count + excluded.count",
+            [(cat, sentiment, sign * n) for cat, sentiments in delta.category_sentiments.items()
+             for sentiment, n in sentiments.items()]
+        )
+        self.conn.executemany(
+            "INSERT INTO keywords (side, keyword, count) VALUES (?, ?, ?)"
+            " ON CONFLICT(side, keyword) DO UPDATE SET count = count + excluded.count",
+            [(side, keyword, sign * n) for side, counter in enumerate((delta.positive_keywords,
+                                                                       delta.negative_keywords))
+             for keyword, n in counter.items()]
+        )
+
+        # A full run never sees what's no longer mentioned: drop the entries that reached zero
+        self.conn.executemany("DELETE FROM categories WHERE category = ? AND mentions = 0",
+                              [(cat,) for cat in delta.category_mentions])
+        self.conn.executemany("DELETE FROM category_sentiments WHERE category = ? AND sentiment = ? AND count = 0",
+                              [(cat, sentiment) for cat, sentiments in delta.category_sentiments.items()
+                               for sentiment in sentiments])
+        self.conn.executemany("DELETE FROM keywords WHERE side = ? AND keyword = ? AND count = 0",
+                              [(side, keyword) for side, counter in enumerate((delta.positive_keywords,
+                                                                               delta.negative_keywords))
+                               for keyword in counter])
+
+    def _first(self, kind, key):
+        """(position, idx) of the first mention still in the snapshot"""
+        row = self.conn.execute("SELECT position, idx FROM mentions WHERE kind = ? AND key = ?"
+                                " ORDER BY position, idx LIMIT 1", (kind, key)).fetchone()
+        return row if row else (float("inf"),)
+
+    def aggregate(self):
+        """
+        ReviewAggregate equal to the one of a full run, for to_results(): complete
+        totals and categories, and the keywords that can make the rankings
+        (everything tied with the last ranked one included), in first-mention order.
+        """
+        aggregate = ReviewAggregate()
+        for name, value in self.conn.execute("SELECT name, value FROM totals"):
+            setattr(aggregate, name, value)
+
+        categories = self.conn.execute("SELECT category, mentions, confidence, scored FROM categories").fetchall()
+        for category, mentions, confidence, scored in sorted(categories,
+                                                             key=lambda row: self._first(CATEGORY, row[0])):
+            aggregate.category_mentions[category] = mentions
+            aggregate.category_confidence[category] = confidence
+            aggregate.category_scored[category] = scored
+            sentiments = self.conn.execute("SELECT sentiment, count FROM category_sentiments WHERE category = ?",
+                                           (category,)).fetchall()
+            aggregate.category_sentiments[category] = Counter(dict(sorted(
+                sentiments, key=lambda row: self._first(SENTIMENT, f"{category}\t{row[0]}"))))
+
+        # to_results ranks the top 10 strengths and top 5 issues
+        for side, kind, limit, counter in ((0, STRENGTH, 10, aggregate.positive_keywords),
+                                           (1, ISSUE, 5, aggregate.negative_keywords)):
+            top = self.conn.execute("SELECT count FROM keywords WHERE side = ? ORDER BY count DESC LIMIT ?",
+                                    (side, limit)).fetchall()
+            if not top:
+                continue
+            candidates = self.conn.execute("SELECT keyword, count FROM keywords WHERE side = ? AND count >= ?",
+                                           (side, top[-1][0])).fetchall()
+            counter.update(dict(sorted(candidates, key=lambda row: self._first(kind, row[0]))))
+        return aggregate
+
+    def results(self):
+        """summary, categories, strengths and areas_for_improvement of the whole snapshot"""
+        return self.aggregate().to_results()
+
+    def detailed_reviews(self):
+        """Stored detailed reviews in snapshot order"""
+        for (record,) in self.conn.execute("SELECT record FROM reviews ORDER BY position"):
+            yield json.loads(record)[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def _mentions(position, result):
+    """Mention rows of one analyzed review, in the order ReviewAggregate.add sees them"""
+    detailed_review, pos_analysis, _ = result
+    rows = []
+    if pos_analysis is not None:
+        for i, category in enumerate(detailed_review["categories_mentioned"]):
+            rows.append((CATEGORY, category, position, i))
+            rows.append((SENTIMENT, f"{category}\t{pos_analysis['sentiment']}", position, i))
+    for kind, field in ((STRENGTH, "key_strengths"), (ISSUE, "key_issues")):
+        # Duplicates in one list count once for the order
+        for i, keyword in enumerate(dict.fromkeys(detailed_review[field])):
+            rows.append((kind, keyword, position, i))
+    return rows
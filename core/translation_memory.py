@@ -0,0 +1,67 @@
+import sqlite3
+import unicodedata
+
+
+class TranslationMemory:
+    def __init__(self, path="translation_memory.sqlite"):
+        """
+        Persistent sentence -> translation store, one entry per (model, normalized sentence).
+        Lookups are exact matches after Unicode NFC and whitespace normalization.
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " model TEXT NOT NULL,"
+            " sentence TEXT NOT NULL,"
+            " translation TEXT NOT NULL,"
+            " PRIMARY KEY (model, sentence))"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def normalize(sentence):
+        return " ".join(unicodedata.normalize("NFC", sentence).split())
+
+    def get_many(self, model, sentences):
+        """Return {normalized sentence: translation} for the sentences already translated"""
+        keys = list(dict.fromkeys(self.normalize(s) for s in sentences))
+        found = {}
+
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT sentence, translation FROM translations WHERE model = ? AND sentence IN ({placeholders})",
+                [model, *chunk]
+            ).fetchall()
+            found.update(rows)
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, model, translations):
+        """Store {sentence: translation}"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO translations (model, sentence, translation) VALUES (?, ?, ?)",
+                [(model, self.normalize(sentence), translation) for sentence, translation in translations.items()]
+            )
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        entries = self.conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries
+        }
+
+    def close(self):
+        self.conn.close()
@@ -1,9 +1,10 @@
-from ai.sentiment_analyzer import SentimentAnalyzer
-from ai.translator import Translator
-from ai.image_generator import ImageGenerator
+# Each feature imports its module only when selected, so the menu shows up
+# without paying for torch/transformers/diffusers
 
 
 def test_sentiment():
+    from ai.sentiment_analyzer import SentimentAnalyzer
+
     print("🔍 Testing Sentiment Analysis...")
     analyzer = SentimentAnalyzer()
 
@@ -20,6 +21,8 @@ def test_sentiment():
 
 
 def test_translation():
+    from ai.translator import Translator
+
     print("🌍 Testing Translation...")
     translator = Translator()
 
@@ -37,6 +40,8 @@ def test_translation():
 
 
 def test_image_generation():
+    from ai.image_generator import ImageGenerator
+
     print("🎨 Testing Image Generation...")
     generator = ImageGenerator()
 
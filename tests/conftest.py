@@ -0,0 +1,54 @@
+import random
+import pytest
+
+SENTIMENTS = ("Negative", "Neutral", "Positive")
+CATEGORIES = ("staff_service", "cleanliness", "facilities", "room_quality", "breakfast", "location")
+STRENGTHS = ("colazione", "staff", "posizione", "piscina", "camera", "pulizia", "tutto", "molto")
+ISSUES = ("rumoroso", "parcheggio", "lento", "meno", "prezzo", "wifi")
+
+
+def analyzed_review(rng):
+    """Random (detailed_review, pos_analysis, neg_analysis), as _analyze_chunk returns them"""
+    def analysis():
+        # None confidence: the lexicon answered
+        confidence = None if rng.random() < 0.3 else round(rng.uniform(0.4, 1.0), 3)
+        return {"sentiment": rng.choice(SENTIMENTS), "confidence": confidence}
+
+    pos_analysis = analysis() if rng.random() < 0.9 else None
+    neg_analysis = analysis() if rng.random() < 0.6 else None
+    detailed_review = {
+        "negative_sentiment": neg_analysis["sentiment"] if neg_analysis else "None",
+        "categories_mentioned": rng.sample(CATEGORIES, rng.randint(0, 3)),
+        # Duplicates on purpose: they count twice, but once for the first-mention order
+        "key_strengths": rng.choices(STRENGTHS, k=rng.randint(0, 4)),
+        "key_issues": rng.choices(ISSUES, k=rng.randint(0, 2)),
+    }
+    return detailed_review, pos_analysis, neg_analysis
+
+
+@pytest.fixture
+def make_reviews():
+    """make_reviews(n, seed) -> n (review, analyzed) pairs with hotel_id, data and id fields"""
+    def make(n, seed=0):
+        rng = random.Random(seed)
+        reviews = []
+        for i in range(n):
+            review = {
+                "id": f"review-{seed}-{i}",
+                "hotel_id": rng.choice(("roma-01", "roma-02", "milano-01", None)),
+                "data": rng.choice(("2024-01-15", "2024-03-02", "2024-06-30", "2024-07-01", "2025-02-10",
+                                    None, "non una data")),
+            }
+            reviews.append((review, analyzed_review(rng)))
+        return reviews
+    return make
+
+
+@pytest.fixture(scope="session")
+def tiny_models():
+    """The tiny offline stand-ins of benchmarks.tiny_models, registered under the real model keys"""
+    for module in ("torch", "transformers", "keybert", "sentence_transformers", "sklearn"):
+        pytest.importorskip(module)
+    from benchmarks import tiny_models
+    tiny_models.install()
+    return tiny_models
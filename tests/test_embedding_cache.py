@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from core.constants import SAMPLE_REVIEWS
+from core.embedding_cache import EmbeddingCache
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, phrases):
+        self.calls.append(list(phrases))
+        return np.array([[len(p), p.count("a"), 1.0] for p in phrases])
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "embeddings.sqlite")
+
+
+def last_used(cache, phrase):
+    return cache.conn.execute("SELECT last_used FROM embeddings WHERE phrase = ?", (phrase,)).fetchone()[0]
+
+
+def test_only_misses_are_embedded(cache_path):
+    cache = EmbeddingCache(cache_path, model_name="m")
+    embed = CountingEmbedder()
+
+    first = cache.embed(["camera", "piscina", "camera", " camera  "], embed)
+    assert embed.calls == [["camera", "piscina"]]
+    second = cache.embed(["piscina", "camera", "colazione"], embed)
+    assert embed.calls[1] == ["colazione"]
+
+    np.testing.assert_array_equal(first[1], second[0])
+    np.testing.assert_array_equal(first[0], first[3])
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 3
+    cache.close()
+
+
+def test_persists_per_model(cache_path):
+    cache = EmbeddingCache(cache_path, model_name="m")
+    cache.embed(["camera"], CountingEmbedder())
+    cache.close()
+
+    embed = CountingEmbedder()
+    reopened = EmbeddingCache(cache_path, model_name="m")
+    reopened.embed(["camera"], embed)
+    other_model = EmbeddingCache(cache_path, model_name="other")
+    other_model.embed(["camera"], embed)
+    assert embed.calls == [["camera"]]
+    reopened.close()
+    other_model.close()
+
+
+def test_reads_do_not_write_recent_entries(cache_path):
+    cache = EmbeddingCache(cache_path, model_name="m")
+    cache.embed(["camera"], CountingEmbedder())
+    before = last_used(cache, "camera")
+    cache.get_many(["camera"])
+    cache.flush()
+    assert last_used(cache, "camera") == before
+    cache.close()
+
+
+def test_evicts_least_recently_used_down_to_90_percent(cache_path):
+    cache = EmbeddingCache(cache_path, model_name="m", max_entries=10, touch_interval=0)
+    embed = CountingEmbedder()
+    phrases = [f"phrase {i}" for i in range(10)]
+    cache.embed(phrases, embed)
+    # Oldest first: phrase 0 is the least recently used
+    cache.conn.executemany("UPDATE embeddings SET last_used = ? WHERE phrase = ?",
+                           [(i, phrase) for i, phrase in enumerate(phrases)])
+    cache.conn.commit()
+
+    # A hit on phrase 0 refreshes it with the next write
+    cache.get_many(["phrase 0"])
+    cache.embed(["new 1", "new 2"], embed)
+
+    kept = {row[0] for row in cache.conn.execute("SELECT phrase FROM embeddings")}
+    assert len(kept) == 9
+    assert {"phrase 0", "new 1", "new 2"} <= kept
+    assert not {"phrase 1", "phrase 2", "phrase 3"} & kept
+    cache.close()
+
+
+def test_analyzer_reuses_cached_embeddings(tiny_models, cache_path):
+    from core.review_analyzer import BookingReviewAnalyzer
+    texts = [review["contenuto_positivo"] for review in SAMPLE_REVIEWS]
+    flags = [False] * len(texts)
+
+    analyzer = BookingReviewAnalyzer(embedding_cache_path=cache_path)
+    first = analyzer._extract_keywords_batch(texts, flags)
+    misses = analyzer.embedding_cache.misses
+    second = analyzer._extract_keywords_batch(texts, flags)
+
+    assert second == first
+    assert analyzer.embedding_cache.misses == misses
+    analyzer.embedding_cache.close()
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from core.embedding_index import ReviewEmbeddingIndex
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ReviewEmbeddingIndex(str(tmp_path / "index"), block_rows=2)
+    index.add(["r1", "r1", "r2", "r3"], ["positive", "negative", "negative", "negative"],
+              ["camera pulita", "bagno sporco", "bagno rumoroso", "colazione scarsa"],
+              [unit(1, 0, 0), unit(0, 1, 0), unit(0, 1, 0.2), unit(0, 0, 1)],
+              [["Cleanliness"], ["Cleanliness"], ["Noise"], ["Food"]])
+    yield index
+    index.close()
+
+
+def test_search_ranks_by_cosine_and_filters(index):
+    results = index.search(unit(0, 1, 0.1), k=2)
+    assert [(r["review_id"], r["segment"]) for r in results] == [("r2", "negative"), ("r1", "negative")]
+    assert results[0]["score"] > results[1]["score"] > 0.9
+
+    assert [r["review_id"] for r in index.search(unit(0, 1, 0), category="Food")] == ["r3"]
+    assert [r["text"] for r in index.search(unit(0, 1, 0), segment="positive")] == ["camera pulita"]
+    assert index.search(unit(1, 0, 0), k=1)[0]["categories"] == ["Cleanliness"]
+
+
+def test_similar_to_excludes_the_segment_itself(index):
+    results = index.search_similar_to("r1", k=3)
+    assert [r["review_id"] for r in results] == ["r2", "r3"]
+
+
+def test_same_text_is_not_added_twice_and_changed_text_replaces_the_row(index):
+    assert index.add(["r2"], ["negative"], ["bagno rumoroso"], [unit(0, 1, 0.2)]) == 0
+    assert index.add(["r2"], ["negative"], ["bagno silenzioso"], [unit(1, 1, 0)]) == 1
+
+    assert index.stats()["rows"] == 4 and index.stats()["deleted"] == 1
+    texts = [r["text"] for r in index.search(unit(0, 1, 0), k=10)]
+    assert "bagno rumoroso" not in texts and "bagno silenzioso" in texts
+
+
+def test_removed_reviews_are_not_returned(index):
+    assert index.remove(["r1"]) == 2
+    assert {r["review_id"] for r in index.search(unit(1, 1, 1), k=10)} == {"r2", "r3"}
+    with pytest.raises(KeyError):
+        index.search_similar_to("r1")
+
+
+def test_reopened_index_drops_uncommitted_rows(index, tmp_path):
+    index.remove(["r3"])
+    index.close()
+    # An add() interrupted after appending to the files but before committing its rows
+    with open(index.vectors_path, "ab") as f:
+        f.write(unit(1, 0, 0).astype(np.float16).tobytes())
+
+    reopened = ReviewEmbeddingIndex(index.path)
+    try:
+        assert len(reopened) == 4 and reopened.stats()["rows"] == 3
+        assert [r["review_id"] for r in reopened.search(unit(1, 0, 0), k=1)] == ["r1"]
+        with pytest.raises(ValueError):
+            reopened.add(["r4"], ["positive"], ["ottimo"], [np.ones(5)])
+    finally:
+        reopened.close()
+
+
+def test_analyzer_fills_the_index(tiny_models, tmp_path):
+    from core.constants import SAMPLE_REVIEWS
+    from core.review_analyzer import BookingReviewAnalyzer
+
+    analyzer = BookingReviewAnalyzer(embedding_index_path=str(tmp_path / "index"))
+    analyzer.analyze_reviews(SAMPLE_REVIEWS)
+    rows = analyzer.embedding_index.stats()["rows"]
+    analyzer.analyze_reviews(SAMPLE_REVIEWS)
+
+    # Segments KeyBERT skips (too short) aren't indexed; a re-run adds nothing
+    assert 0 < rows == analyzer.embedding_index.stats()["rows"]
+    [text] = analyzer.embedding_index.conn.execute("SELECT text FROM rows ORDER BY row LIMIT 1").fetchone()
+    assert analyzer.find_similar_reviews(text, k=1)[0]["text"] == text
@@ -0,0 +1,97 @@
+import os
+import pytest
+
+pytest.importorskip("diffusers")
+pytest.importorskip("PIL")
+
+
+@pytest.fixture
+def generator(tiny_models, tmp_path):
+    from ai.image_generator import ImageGenerator
+    generator = ImageGenerator(output_dir=str(tmp_path))
+    yield generator
+    generator.writer.close()
+
+
+def test_prompt_embeddings_are_cached(generator):
+    first = generator.encode_prompts(["a cat", "a city", "a cat"])
+    second = generator.encode_prompts(["a city"])
+    assert first[0] is first[2] and second[0] is first[1]
+    assert generator.prompt_cache_stats()["misses"] == 2
+
+
+def test_benchmark_encodes_prompts_like_generate(generator, monkeypatch):
+    """measure_performance must time the path generate runs: cached prompts, encoded outside autocast"""
+    import torch
+
+    generator.use_bf16 = True
+    encode_prompts = generator.encode_prompts
+    autocast = []
+
+    def recording_encode(prompts):
+        autocast.append(torch.is_autocast_enabled("cpu"))
+        return encode_prompts(prompts)
+
+    monkeypatch.setattr(generator, "encode_prompts", recording_encode)
+    generator.generate("a cat", seed=1, num_inference_steps=2)
+    from_generate = set(autocast)
+    autocast.clear()
+    generator.measure_performance("a cat", num_inference_steps=2)
+
+    assert from_generate == set(autocast) == {False}
+    assert generator.prompt_cache_stats()["hits"] >= 2
+
+
+def test_benchmark_leaves_the_shared_pipeline_alone(generator, monkeypatch):
+    """Other threads may be rendering with the registry pipeline meanwhile"""
+    pipeline = generator.pipeline
+    step = pipeline.scheduler.step
+    seen = []
+
+    def recording_step(*args, **kwargs):
+        seen.append(("decode" in vars(pipeline.vae), len(pipeline.unet._forward_hooks),
+                     len(pipeline.unet._forward_pre_hooks)))
+        return step(*args, **kwargs)
+
+    monkeypatch.setattr(pipeline.scheduler, "step", recording_step)
+    report = generator.measure_performance("a cat", num_images=2, num_inference_steps=3)
+
+    assert set(seen) == {(False, 0, 0)}
+    # One entry per denoising step (PNDM runs one more than num_inference_steps)
+    assert len(report["unet_step_ms"]["all"]) == len(pipeline.scheduler.timesteps)
+    assert report["vae_decode_ms"] > 0
+
+
+def test_submitted_prompts_render_in_shared_batches(generator, capsys):
+    generator.max_batch_size = 2
+    paths = [generator.submit(prompt, seed=3, num_inference_steps=2) for prompt in ("a cat", "a city", "a dog")]
+    duplicate = generator.submit("a cat", seed=3, num_inference_steps=2)
+    results = generator.flush()
+
+    assert duplicate == paths[0] and [result["path"] for result in results] == paths + [duplicate]
+    batches = [line for line in capsys.readouterr().out.splitlines() if line.startswith("Generating")]
+    assert batches == ["Generating 2 image/s in one batch (2 steps)", "Generating 1 image/s in one batch (2 steps)"]
+    assert all(os.path.exists(path) for path in paths)
+
+
+def test_seeded_rerun_returns_the_saved_files(generator, capsys):
+    first = generator.generate("a cat", num_images=2, seed=5, num_inference_steps=2)
+    capsys.readouterr()
+    second = generator.generate("a cat", num_images=2, seed=5, num_inference_steps=2)
+
+    assert second["saved_paths"] == first["saved_paths"] and second["seeds"] == [5, 6]
+    assert "in one batch" not in capsys.readouterr().out
+    assert second["write_futures"] == [None, None]
+
+
+def test_output_path_depends_on_profile_and_precision(generator, tmp_path):
+    from ai.image_generator import ImageGenerator
+
+    fast = ImageGenerator(profile="fast_scheduler", output_dir=str(tmp_path), writer=generator.writer)
+    request = ("a cat", 1, 7.5, 20)
+    assert generator._output_path(*request) == generator._output_path(*request)
+    assert fast._output_path(*request) != generator._output_path(*request)
+
+    default_path = generator._output_path(*request)
+    generator.use_bf16 = True
+    assert generator._output_path(*request) != default_path
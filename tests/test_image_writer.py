@@ -0,0 +1,63 @@
+import os
+import threading
+import pytest
+from ai.image_writer import BackgroundImageWriter
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def image(color="red"):
+    return Image.new("RGB", (16, 16), color)
+
+
+@pytest.mark.parametrize("image_format", ["png", "webp"])
+def test_writes_images_and_resolves_futures(tmp_path, image_format):
+    with BackgroundImageWriter(image_format=image_format) as writer:
+        futures = [writer.submit(image(color), str(tmp_path / f"{color}.{writer.extension}"))
+                   for color in ("red", "green", "blue")]
+        paths = [future.result() for future in futures]
+
+    assert [os.path.basename(path) for path in paths] == [f"{c}.{image_format}" for c in ("red", "green", "blue")]
+    assert Image.open(paths[1]).getpixel((0, 0)) == (0, 128, 0)
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path))
+    assert writer.metrics()["images_written"] == 3 and writer.metrics()["queue_depth"] == 0
+
+
+def test_queued_image_is_visible_until_written(tmp_path, monkeypatch):
+    writer = BackgroundImageWriter()
+    release = threading.Event()
+    write = writer._write
+    monkeypatch.setattr(writer, "_write", lambda *args: release.wait(5) and write(*args))
+
+    queued = image()
+    path = str(tmp_path / "queued.png")
+    future = writer.submit(queued, path)
+    assert writer.pending_image(path) is queued and not os.path.exists(path)
+
+    release.set()
+    future.result()
+    writer.close()
+    assert writer.pending_image(path) is None and os.path.exists(path)
+
+
+def test_submit_blocks_when_the_queue_is_full(tmp_path, monkeypatch):
+    writer = BackgroundImageWriter(workers=1, max_queue=1)
+    release = threading.Event()
+    write = writer._write
+    monkeypatch.setattr(writer, "_write", lambda *args: release.wait(5) and write(*args))
+
+    writer.submit(image(), str(tmp_path / "first.png"))
+    second = threading.Thread(target=writer.submit, args=(image(), str(tmp_path / "second.png")))
+    second.start()
+    second.join(0.2)
+    assert second.is_alive()
+
+    release.set()
+    second.join(5)
+    writer.close()
+    assert writer.metrics()["peak_queue_depth"] == 1 and writer.images_written == 2
+
+
+def test_rejects_unknown_formats():
+    with pytest.raises(ValueError):
+        BackgroundImageWriter(image_format="jpeg")
@@ -0,0 +1,105 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from core.inference_server import DynamicBatcher, QueueFullError
+
+
+def run_batcher(process_batch, requests, **kwargs):
+    """Submit each request (a list of items) concurrently; return their results (or exceptions) and the batcher"""
+    async def main():
+        executor = ThreadPoolExecutor(max_workers=1)
+        batcher = DynamicBatcher("test", process_batch, executor, **kwargs)
+        batcher.start()
+        try:
+            futures = [batcher.submit_many(items) for items in requests]
+            results = [await asyncio.gather(*request, return_exceptions=True) for request in futures]
+        finally:
+            await batcher.close()
+            executor.shutdown()
+        return results, batcher
+    return asyncio.run(main())
+
+
+def test_concurrent_requests_share_batches():
+    batches = []
+
+    def upper(items):
+        batches.append(list(items))
+        return [item.upper() for item in items]
+
+    results, batcher = run_batcher(upper, [["a", "b"], ["c"], ["d", "e", "f"]], max_batch_size=4, max_wait_ms=50)
+
+    assert results == [["A", "B"], ["C"], ["D", "E", "F"]]
+    assert batches == [["a", "b", "c", "d"], ["e", "f"]]
+    assert batcher.stats()["largest_batch"] == 4
+
+
+def test_a_failing_item_only_fails_its_request():
+    def strict(items):
+        if "bad" in items:
+            raise ValueError("bad item")
+        return [len(item) for item in items]
+
+    results, batcher = run_batcher(strict, [["ok"], ["bad"], ["fine"]], max_batch_size=8, max_wait_ms=50)
+
+    assert results[0] == [2] and results[2] == [4]
+    assert isinstance(results[1][0], ValueError)
+    assert batcher.isolated_failures == 1
+
+
+def test_full_queue_rejects_the_whole_request():
+    async def main():
+        batcher = DynamicBatcher("test", list, None, max_queue=2)
+        batcher.submit_many(["a"])
+        with pytest.raises(QueueFullError):
+            batcher.submit_many(["b", "c"])
+        assert batcher.stats()["queue_depth"] == 1 and batcher.rejected == 2
+        await batcher.close()
+    asyncio.run(main())
+
+
+@pytest.fixture
+def server(tiny_models):
+    from core.inference_server import InferenceServer
+    return InferenceServer(port=0, max_batch_size=4, max_wait_ms=20)
+
+
+async def http(server, request):
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    writer.write(request)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def post(path, payload):
+    body = json.dumps(payload).encode("utf-8")
+    return (f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+            .encode("latin-1") + body)
+
+
+def test_http_endpoints(server):
+    async def main():
+        await server.start()
+        try:
+            sentiment = http(server, post("/sentiment", {"texts": ["Camera pulita", "Staff scortese"]}))
+            single = http(server, post("/sentiment", {"text": "Colazione ottima"}))
+            (status, results), (single_status, result) = await asyncio.gather(sentiment, single)
+            bad_length = await http(server, b"POST /sentiment HTTP/1.1\r\nContent-Length: -3\r\n\r\n")
+            bad_body = await http(server, post("/sentiment", {"texts": []}))
+            stats = await http(server, b"GET /stats HTTP/1.1\r\nConnection: close\r\n\r\n")
+        finally:
+            await server.close()
+        return status, results, single_status, result, bad_length, bad_body, stats
+
+    status, results, single_status, result, bad_length, bad_body, stats = asyncio.run(main())
+
+    assert status == single_status == 200
+    assert [r["text"] for r in results] == ["Camera pulita", "Staff scortese"]
+    assert result["text"] == "Colazione ottima" and isinstance(result["confidence"], float)
+    assert bad_length == (400, {"error": "invalid Content-Length"})
+    assert bad_body[0] == 400
+    assert stats[1]["endpoints"]["sentiment"]["items"] == 3
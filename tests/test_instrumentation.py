@@ -0,0 +1,74 @@
+import io
+import json
+import pytest
+from core.instrumentation import METRIC_PREFIX, Instrumentation, JSONLogHook, PrometheusTextHook
+
+
+def test_disabled_records_nothing():
+    instrumentation = Instrumentation()
+    with instrumentation.stage("a", items=3) as stage:
+        stage.add(items=1)
+    instrumentation.count("event")
+    assert instrumentation.snapshot() == {"stages": {}, "counters": {}}
+
+
+def test_stages_record_calls_items_tokens_and_errors():
+    instrumentation = Instrumentation(enabled=True)
+    with instrumentation.stage("embed", items=4) as stage:
+        stage.add(tokens=40)
+    with instrumentation.stage("embed", items=2):
+        pass
+    with pytest.raises(KeyError):
+        with instrumentation.stage("embed", items=1):
+            raise KeyError("boom")
+    instrumentation.count("fallback", 3)
+
+    snapshot = instrumentation.snapshot()
+    stats = snapshot["stages"]["embed"]
+    assert (stats["calls"], stats["items"], stats["tokens"], stats["errors"]) == (3, 7, 40, 1)
+    assert stats["last_error"] == "KeyError" and stats["mean_batch_size"] == pytest.approx(7 / 3, abs=0.01)
+    assert snapshot["counters"] == {"fallback": 3}
+
+
+def test_json_hook_logs_one_line_per_event():
+    stream = io.StringIO()
+    instrumentation = Instrumentation()
+    instrumentation.enable(JSONLogHook(stream=stream))
+    with instrumentation.stage("classify", items=8):
+        pass
+    instrumentation.count("lexicon_hit", 2)
+
+    events = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(e.get("stage"), e.get("items"), e.get("event"), e.get("count")) for e in events] == [
+        ("classify", 8, None, None), (None, None, "lexicon_hit", 2)
+    ]
+
+
+def test_prometheus_export(tmp_path):
+    instrumentation = Instrumentation(enabled=True)
+    with instrumentation.stage('odd "name"', items=5):
+        pass
+    instrumentation.count("fallback")
+
+    path = tmp_path / "metrics.prom"
+    PrometheusTextHook(str(path), source=instrumentation).flush()
+    text = path.read_text()
+    assert f'{METRIC_PREFIX}_stage_items_total{{stage="odd \\"name\\""}} 5' in text
+    assert f'{METRIC_PREFIX}_events_total{{event="fallback"}} 1' in text
+    assert not (tmp_path / "metrics.prom.tmp").exists()
+
+
+def test_analyzer_stages_are_recorded(tiny_models, monkeypatch):
+    from core import instrumentation as module
+    from core.constants import SAMPLE_REVIEWS
+    from core.review_analyzer import BookingReviewAnalyzer
+
+    recorder = Instrumentation(enabled=True)
+    for name in ("core.review_analyzer", "ai.sentiment_analyzer"):
+        monkeypatch.setattr(f"{name}.instrumentation", recorder)
+    BookingReviewAnalyzer().analyze_reviews(SAMPLE_REVIEWS, batch_size=4)
+
+    stages = recorder.snapshot()["stages"]
+    assert {"review_analyzer.categorize", "review_analyzer.keywords", "review_analyzer.aggregate"} <= set(stages)
+    assert stages["review_analyzer.categorize"]["items"] > 0
+    assert module.instrumentation is not recorder
@@ -0,0 +1,78 @@
+import hashlib
+import numpy as np
+import pytest
+from core.constants import SAMPLE_REVIEWS
+from core.review_analyzer import BookingReviewAnalyzer
+
+TEXTS = [text for review in SAMPLE_REVIEWS
+         for text in (review.get("contenuto_positivo"), review.get("contenuto_negativo")) if text]
+
+
+def fake_embed(phrases):
+    """One deterministic vector per phrase, whatever batch it comes in"""
+    vectors = []
+    for phrase in phrases:
+        seed = int.from_bytes(hashlib.sha256(phrase.encode("utf-8")).digest()[:4], "little")
+        vectors.append(np.random.default_rng(seed).normal(size=16))
+    return np.array(vectors)
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    pytest.importorskip("sklearn")
+    analyzer = BookingReviewAnalyzer()
+    monkeypatch.setattr(analyzer, "_embed", fake_embed)
+    return analyzer
+
+
+def reference_ranking(text, top_n=5):
+    """What KeyBERT does for one document: its own 1-2-gram candidates, by cosine similarity"""
+    from sklearn.feature_extraction.text import CountVectorizer
+    words = CountVectorizer(ngram_range=(1, 2), stop_words="english").fit([text]).get_feature_names_out()
+    doc = fake_embed([text])[0]
+    candidates = fake_embed(list(words))
+    scores = candidates @ doc / (np.linalg.norm(candidates, axis=1) * np.linalg.norm(doc))
+    return [words[i] for i in np.argsort(-scores, kind="stable")[:top_n]]
+
+
+def test_each_document_is_ranked_against_its_own_candidates(analyzer):
+    ranked = analyzer._rank_candidates(TEXTS, top_n=5)
+    for text in TEXTS:
+        assert ranked[text] == reference_ranking(text)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 2048])
+def test_chunking_does_not_change_keywords(analyzer, chunk_size):
+    flags = [i % 2 == 1 for i in range(len(TEXTS))]
+    expected = [analyzer._filter_keywords(reference_ranking(text), flag) if len(text.strip()) >= 10 else []
+                for text, flag in zip(TEXTS, flags)]
+    assert analyzer._extract_keywords_batch(TEXTS, flags, chunk_size=chunk_size) == expected
+
+
+def test_a_failing_chunk_falls_back_alone(analyzer, monkeypatch):
+    rank_candidates = analyzer._rank_candidates
+
+    def failing(docs, top_n, embeddings=None):
+        if any("boom" in doc for doc in docs):
+            raise RuntimeError("boom")
+        return rank_candidates(docs, top_n, embeddings)
+
+    monkeypatch.setattr(analyzer, "_rank_candidates", failing)
+    texts = ["Colazione abbondante e varia", "boom camera rumorosa e piccola", "Piscina grande e pulita"]
+    keywords = analyzer._extract_keywords_batch(texts, [False, True, False], chunk_size=1)
+
+    assert keywords[0] == analyzer._filter_keywords(reference_ranking(texts[0]), False)
+    assert keywords[1] == analyzer._simple_keyword_fallback(texts[1], True)
+    assert keywords[2] == analyzer._filter_keywords(reference_ranking(texts[2]), False)
+
+
+def test_short_and_empty_texts_have_no_keywords(analyzer):
+    assert analyzer._extract_keywords_batch(["", None, "corto"], [False, True, False]) == [[], [], []]
+
+
+def test_matches_keybert_on_the_tiny_model(tiny_models):
+    analyzer = BookingReviewAnalyzer()
+    ranked = analyzer._rank_candidates(TEXTS[:6], top_n=5)
+    for text in TEXTS[:6]:
+        expected = [kw for kw, _ in analyzer.kw_model.extract_keywords(text, keyphrase_ngram_range=(1, 2), top_n=5)]
+        assert set(ranked[text]) == set(expected)
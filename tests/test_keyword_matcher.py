@@ -0,0 +1,67 @@
+import pytest
+from core.constants import SAMPLE_REVIEWS
+from core.keyword_matcher import KeywordMatcher
+from core.review_analyzer import BookingReviewAnalyzer
+
+CATEGORIES = BookingReviewAnalyzer().categories
+
+TEXTS = [text for review in SAMPLE_REVIEWS
+         for text in (review.get("contenuto_positivo"), review.get("contenuto_negativo")) if text] + [
+    "",
+    "STAFF gentilissimo, Pulizia ottima",
+    "barca sul lago",                       # 'bar' inside another word
+    "aria condizionata rotta",              # multi-word keyword
+    "rapporto qualità/prezzo",              # overlapping keywords of two categories
+    "vicino a Villa Pamphili, navetta",
+    "pulitissimo",                          # 'pulito' is not a substring, 'pulitissimo' is
+]
+
+
+def substring_categorize(text, categories):
+    """The matching KeywordMatcher replaced: a category is in if any keyword is a substring"""
+    text_lower = text.lower()
+    return [category for category, keywords in categories.items()
+            if any(keyword.lower() in text_lower for keyword in keywords)]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_categorize_matches_substring_search(text):
+    assert KeywordMatcher(CATEGORIES).categorize(text) == substring_categorize(text, CATEGORIES)
+
+
+def test_categorize_many_matches_categorize():
+    matcher = KeywordMatcher(CATEGORIES)
+    assert [r["categories"] for r in matcher.categorize_many(TEXTS)] == [matcher.categorize(t) for t in TEXTS]
+
+
+def test_add_keywords_matches_substring_search():
+    matcher = KeywordMatcher(CATEGORIES)
+    matcher.add_keywords("wifi", ["wi-fi", "wifi", "internet"])
+    categories = {**CATEGORIES, "wifi": ["wi-fi", "wifi", "internet"]}
+    for text in TEXTS + ["Il Wi-Fi non funzionava in camera"]:
+        assert matcher.categorize(text) == substring_categorize(text, categories)
+
+
+def test_word_boundary():
+    matcher = KeywordMatcher(CATEGORIES, word_boundary=True)
+    assert matcher.categorize("barca sul lago") == []
+    assert matcher.categorize("bar sulla terrazza") == ["facilities"]
+
+
+def test_find_reports_every_overlapping_match():
+    matcher = KeywordMatcher(CATEGORIES)
+    text = "Ottimo Rapporto Qualità/Prezzo"
+    matches = matcher.find(text)
+    for start, end, keyword, _ in matches:
+        assert text.lower()[start:end] == keyword
+    assert {(keyword, category) for _, _, keyword, category in matches} == {
+        ("rapporto", "value_price"), ("qualità", "breakfast"), ("prezzo", "value_price"),
+        ("qualità/prezzo", "value_price")}
+
+
+def test_analyzer_categorize_text_matches_substring_search():
+    analyzer = BookingReviewAnalyzer()
+    for text in TEXTS:
+        assert analyzer._categorize_text(text) == substring_categorize(text, CATEGORIES)
+    analyzer.add_category_keywords("wifi", ["wifi"])
+    assert analyzer._categorize_text("WiFi lento") == ["wifi"]
@@ -0,0 +1,85 @@
+import pytest
+from core.constants import SAMPLE_REVIEWS
+from core.lexicon import PRIOR_CONFIDENCE, SentimentLexicon
+from core.review_analyzer import BookingReviewAnalyzer
+
+# The same texts in both fields, in different reviews: their field prior must not leak across reviews
+CROSS_FIELD_REVIEWS = [
+    {"titolo": "a", "contenuto_positivo": "Tutto", "contenuto_negativo": "Colazione"},
+    {"titolo": "b", "contenuto_positivo": "Colazione", "contenuto_negativo": "Tutto"},
+    {"titolo": "c", "contenuto_positivo": "Staff eccellente.", "contenuto_negativo": "Letto scomodo"},
+    {"titolo": "d", "contenuto_positivo": "Niente male", "contenuto_negativo": "Tutto"},
+]
+REVIEWS = CROSS_FIELD_REVIEWS + SAMPLE_REVIEWS
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Staff eccellente.", 1),
+    ("Letto scomodo", -1),
+    ("Niente male", 1),
+    ("Non pulito", -1),
+    ("Pulito ma rumoroso", 0),                          # mixed
+    ("Tutto", 0),                                       # no polar word and no prior
+    ("Colazione buona, personale gentile e disponibile, camera ampia", 0),   # too long
+])
+def test_score(text, expected):
+    assert SentimentLexicon().score(text)[0] == expected
+
+
+def test_prior_only_for_texts_without_lexicon_words():
+    lexicon = SentimentLexicon()
+    assert lexicon.score("Tutto", prior=1) == (1, False, PRIOR_CONFIDENCE)
+    assert lexicon.score("Tutto", prior=-1) == (-1, False, PRIOR_CONFIDENCE)
+    assert lexicon.score("Staff", prior=1)[0] == 0          # an aspect matched
+    assert lexicon.score("Non tutto", prior=1)[0] == 0
+
+
+def test_prior_answers_stay_below_the_recommended_gate():
+    lexicon = SentimentLexicon()
+    decided, undecided = lexicon.split(["Tutto", "Staff eccellente.", "Tutto"], 0.8, priors=[1, 1, -1])
+    assert list(decided) == [("Staff eccellente.", 1)]
+    assert undecided == ["Tutto"]
+
+    decided, undecided = lexicon.split(["Tutto", "Tutto"], PRIOR_CONFIDENCE, priors=[1, -1])
+    assert decided == {("Tutto", 1): (1, False, PRIOR_CONFIDENCE), ("Tutto", -1): (-1, False, PRIOR_CONFIDENCE)}
+    assert undecided == []
+
+
+def test_category_and_issue_words_are_not_polar():
+    lexicon = BookingReviewAnalyzer().lexicon
+    for text in ("Caldo", "Camera piccola", "Personale gentile", "Molto pulito"):
+        assert lexicon.score(text, prior=1)[0] == 0, text
+    assert lexicon.score("Staff eccellente.")[0] == 1
+
+
+def sentiments(detailed_reviews):
+    return [(r["positive_sentiment"], r["negative_sentiment"], list(r["categories_mentioned"]))
+            for r in detailed_reviews]
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.8])
+def test_cascade_does_not_depend_on_chunk_boundaries(tiny_models, threshold):
+    analyzer = BookingReviewAnalyzer(cascade_threshold=threshold)
+    expected = analyzer.analyze_reviews(REVIEWS)
+
+    for chunk_size in (1, 7, len(REVIEWS)):
+        results = analyzer.analyze_reviews(REVIEWS, compact=True, chunk_size=chunk_size)
+        assert sentiments(results["detailed_reviews"]) == sentiments(expected["detailed_reviews"])
+        for section in ("categories", "strengths", "areas_for_improvement"):
+            assert results[section] == expected[section]
+        assert results["summary"]["positive_percentage"] == expected["summary"]["positive_percentage"]
+        assert results["summary"]["average_confidence"] == pytest.approx(
+            expected["summary"]["average_confidence"], abs=1e-3)
+
+
+def test_sentiment_analyzer_keeps_numeric_confidence(tiny_models):
+    from ai.sentiment_analyzer import SentimentAnalyzer
+    analyzer = SentimentAnalyzer(cascade_threshold=0.8)
+    lexicon, model = analyzer.analyze_batch(["Staff eccellente.", "La camera era al terzo piano, vicino all'ascensore"])
+
+    assert lexicon["source"] == "lexicon"
+    assert lexicon["raw_label"] in analyzer.labels.values()
+    assert isinstance(lexicon["confidence"], float) and lexicon["confidence"] >= 0.8
+    assert model["source"] == "model"
+    assert isinstance(model["confidence"], float)
+    assert analyzer.analyze("Staff eccellente.") == lexicon
@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from core.long_text import aggregate_windows, max_window_tokens, window_sentiment
+
+SHORT = ["Camera pulita e staff gentile.", "Colazione scarsa"]
+LONG = " ".join(["La camera era pulita ma il bagno piccolo e rumoroso."] * 120)
+
+
+def fake_pipeline(model_type, positions, pad_token_id=1, model_max_length=10 ** 30):
+    config = SimpleNamespace(model_type=model_type, max_position_embeddings=positions, pad_token_id=pad_token_id)
+    return SimpleNamespace(model=SimpleNamespace(config=config),
+                           tokenizer=SimpleNamespace(model_max_length=model_max_length))
+
+
+def test_max_window_tokens():
+    # XLM-R has 514 positions but the first pad_token_id + 1 are never used
+    assert max_window_tokens(fake_pipeline("xlm-roberta", 514)) == 512
+    assert max_window_tokens(fake_pipeline("bert", 512, pad_token_id=0)) == 512
+    assert max_window_tokens(fake_pipeline("bert", 512, model_max_length=128)) == 128
+
+
+def test_aggregate_windows():
+    probabilities = np.array([[0.9, 0.1], [0.2, 0.8], [0.3, 0.7]], dtype=np.float32)
+    weights = np.array([10, 1, 1], dtype=np.float32)
+
+    assert aggregate_windows(probabilities, weights, "mean") == (1, pytest.approx(1.6 / 3))
+    assert aggregate_windows(probabilities, weights, "length_weighted") == (0, pytest.approx(9.5 / 12))
+    assert aggregate_windows(probabilities, weights, "max_confidence") == (0, pytest.approx(0.9))
+    assert aggregate_windows(probabilities, weights, "majority") == (1, pytest.approx(0.75))
+    with pytest.raises(ValueError):
+        aggregate_windows(probabilities, weights, "median")
+
+
+@pytest.fixture
+def classifier(tiny_models):
+    from core.model_registry import get_pipeline
+    from core.review_analyzer import SENTIMENT_MODEL
+    return get_pipeline("sentiment-analysis", SENTIMENT_MODEL)
+
+
+def test_short_texts_match_the_pipeline(classifier):
+    for text, result in zip(SHORT, window_sentiment(classifier, SHORT)):
+        expected = classifier(text)[0]
+        assert result["label"] == expected["label"]
+        assert result["score"] == pytest.approx(expected["score"], abs=1e-4)
+
+
+def test_long_texts_are_windowed_not_truncated(classifier):
+    tokens = len(classifier.tokenizer(LONG)["input_ids"])
+    assert tokens > max_window_tokens(classifier)
+
+    results = window_sentiment(classifier, [SHORT[0], LONG, SHORT[1]], batch_size=2)
+    alone = window_sentiment(classifier, [LONG], batch_size=32)
+    assert results[1]["label"] == alone[0]["label"]
+    assert results[1]["score"] == pytest.approx(alone[0]["score"], abs=1e-4)
+    assert results[0]["score"] == pytest.approx(window_sentiment(classifier, SHORT[:1])[0]["score"], abs=1e-4)
+
+
+def test_strategies_on_small_windows(classifier):
+    scores = {strategy: window_sentiment(classifier, [LONG], strategy=strategy, stride=4, max_tokens=32)[0]["score"]
+              for strategy in ("mean", "length_weighted", "max_confidence", "majority")}
+    # No average of the windows can be more confident than the most confident window
+    assert scores["max_confidence"] >= max(scores["mean"], scores["length_weighted"], scores["majority"]) - 1e-6
+
+
+def test_analyzer_windows_long_segments(tiny_models):
+    from core.review_analyzer import BookingReviewAnalyzer
+
+    analyzer = BookingReviewAnalyzer(long_text=True)
+    [analysis] = analyzer._analyze_texts_sentiment([LONG])
+    [expected] = window_sentiment(analyzer.sentiment_analyzer, [LONG])
+    assert analysis == analyzer._format_sentiment(expected)
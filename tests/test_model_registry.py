@@ -0,0 +1,103 @@
+import threading
+import time
+import pytest
+from core import model_registry
+from core.model_registry import ModelRegistry, get_pipeline
+
+
+@pytest.fixture
+def rss(monkeypatch):
+    """Fake process RSS in MB, so budget decisions are deterministic"""
+    value = {"mb": 1000.0}
+    monkeypatch.setattr(model_registry, "_rss_mb", lambda: value["mb"])
+    return value
+
+
+def loading(rss, mb, name=None):
+    """Loader whose model takes mb of RSS"""
+    def load():
+        rss["mb"] += mb
+        return name or object()
+    return load
+
+
+def test_loads_once_and_shares(rss):
+    registry = ModelRegistry()
+    calls = []
+    registry.register("a", lambda: calls.append(1) or object())
+    assert registry.get("a") is registry.get("a", loader=lambda: "ignored")
+    assert calls == [1]
+    assert registry.stats()["models"]["a"]["hits"] == 1
+
+
+def test_concurrent_callers_wait_for_one_load(rss):
+    registry = ModelRegistry()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("a", slow))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert len({id(model) for model in results}) == 1
+
+
+def test_slow_load_does_not_block_other_keys(rss):
+    registry = ModelRegistry()
+    release = threading.Event()
+    slow = threading.Thread(target=lambda: registry.get("slow", lambda: release.wait(5) and object()))
+    slow.start()
+    time.sleep(0.05)
+
+    start = time.perf_counter()
+    registry.get("fast", object)
+    assert time.perf_counter() - start < 1
+    release.set()
+    slow.join()
+
+
+def test_budget_evicts_only_what_it_needs(rss):
+    registry = ModelRegistry(memory_budget_mb=1500)
+    registry.get("a", loading(rss, 200))
+    registry.get("b", loading(rss, 200))
+    registry.get("a")                         # b is now the least recently used
+    registry.get("c", loading(rss, 200))      # 1600 > 1500
+
+    loaded = {key for key, stats in registry.stats()["models"].items() if stats["loaded"]}
+    assert loaded == {"a", "c"}
+
+
+def test_models_without_a_measured_size_are_not_evicted(rss):
+    registry = ModelRegistry(memory_budget_mb=1100)
+    registry.get("unmeasured", loading(rss, 0))
+    registry.get("big", loading(rss, 200))     # over budget, but evicting "unmeasured" frees nothing we know of
+
+    assert registry.stats()["models"]["unmeasured"]["loaded"]
+
+
+def test_reload_after_eviction(rss):
+    registry = ModelRegistry()
+    calls = []
+    registry.register("a", lambda: calls.append(1) or object())
+    registry.get("a")
+    registry.evict("a")
+    registry.get("a")
+    assert calls == [1, 1]
+    assert registry.stats()["models"]["a"]["loads"] == 2
+
+
+def test_pipeline_key_includes_kwargs(rss, monkeypatch):
+    registry = ModelRegistry()
+    monkeypatch.setattr(model_registry, "registry", registry)
+    registry.register("sentiment-analysis:m", lambda: "plain")
+    registry.register("sentiment-analysis:m:top_k=None", lambda: "all scores")
+
+    assert get_pipeline("sentiment-analysis", "m") == "plain"
+    assert get_pipeline("sentiment-analysis", "m", top_k=None) == "all scores"
@@ -0,0 +1,46 @@
+import copy
+from core import parallel_analyzer
+from core.constants import SAMPLE_REVIEWS
+from core.parallel_analyzer import compare_results
+from core.review_aggregate import ReviewAggregate
+from core.review_analyzer import BookingReviewAnalyzer
+
+
+def test_shards_merged_in_order_are_equivalent_to_one_run(tiny_models, monkeypatch):
+    analyzer = BookingReviewAnalyzer()
+    monkeypatch.setattr(parallel_analyzer, "_worker_analyzer", analyzer)
+    reviews = SAMPLE_REVIEWS * 2
+    expected = analyzer.analyze_reviews(reviews)
+
+    for shard_size in (1, 5, len(reviews)):
+        aggregate = ReviewAggregate()
+        detailed_reviews = []
+        for start in range(0, len(reviews), shard_size):
+            shard_reviews, shard_aggregate = parallel_analyzer._analyze_shard(reviews[start:start + shard_size], 32)
+            aggregate.merge(shard_aggregate)
+            detailed_reviews.extend(shard_reviews)
+        results = {**aggregate.to_results(), "detailed_reviews": detailed_reviews}
+        assert compare_results(expected, results)["equivalent"]
+
+
+def test_compare_results():
+    review = {"positive_sentiment": "Positive", "negative_sentiment": "None", "categories_mentioned": ["breakfast"],
+              "key_strengths": ["colazione", "dolce"], "key_issues": []}
+    expected = {"summary": {"total_reviews": 1, "overall_sentiment": "Very Positive", "average_confidence": 0.9,
+                            "positive_percentage": 100.0},
+                "categories": {"breakfast": {"mentions": 1, "avg_sentiment": "Positive", "confidence": 0.9}},
+                "strengths": [("colazione", 1), ("dolce", 1)], "areas_for_improvement": [],
+                "detailed_reviews": [review]}
+    assert compare_results(expected, copy.deepcopy(expected)) == {
+        "equivalent": True, "sentiments_match": True, "confidence_drift": 0.0, "keyword_agreement": 1.0}
+
+    # A rounding step of confidence and a swapped near-tie keyword are still equivalent
+    drifted = copy.deepcopy(expected)
+    drifted["summary"]["average_confidence"] = 0.901
+    drifted["detailed_reviews"][0]["key_strengths"] = ["colazione", "salata"]
+    comparison = compare_results(expected, drifted)
+    assert comparison["equivalent"] and comparison["keyword_agreement"] == round(1 / 3, 3)
+
+    flipped = copy.deepcopy(expected)
+    flipped["detailed_reviews"][0]["positive_sentiment"] = "Neutral"
+    assert not compare_results(expected, flipped)["equivalent"]
@@ -0,0 +1,42 @@
+import threading
+import pytest
+from core.constants import SAMPLE_REVIEWS
+from core.parallel_analyzer import compare_results
+from core.pipelined_analyzer import PipelinedReviewAnalyzer
+
+REVIEWS = SAMPLE_REVIEWS * 2
+
+
+@pytest.fixture
+def pipeline(tiny_models):
+    return PipelinedReviewAnalyzer(chunk_size=5, queue_size=1, sentiment_threads=1, keyword_threads=1)
+
+
+def test_same_results_as_the_sequential_analysis(pipeline):
+    expected = pipeline.analyzer.analyze_reviews(REVIEWS)
+    results = pipeline.analyze_reviews(REVIEWS, batch_size=4)
+
+    assert compare_results(expected, results)["equivalent"]
+    assert results["detailed_reviews"] == expected["detailed_reviews"]
+    assert pipeline.last_run["chunks"] == 8
+    assert {name: stats["chunks"] for name, stats in pipeline.last_run["stages"].items()} == {
+        "sentiment": 8, "keywords": 8
+    }
+
+
+def test_a_failing_stage_stops_the_pipeline(pipeline, monkeypatch):
+    segment_keywords = pipeline.analyzer._segment_keywords
+    calls = []
+
+    def failing(segments):
+        calls.append(len(segments))
+        if len(calls) == 3:
+            raise RuntimeError("keyword model crashed")
+        return segment_keywords(segments)
+
+    monkeypatch.setattr(pipeline.analyzer, "_segment_keywords", failing)
+    with pytest.raises(RuntimeError, match="keyword model crashed"):
+        pipeline.analyze_reviews(REVIEWS)
+
+    assert len(calls) == 3
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("pipeline-")]
@@ -0,0 +1,94 @@
+import pytest
+from core.portfolio_aggregate import PortfolioAggregate, period_key
+from core.review_aggregate import ReviewAggregate
+
+
+def sequential_results(pairs):
+    aggregate = ReviewAggregate()
+    for _, result in pairs:
+        aggregate.add(*result)
+    return aggregate.to_results()
+
+
+def period_of(review, period="month"):
+    try:
+        return period_key(review["data"], period)
+    except ValueError:
+        return None
+
+
+@pytest.fixture
+def pairs(make_reviews):
+    return make_reviews(600, seed=1)
+
+
+@pytest.fixture
+def portfolio(pairs):
+    portfolio = PortfolioAggregate()
+    portfolio.extend([review for review, _ in pairs], [result for _, result in pairs])
+    return portfolio
+
+
+@pytest.mark.parametrize("hotels, since, until", [
+    (None, None, None),
+    (["roma-01"], None, None),
+    (["roma-01", "milano-01"], "2024-03", None),
+    (None, "2024-03", "2024-07"),
+    (["roma-02"], None, "2024-06"),
+])
+def test_slice_equals_sequential(pairs, portfolio, hotels, since, until):
+    selected = [(review, result) for review, result in pairs
+                if (hotels is None or review["hotel_id"] in hotels)
+                and (since is None or (period_of(review) is not None and period_of(review) >= since))
+                and (until is None or (period_of(review) is not None and period_of(review) <= until))]
+    assert portfolio.results(hotels, since, until) == sequential_results(selected)
+
+
+def test_rollup_equals_sequential(pairs, portfolio):
+    rollup = portfolio.rollup("hotel")
+    assert set(rollup) == {review["hotel_id"] for review, _ in pairs}
+    for hotel, results in rollup.items():
+        assert results == sequential_results([(r, a) for r, a in pairs if r["hotel_id"] == hotel])
+
+
+def test_incremental_adds_equal_one_extend(pairs, portfolio):
+    """Slicing in between adds (which folds the pending events) doesn't change the totals"""
+    incremental = PortfolioAggregate()
+    for start in range(0, len(pairs), 97):
+        chunk = pairs[start:start + 97]
+        incremental.extend([review for review, _ in chunk], [result for _, result in chunk])
+        incremental.results()
+    assert incremental.results() == portfolio.results()
+    assert incremental.rollup("period") == portfolio.rollup("period")
+
+
+def test_unparsable_dates_count_as_no_period(pairs, portfolio):
+    assert portfolio.invalid_dates == sum(review["data"] == "non una data" for review, _ in pairs)
+    assert None in portfolio.periods()
+    undated = [(r, a) for r, a in pairs if period_of(r) is None]
+    assert portfolio.rollup("period")[None] == sequential_results(undated)
+
+
+def test_period_key():
+    assert [period_key("2024-07-15T10:00", period) for period in ("day", "month", "quarter", "year")] == [
+        "2024-07-15", "2024-07", "2024-Q3", "2024"
+    ]
+    assert period_key(None) is None and period_key("") is None
+    with pytest.raises(ValueError):
+        period_key("2024-07-15", "week")
+
+
+def test_analyze_portfolio_matches_per_hotel_analysis(tiny_models):
+    from core.constants import SAMPLE_REVIEWS
+    from core.review_analyzer import BookingReviewAnalyzer
+
+    reviews = [dict(review, hotel_id=("roma-01", "milano-01")[i % 2], data=f"2024-0{i % 3 + 1}-10")
+               for i, review in enumerate(SAMPLE_REVIEWS)]
+    analyzer = BookingReviewAnalyzer()
+    portfolio = analyzer.analyze_portfolio(reviews, chunk_size=4)
+
+    for hotel in ("roma-01", "milano-01"):
+        expected = analyzer.analyze_reviews([review for review in reviews if review["hotel_id"] == hotel])
+        expected.pop("detailed_reviews")
+        assert portfolio.results([hotel]) == expected
+    assert portfolio.periods() == ["2024-01", "2024-02", "2024-03"]
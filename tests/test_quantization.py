@@ -0,0 +1,59 @@
+import os
+import pytest
+from core.quantization import bleu, load_quantized_model, model_size_mb, quantized_weights_path
+
+TEXTS = ["Camera pulita e staff gentile.", "Colazione scarsa, bagno piccolo"]
+
+
+@pytest.fixture
+def checkpoint(tiny_models, tmp_path):
+    """The tiny BERT sentiment classifier saved like a Hub checkpoint"""
+    from benchmarks.tiny_models import sentiment_pipeline
+    pipeline = sentiment_pipeline("bert", num_labels=5)
+    path = str(tmp_path / "tiny-bert")
+    pipeline.model.save_pretrained(path)
+    pipeline.tokenizer.save_pretrained(path)
+    return path, pipeline
+
+
+def logits(model, tokenizer):
+    import torch
+    with torch.no_grad():
+        return model(**tokenizer(TEXTS, padding=True, return_tensors="pt")).logits
+
+
+def test_warm_load_matches_the_first_quantization(checkpoint, tmp_path):
+    import torch
+    from transformers import AutoModelForSequenceClassification
+
+    path, pipeline = checkpoint
+    cache_dir = str(tmp_path / "int8")
+    cold = load_quantized_model(path, AutoModelForSequenceClassification, cache_dir)
+    assert os.path.exists(quantized_weights_path(path, cache_dir))
+    warm = load_quantized_model(path, AutoModelForSequenceClassification, cache_dir)
+
+    assert torch.equal(logits(cold, pipeline.tokenizer), logits(warm, pipeline.tokenizer))
+    assert model_size_mb(warm) < model_size_mb(pipeline.model)
+
+
+def test_unreadable_cache_is_rebuilt(checkpoint, tmp_path, capsys):
+    from transformers import AutoModelForSequenceClassification
+
+    path, pipeline = checkpoint
+    cache_dir = str(tmp_path / "int8")
+    cache_file = quantized_weights_path(path, cache_dir)
+    os.makedirs(cache_dir)
+    with open(cache_file, "wb") as f:
+        f.write(b"not a state dict")
+
+    model = load_quantized_model(path, AutoModelForSequenceClassification, cache_dir)
+    assert "Ignoring quantized cache" in capsys.readouterr().out
+    assert logits(model, pipeline.tokenizer).shape == (2, 5)
+    assert os.path.getsize(cache_file) > 100
+
+
+def test_bleu():
+    assert bleu(["the room was clean"], ["the room was clean"]) == 100.0
+    assert bleu([""], ["the room was clean"]) == 0.0
+    partial = bleu(["the room was dirty"], ["the room was clean"])
+    assert 0 < partial < bleu(["the room was very clean"], ["the room was very clean"])
@@ -0,0 +1,67 @@
+import pytest
+from core.constants import SAMPLE_REVIEWS
+from core.result_cache import SentimentCache
+
+
+class CountingClassifier:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [{"label": "LABEL_2" if "ottim" in text.lower() else "LABEL_0", "score": 0.9} for text in texts]
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "sentiments.sqlite")
+
+
+def test_only_distinct_misses_are_classified(cache_path):
+    cache = SentimentCache(cache_path, model_id="m")
+    classify = CountingClassifier()
+
+    first = cache.classify(["Ottimo", "Camera  sporca", "Ottimo"], classify)
+    second = cache.classify(["Camera sporca", "Ottimo", "Colazione ottima"], classify)
+
+    assert classify.calls == [["Ottimo", "Camera  sporca"], ["Colazione ottima"]]
+    assert second[:2] == [first[1], first[0]]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["deduplicated"]) == (2, 3, 1)
+    assert stats["seconds_saved"] >= 0
+    cache.close()
+
+
+def test_persists_per_model_id(cache_path):
+    cache = SentimentCache(cache_path, model_id="m")
+    cache.classify(["Ottimo"], CountingClassifier())
+    cache.close()
+
+    classify = CountingClassifier()
+    SentimentCache(cache_path, model_id="m").classify(["Ottimo"], classify)
+    SentimentCache(cache_path, model_id="m:int8").classify(["Ottimo"], classify)
+    assert classify.calls == [["Ottimo"]]
+
+
+def test_evicts_down_to_90_percent(cache_path):
+    cache = SentimentCache(cache_path, model_id="m", max_entries=10)
+    cache.classify([f"testo {i}" for i in range(12)], CountingClassifier())
+    assert cache.conn.execute("SELECT COUNT(*) FROM sentiments").fetchone()[0] == 9
+    cache.close()
+
+
+def test_shared_by_both_analyzers(tiny_models, cache_path):
+    from ai.sentiment_analyzer import SentimentAnalyzer
+    from core.review_analyzer import BookingReviewAnalyzer
+
+    texts = [review["contenuto_positivo"] for review in SAMPLE_REVIEWS]
+    analyzer = BookingReviewAnalyzer(sentiment_cache_path=cache_path)
+    first = analyzer._analyze_texts_sentiment(texts)
+    assert analyzer._analyze_texts_sentiment(texts) == first
+    assert analyzer.sentiment_cache.hits == len(set(texts))
+
+    # Same file, another model: its own entries
+    sentiment = SentimentAnalyzer(cache_path=cache_path)
+    batch = sentiment.analyze_batch(texts)
+    assert sentiment.analyze_batch(texts) == batch
+    assert sentiment.cache.hits == len(set(texts))
@@ -0,0 +1,49 @@
+import json
+from core.review_aggregate import ReviewAggregate
+
+
+def sequential(analyzed):
+    aggregate = ReviewAggregate()
+    for result in analyzed:
+        aggregate.add(*result)
+    return aggregate
+
+
+def test_merge_equals_sequential(make_reviews):
+    analyzed = [result for _, result in make_reviews(500)]
+    expected = sequential(analyzed).to_results()
+
+    for shard_size in (1, 7, 64, 500):
+        merged = ReviewAggregate()
+        for start in range(0, len(analyzed), shard_size):
+            merged.merge(sequential(analyzed[start:start + shard_size]))
+        assert merged.to_results() == expected
+
+
+def test_lexicon_answers_are_left_out_of_the_confidence():
+    detailed_review = {"negative_sentiment": "None", "categories_mentioned": ["staff_service"],
+                       "key_strengths": [], "key_issues": []}
+    aggregate = ReviewAggregate()
+    aggregate.add(detailed_review, {"sentiment": "Positive", "confidence": None}, None)
+    aggregate.add(detailed_review, {"sentiment": "Positive", "confidence": 0.9}, None)
+
+    results = aggregate.to_results()
+    assert results["summary"]["average_confidence"] == 0.9
+    assert results["categories"]["staff_service"] == {"mentions": 2, "avg_sentiment": "Positive",
+                                                      "confidence": 0.9}
+
+
+def test_dict_round_trip(make_reviews):
+    aggregate = sequential([result for _, result in make_reviews(200)])
+    state = json.loads(json.dumps(aggregate.to_dict()))
+    assert ReviewAggregate.from_dict(state).to_results() == aggregate.to_results()
+
+
+def test_load_dict_without_category_scored():
+    """States saved before the lexicon cascade: every mention was model-scored"""
+    state = {"total_reviews": 1, "positive_reviews": 1, "sentiment_count": 1, "confidence_sum": 800,
+             "category_mentions": {"breakfast": 1}, "category_confidence": {"breakfast": 800},
+             "category_sentiments": {"breakfast": {"Positive": 1}},
+             "positive_keywords": {"colazione": 1}, "negative_keywords": {}}
+    results = ReviewAggregate.from_dict(state).to_results()
+    assert results["categories"]["breakfast"]["confidence"] == 0.8
@@ -0,0 +1,60 @@
+import pytest
+from core.constants import SAMPLE_REVIEWS
+from core.review_analyzer import BookingReviewAnalyzer
+
+SEGMENTS = [text for review in SAMPLE_REVIEWS
+            for text in (review.get("contenuto_positivo"), review.get("contenuto_negativo"))]
+
+
+class CountingPipeline:
+    """Wraps the sentiment pipeline and records every text it classifies"""
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.tokenizer = pipeline.tokenizer
+        self.texts = []
+
+    def __call__(self, texts, **kwargs):
+        self.texts.extend(texts)
+        return self.pipeline(texts, **kwargs)
+
+
+@pytest.fixture
+def analyzer(tiny_models):
+    return BookingReviewAnalyzer()
+
+
+def test_batched_sentiment_matches_one_text_at_a_time(analyzer):
+    pipeline = analyzer.sentiment_analyzer
+    batched = analyzer._analyze_texts_sentiment(SEGMENTS, batch_size=4)
+
+    for text, analysis in zip(SEGMENTS, batched):
+        if not text or not text.strip():
+            assert analysis == {"sentiment": "Neutral", "confidence": 0.0}
+            continue
+        single = analyzer._format_sentiment(pipeline(text, truncation=True)[0])
+        assert analysis["sentiment"] == single["sentiment"]
+        assert analysis["confidence"] == pytest.approx(single["confidence"], abs=2e-3)
+
+
+def test_each_distinct_segment_is_classified_once(analyzer, monkeypatch):
+    counting = CountingPipeline(analyzer.sentiment_analyzer)
+    monkeypatch.setattr(BookingReviewAnalyzer, "sentiment_analyzer", property(lambda self: counting))
+
+    analyzer._analyze_texts_sentiment(SEGMENTS * 3 + ["", None, "   "], batch_size=8)
+    distinct = {text for text in SEGMENTS if text and text.strip()}
+    assert sorted(counting.texts) == sorted(distinct)
+
+
+def test_analyze_reviews_matches_per_review_analysis(analyzer):
+    results = analyzer.analyze_reviews(SAMPLE_REVIEWS, batch_size=8)
+    assert results["summary"]["total_reviews"] == len(SAMPLE_REVIEWS)
+
+    for review, detailed in zip(SAMPLE_REVIEWS, results["detailed_reviews"]):
+        positive = review.get("contenuto_positivo")
+        expected = analyzer._analyze_text_sentiment(positive)["sentiment"] if positive else None
+        assert detailed["positive_sentiment"] == expected
+        negative = analyzer._negative_content(review)
+        expected = analyzer._analyze_text_sentiment(negative)["sentiment"] if negative else "None"
+        assert detailed["negative_sentiment"] == expected
+        assert detailed["categories_mentioned"] == (analyzer._categorize_text(positive) if positive else [])
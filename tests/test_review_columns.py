@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from core.review_columns import ReviewColumns
+
+
+@pytest.fixture
+def analyzed(make_reviews):
+    """(detailed_review, pos, neg) with every field analyze_reviews fills in"""
+    rows = []
+    for i, (_, (detailed_review, pos_analysis, neg_analysis)) in enumerate(make_reviews(50, seed=3)):
+        detailed_review = dict(detailed_review, title=f"Soggiorno n°{i} — città" if i % 7 else "",
+                               positive_sentiment=pos_analysis["sentiment"] if pos_analysis else None)
+        rows.append((detailed_review, pos_analysis, neg_analysis))
+    return rows
+
+
+def test_views_equal_the_original_dicts(analyzed):
+    columns = ReviewColumns(capacity=4)
+    columns.extend(analyzed)
+
+    assert len(columns) == len(analyzed)
+    assert columns.to_dicts() == [detailed_review for detailed_review, _, _ in analyzed]
+    assert columns[-1] == analyzed[-1][0] and columns[2:4] == [analyzed[2][0], analyzed[3][0]]
+    with pytest.raises(IndexError):
+        columns[len(analyzed)]
+
+    confidences = columns.column("positive_confidence")
+    for (_, pos_analysis, _), confidence in zip(analyzed, confidences):
+        if pos_analysis is None or pos_analysis["confidence"] is None:
+            assert np.isnan(confidence)
+        else:
+            assert confidence == pytest.approx(pos_analysis["confidence"])
+
+
+def test_save_and_memory_mapped_load(analyzed, tmp_path):
+    columns = ReviewColumns()
+    columns.extend(analyzed[:40])
+    columns.save(str(tmp_path / "analysis"))
+
+    loaded = ReviewColumns.load(str(tmp_path / "analysis"))
+    assert isinstance(loaded.column("key_strengths_ids"), np.memmap)
+    assert loaded.to_dicts() == columns.to_dicts()
+
+    # Appending to a loaded store copies the mapped columns first
+    loaded.extend(analyzed[40:])
+    assert loaded.to_dicts() == [detailed_review for detailed_review, _, _ in analyzed]
+
+
+def test_compact_analysis_equals_the_dict_one(tiny_models):
+    from core.constants import SAMPLE_REVIEWS
+    from core.review_analyzer import BookingReviewAnalyzer
+
+    analyzer = BookingReviewAnalyzer()
+    plain = analyzer.analyze_reviews(SAMPLE_REVIEWS)
+    compact = analyzer.analyze_reviews(SAMPLE_REVIEWS, compact=True, chunk_size=5)
+
+    assert isinstance(compact["detailed_reviews"], ReviewColumns)
+    assert compact["detailed_reviews"].to_dicts() == plain.pop("detailed_reviews")
+    compact.pop("detailed_reviews")
+    assert compact == plain
@@ -0,0 +1,129 @@
+import sqlite3
+import pytest
+from core.review_aggregate import ReviewAggregate
+from core.review_snapshot import ReviewSnapshot
+
+
+def review_id(review):
+    return review["id"]
+
+
+def full_recompute(corpus):
+    """analyze_reviews-style results over {id: (review, analyzed)} in snapshot order"""
+    aggregate = ReviewAggregate()
+    for _, result in corpus.values():
+        aggregate.add(*result)
+    return aggregate.to_results()
+
+
+def refresh(snapshot, reviews, analyzed_by_id):
+    """analyze_delta without the models: results come from analyzed_by_id"""
+    entries = snapshot.pending(reviews, review_id)
+    snapshot.apply(entries, [analyzed_by_id[rid] for rid, _, _ in entries])
+    return entries
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    snapshot = ReviewSnapshot(str(tmp_path / "snapshot.sqlite"))
+    yield snapshot
+    snapshot.close()
+
+
+def test_deltas_equal_full_recompute(snapshot, make_reviews):
+    initial = make_reviews(300, seed=2)
+    corpus = {review["id"]: (review, result) for review, result in initial}
+    refresh(snapshot, [review for review, _ in initial], {rid: result for rid, (_, result) in corpus.items()})
+    assert len(snapshot) == 300
+    assert snapshot.results() == full_recompute(corpus)
+
+    # Unchanged reviews are not pending
+    assert snapshot.pending([review for review, _ in initial], review_id) == []
+
+    # Change: new content and result, same position
+    replacements = make_reviews(300, seed=3)
+    changed = {}
+    for i in range(0, 300, 7):
+        review = {**initial[i][0], "testo": "aggiornata"}
+        changed[review["id"]] = (review, replacements[i][1])
+    corpus.update(changed)
+    entries = refresh(snapshot, [review for review, _ in changed.values()],
+                      {rid: result for rid, (_, result) in changed.items()})
+    assert len(entries) == len(changed)
+    assert snapshot.results() == full_recompute(corpus)
+
+    # Add: appended at the end
+    added = make_reviews(50, seed=4)
+    corpus.update((review["id"], (review, result)) for review, result in added)
+    refresh(snapshot, [review for review, _ in added], {review["id"]: result for review, result in added})
+    assert snapshot.results() == full_recompute(corpus)
+
+    # Delete, including ids the snapshot never had
+    deleted = [initial[i][0]["id"] for i in range(0, 300, 3)] + [added[0][0]["id"], "missing"]
+    for rid in deleted:
+        corpus.pop(rid, None)
+    assert snapshot.delete(deleted) == len(deleted) - 1
+    assert len(snapshot) == len(corpus)
+    assert snapshot.results() == full_recompute(corpus)
+    assert list(snapshot.detailed_reviews()) == [result[0] for _, result in corpus.values()]
+
+
+def test_delete_everything(snapshot, make_reviews):
+    pairs = make_reviews(40, seed=5)
+    refresh(snapshot, [review for review, _ in pairs], {review["id"]: result for review, result in pairs})
+    snapshot.delete([review["id"] for review, _ in pairs])
+    assert len(snapshot) == 0
+    assert snapshot.results() == ReviewAggregate().to_results()
+
+
+def test_review_with_more_than_256_mentions(snapshot):
+    def review(rid, categories, strengths):
+        detailed_review = {"negative_sentiment": "None", "categories_mentioned": categories,
+                           "key_strengths": strengths, "key_issues": []}
+        return {"id": rid}, (detailed_review, {"sentiment": "Positive", "confidence": 0.9}, None)
+
+    many = [f"category-{i}" for i in range(300)]
+    pairs = [review("big", many, ["colazione"]),
+             review("small", ["category-299", "category-0"], ["piscina", "colazione"]),
+             review("last", ["category-299"], ["piscina"])]
+    corpus = {r["id"]: (r, result) for r, result in pairs}
+    refresh(snapshot, [r for r, _ in pairs], {r["id"]: result for r, result in pairs})
+    assert snapshot.results() == full_recompute(corpus)
+
+    # The big review's mentions must not spill into the next review's
+    snapshot.delete(["big"])
+    del corpus["big"]
+    assert snapshot.results() == full_recompute(corpus)
+    assert list(snapshot.results()["categories"]) == ["category-299", "category-0"]
+
+
+def test_snapshot_with_seq_mentions_is_migrated(tmp_path, make_reviews):
+    path = str(tmp_path / "old.sqlite")
+    pairs = make_reviews(60, seed=6)
+    corpus = {review["id"]: (review, result) for review, result in pairs}
+    snapshot = ReviewSnapshot(path)
+    refresh(snapshot, [review for review, _ in pairs], {rid: result for rid, (_, result) in corpus.items()})
+    snapshot.close()
+
+    # Mentions as older snapshots stored them: seq = position * 256 + index
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("ALTER TABLE mentions RENAME TO mentions_new")
+        conn.execute("DROP INDEX idx_mentions_position")
+        conn.execute("CREATE TABLE mentions (kind INTEGER NOT NULL, key TEXT NOT NULL, seq INTEGER NOT NULL,"
+                     " PRIMARY KEY (kind, key, seq)) WITHOUT ROWID")
+        conn.execute("CREATE INDEX idx_mentions_seq ON mentions (seq)")
+        conn.execute("INSERT INTO mentions SELECT kind, key, position * 256 + idx FROM mentions_new")
+        conn.execute("DROP TABLE mentions_new")
+    conn.close()
+
+    snapshot = ReviewSnapshot(path)
+    try:
+        assert snapshot.results() == full_recompute(corpus)
+        deleted = [review["id"] for review, _ in pairs[::4]]
+        snapshot.delete(deleted)
+        for rid in deleted:
+            del corpus[rid]
+        assert snapshot.results() == full_recompute(corpus)
+    finally:
+        snapshot.close()
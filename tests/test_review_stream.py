@@ -0,0 +1,65 @@
+import json
+from itertools import islice
+import pytest
+from core.constants import SAMPLE_REVIEWS
+from core.review_aggregate import ReviewAggregate
+from core.review_analyzer import BookingReviewAnalyzer
+
+REVIEWS = SAMPLE_REVIEWS * 2
+
+
+@pytest.fixture
+def analyzer(tiny_models):
+    return BookingReviewAnalyzer()
+
+
+@pytest.fixture
+def jsonl(tmp_path):
+    path = tmp_path / "reviews.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for review in REVIEWS:
+            f.write(json.dumps(review, ensure_ascii=False) + "\n\n")   # blank lines are skipped
+    return str(path)
+
+
+def sentiments(detailed_reviews):
+    return [(r["positive_sentiment"], r["negative_sentiment"], r["categories_mentioned"]) for r in detailed_reviews]
+
+
+def assert_same_results(results, expected):
+    for section in ("categories", "strengths", "areas_for_improvement"):
+        assert results[section] == expected[section]
+    assert results["summary"]["positive_percentage"] == expected["summary"]["positive_percentage"]
+    assert results["summary"]["average_confidence"] == pytest.approx(expected["summary"]["average_confidence"],
+                                                                     abs=1e-3)
+
+
+@pytest.mark.parametrize("from_file", [True, False])
+def test_stream_matches_analyze_reviews(analyzer, jsonl, from_file):
+    expected = analyzer.analyze_reviews(REVIEWS)
+    aggregate = ReviewAggregate()
+    source = jsonl if from_file else iter(REVIEWS)
+    detailed = list(analyzer.analyze_reviews_stream(source, aggregate, chunk_size=5))
+
+    assert sentiments(detailed) == sentiments(expected["detailed_reviews"])
+    assert_same_results(aggregate.to_results(), expected)
+
+
+@pytest.mark.parametrize("from_file", [True, False])
+def test_resume_after_interruption(analyzer, jsonl, tmp_path, from_file):
+    expected = analyzer.analyze_reviews(REVIEWS)
+    checkpoint = str(tmp_path / "checkpoint.json")
+    source = (lambda: jsonl) if from_file else (lambda: iter(REVIEWS))
+
+    # Stop in the middle of the third chunk: the checkpoint is at the end of the second
+    stream = analyzer.analyze_reviews_stream(source(), chunk_size=5, checkpoint_path=checkpoint, checkpoint_every=1)
+    first = list(islice(stream, 11))
+    stream.close()
+    with open(checkpoint, encoding="utf-8") as f:
+        assert json.load(f)["offset"] == 10
+
+    aggregate = ReviewAggregate()
+    rest = list(analyzer.analyze_reviews_stream(source(), aggregate, chunk_size=5, checkpoint_path=checkpoint,
+                                                checkpoint_every=1))
+    assert sentiments(first[:10] + rest) == sentiments(expected["detailed_reviews"])
+    assert_same_results(aggregate.to_results(), expected)
@@ -0,0 +1,21 @@
+from ai.sentiment_analyzer import SentimentAnalyzer
+
+TEXTS = ["Camera pulita e staff gentile.", "Colazione scarsa", "Posizione ottima, vicino al centro"]
+
+
+def test_batch_progress_print(tiny_models, capsys):
+    SentimentAnalyzer().analyze_batch(TEXTS)
+    assert "Analyzing 3 texts in batch..." in capsys.readouterr().out
+
+    SentimentAnalyzer(verbose=False).analyze_batch(TEXTS)
+    assert capsys.readouterr().out == ""
+
+
+def test_analyze_batch_matches_analyze(tiny_models):
+    analyzer = SentimentAnalyzer(batch_size=2)
+    batch = analyzer.analyze_batch(TEXTS)
+    assert [r["text"] for r in batch] == TEXTS
+    for text, result in zip(TEXTS, batch):
+        single = analyzer.analyze(text)
+        assert (single["raw_label"], single["source"]) == (result["raw_label"], "model")
+        assert abs(single["confidence"] - result["confidence"]) <= 0.002
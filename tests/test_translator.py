@@ -0,0 +1,34 @@
+import pytest
+from ai.translator import Translator, split_sentences
+
+
+class UpperTranslator:
+    """Stands in for a translation pipeline: upper-cases each input and records the calls"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, batch_size=None):
+        self.calls.append(list(texts))
+        return [{"translation_text": text.upper()} for text in texts]
+
+
+@pytest.mark.parametrize("text", ["Ciao. Come stai?", "  Ciao.\n\nCome stai?  Bene! ", "", "   ", "Riga uno\nRiga due."])
+def test_split_sentences_round_trips(text):
+    assert "".join(split_sentences(text)) == text
+
+
+def test_sentence_mode_keeps_separators(tmp_path):
+    translator = Translator(sentence_mode=True, memory_path=str(tmp_path / "memory.sqlite"))
+    pipeline = UpperTranslator()
+    texts = ["Camera pulita.\n\nStaff gentile!  Tornerò.", "  Riga uno\nRiga due. ", ""]
+
+    assert translator._translate(texts, pipeline, "it-en") == [
+        "CAMERA PULITA.\n\nSTAFF GENTILE!  TORNERÒ.", "  RIGA UNO\nRIGA DUE. ", ""]
+    # Each distinct sentence went to the model once, shortest first
+    assert sorted(pipeline.calls[0]) == sorted(["Camera pulita.", "Staff gentile!", "Tornerò.",
+                                                "Riga uno", "Riga due."])
+
+    # Second run: every sentence comes from the translation memory
+    assert translator._translate(["Tornerò.\nCamera pulita."], pipeline, "it-en") == ["TORNERÒ.\nCAMERA PULITA."]
+    assert len(pipeline.calls) == 1